@@ -14,6 +14,7 @@ grant application role app_viewer to application role app_admin;
 create schema if not exists config_data;
     grant usage on schema config_data to application role app_admin;
     execute immediate from './sql_lib/config_data-configuration.sql';
+    execute immediate from './sql_lib/config_data-window_rules.sql';
 
 -- non-versioned schema to prevent data loss on upgrade
 -- we'll also store our task(s) here
@@ -21,13 +22,27 @@ create schema if not exists warnings_data;
     grant usage on schema warnings_data to application role app_admin;
     execute immediate from './sql_lib/warnings_data-warnings_reading_cursor.sql';
     execute immediate from './sql_lib/warnings_data-warnings.sql';
+    execute immediate from './sql_lib/warnings_data-warning_episodes.sql';
+    execute immediate from './sql_lib/warnings_data-warning_episodes_archive.sql';
+    execute immediate from './sql_lib/warnings_data-warning_counts.sql';
+    execute immediate from './sql_lib/warnings_data-warning_check_runs.sql';
+    execute immediate from './sql_lib/warnings_data-sensor_maintenance.sql';
+    execute immediate from './sql_lib/warnings_data-sensor_window_state.sql';
+
+-- non-versioned schema for sensor readings rolled up over time, for the charts
+create schema if not exists readings_data;
+    grant usage on schema readings_data to application role app_admin;
+    execute immediate from './sql_lib/readings_data-sensor_reading_rollups.sql';
+
+-- non-versioned schema for what the streamlits record about themselves
+create schema if not exists ui_data;
+    grant usage on schema ui_data to application role app_admin;
+    execute immediate from './sql_lib/ui_data-query_stats.sql';
 
 -- the ui schema holds all streamlits
 create or alter versioned schema ui;
     grant usage on schema ui to application role app_viewer;
-    execute immediate from './sql_lib/ui-v_dashboard.sql';
-    execute immediate from './sql_lib/ui-v_sensor_data.sql';
-    execute immediate from './sql_lib/ui-v_configuration.sql';
+    execute immediate from './sql_lib/ui-streamlit_app.sql';
 
 -- simple generic methods to register callbacks
 create or alter versioned schema config_code;
@@ -43,6 +58,26 @@ create or alter versioned schema shared_content;
 
 -- versioned schema to hold our stored procedures
 create or alter versioned schema warnings_code;
+    execute immediate from './sql_lib/warnings_code-add_interval.sql';
+    execute immediate from './sql_lib/warnings_code-refresh_sensor_maintenance.sql';
+    execute immediate from './sql_lib/warnings_code-count_new_warnings.sql';
+    execute immediate from './sql_lib/warnings_code-merge_warning_episodes.sql';
+    execute immediate from './sql_lib/warnings_code-evaluate_window_rules.sql';
+    execute immediate from './sql_lib/warnings_code-merge_window_state.sql';
+    execute immediate from './sql_lib/warnings_code-set_window_rules.sql';
+    execute immediate from './sql_lib/warnings_code-check_warnings_partition.sql';
     execute immediate from './sql_lib/warnings_code-check_warnings.sql';
+    execute immediate from './sql_lib/warnings_code-check_warnings_vectorized.sql';
+    execute immediate from './sql_lib/warnings_code-check_for_new_readings.sql';
+    execute immediate from './sql_lib/warnings_code-set_warning_check_interval.sql';
+    execute immediate from './sql_lib/warnings_code-apply_warning_check_interval.sql';
+    execute immediate from './sql_lib/warnings_code-set_warning_check_adaptive.sql';
+    execute immediate from './sql_lib/warnings_code-finish_warning_check.sql';
+    execute immediate from './sql_lib/warnings_code-archive_warnings.sql';
     execute immediate from './sql_lib/warnings_code-create_warning_check_task.sql';
     execute immediate from './sql_lib/warnings_code-update_warning_check_task_status.sql';
+    execute immediate from './sql_lib/warnings_code-set_warning_partition_count.sql';
+
+-- versioned schema for the stored procedures that maintain readings_data
+create or alter versioned schema readings_code;
+    execute immediate from './sql_lib/readings_code-update_reading_rollups.sql';
@@ -16,6 +16,107 @@ execute immediate $$
 $$
 ;
 
+-- check_warnings() processes readings in chunks of warning_check_batch_rows, committing
+-- after each one, and stops after warning_check_max_rows so every run stays short;
+-- a backlog (e.g. the year of readings before the first run) is caught up over several runs
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_check_batch_rows int default 100000;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_check_max_rows int default 1000000;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+-- warning checks are split into this many partitions by machine, checked at the same
+-- time by the task graph; change it with warnings_code.set_warning_partition_count()
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_partition_count int default 1;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+-- the warning check task runs every warning_check_interval_minutes; with
+-- warning_check_adaptive, finish_warning_check() doubles the interval after a run that
+-- found no new readings (up to warning_check_max_interval_minutes) and shortens it again
+-- once readings arrive; see apply_warning_check_interval()
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_check_adaptive boolean default false;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_check_interval_minutes int default 1;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_check_max_interval_minutes int default 30;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+-- acknowledged warning episodes are moved to warnings_data.warning_episodes_archive
+-- after warning_retention_days, and purged from there after warning_archive_retention_days
+-- (see warnings_code.archive_warnings()); null keeps them. The archive is kept by
+-- default: purging it is up to the app admin
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_retention_days int default 30;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+execute immediate $$
+    begin
+        alter table config_data.configuration
+            add column warning_archive_retention_days int;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
 -- initialize the table with exactly one row, if it doesn't already have one
 insert into config_data.configuration
     (is_first_time_setup_dismissed, enable_warning_generation_task)
@@ -0,0 +1,15 @@
+-- rolling-window warning rules, per sensor type, on top of the sensor types' min / max
+-- ranges (see src/python/window_rules.py for what each rule does): RATE_OF_CHANGE and
+-- ROLLING_ZSCORE compare a reading with the window_readings readings before it, and
+-- warn above threshold; CONSECUTIVE_OUT_OF_RANGE warns from the window_readings'th out
+-- of range reading in a row, and has no threshold. Sensor types without rules only get
+-- the range and maintenance warnings
+create table if not exists config_data.window_rules (
+    sensor_type_id int not null,
+    rule varchar not null,
+    window_readings int not null,
+    threshold float
+);
+
+-- app admin can change the rules from outside streamlit if they like
+grant select, insert, update, delete on config_data.window_rules to application role app_admin;
@@ -0,0 +1,146 @@
+-- rolls the readings after the watermark in readings_data.reading_rollup_cursor up into
+-- readings_data.sensor_reading_rollups, in chunks of warning_check_batch_rows taken in
+-- (reading_time, sensor_uuid) order, up to warning_check_max_rows per run, like
+-- warnings_code.check_warnings_partition(). A chunk is rolled up into minutes, the minutes
+-- into hours and days, and each bucket is added to the one already stored, if any; the
+-- chunk's rollups and the watermark are committed together.
+-- runs as a child task of warnings_data.check_warnings_every_minute
+create or replace procedure readings_code.update_reading_rollups()
+returns varchar
+language sql
+as
+$$
+    declare
+        cursor_rows INT default 0;
+        cursor_ts timestamp default '1970-01-01'::timestamp;
+        cursor_uuid varchar default '';
+        chunk_end_ts timestamp;
+        chunk_end_uuid varchar;
+        chunk_rows INT default 0;
+        batch_rows INT default 100000;
+        max_rows INT default 1000000;
+        processed_rows INT default 0;
+    begin
+        select count(*) into :cursor_rows from readings_data.reading_rollup_cursor;
+        if (cursor_rows > 0) then
+            select last_reading_ts, coalesce(last_sensor_uuid, '')
+                into :cursor_ts, :cursor_uuid
+                from readings_data.reading_rollup_cursor;
+        end if;
+        select coalesce(warning_check_batch_rows, :batch_rows), coalesce(warning_check_max_rows, :max_rows)
+            into :batch_rows, :max_rows
+            from config_data.configuration;
+
+        while (processed_rows < max_rows) do
+            select count(*), max(reading_time), max(iff(is_last, sensor_uuid, null))
+                into :chunk_rows, :chunk_end_ts, :chunk_end_uuid
+                from (
+                    select
+                        reading_time,
+                        sensor_uuid,
+                        row_number() over (order by reading_time desc, sensor_uuid desc) = 1 as is_last
+                    from (
+                        select sre.reading_time, sre.sensor_uuid
+                        from REFERENCE('sensor_readings') sre
+                        where sre.reading_time >= :cursor_ts
+                            and (sre.reading_time > :cursor_ts or sre.sensor_uuid > :cursor_uuid)
+                        order by sre.reading_time asc, sre.sensor_uuid asc
+                        limit :batch_rows
+                    )
+                );
+            if (chunk_rows = 0) then
+                break;
+            end if;
+
+            begin transaction;
+            -- readings are null when a sensor isn't sending data; they're left out of the
+            -- count, so reading_sum / reading_count is the average reading
+            insert into readings_data.sensor_reading_rollup_chunks (
+                sensor_uuid, bucket_seconds, bucket_start, reading_count, reading_sum, min_reading, max_reading,
+                out_of_range_count
+            )
+                select
+                    sre.sensor_uuid,
+                    60,
+                    date_trunc('minute', sre.reading_time),
+                    count(sre.reading),
+                    sum(sre.reading),
+                    min(sre.reading),
+                    max(sre.reading),
+                    sum(iff(sre.reading < sr.min_range or sre.reading > sr.max_range, 1, 0))
+                from REFERENCE('sensor_readings') sre
+                join REFERENCE('sensors') s on s.uuid = sre.sensor_uuid
+                join SHARED_CONTENT.SENSOR_RANGES sr on sr.id = s.sensor_type_id
+                where sre.reading_time between :cursor_ts and :chunk_end_ts
+                    and (sre.reading_time > :cursor_ts or sre.sensor_uuid > :cursor_uuid)
+                    and (sre.reading_time < :chunk_end_ts or sre.sensor_uuid <= :chunk_end_uuid)
+                group by sre.sensor_uuid, date_trunc('minute', sre.reading_time);
+
+            insert into readings_data.sensor_reading_rollup_chunks (
+                sensor_uuid, bucket_seconds, bucket_start, reading_count, reading_sum, min_reading, max_reading,
+                out_of_range_count
+            )
+                select sensor_uuid, 3600, date_trunc('hour', bucket_start), sum(reading_count), sum(reading_sum),
+                    min(min_reading), max(max_reading), sum(out_of_range_count)
+                from readings_data.sensor_reading_rollup_chunks
+                where bucket_seconds = 60
+                group by sensor_uuid, date_trunc('hour', bucket_start)
+                union all
+                select sensor_uuid, 86400, date_trunc('day', bucket_start), sum(reading_count), sum(reading_sum),
+                    min(min_reading), max(max_reading), sum(out_of_range_count)
+                from readings_data.sensor_reading_rollup_chunks
+                where bucket_seconds = 60
+                group by sensor_uuid, date_trunc('day', bucket_start);
+
+            -- min() / max() of a bucket without readings are null, and least() / greatest()
+            -- of a null are null
+            update readings_data.sensor_reading_rollups stored
+                set reading_count = stored.reading_count + chunk.reading_count,
+                    reading_sum = coalesce(stored.reading_sum + chunk.reading_sum, stored.reading_sum, chunk.reading_sum),
+                    min_reading = least(coalesce(stored.min_reading, chunk.min_reading), coalesce(chunk.min_reading, stored.min_reading)),
+                    max_reading = greatest(coalesce(stored.max_reading, chunk.max_reading), coalesce(chunk.max_reading, stored.max_reading)),
+                    out_of_range_count = stored.out_of_range_count + chunk.out_of_range_count
+                from readings_data.sensor_reading_rollup_chunks chunk
+                where stored.sensor_uuid = chunk.sensor_uuid
+                    and stored.bucket_seconds = chunk.bucket_seconds
+                    and stored.bucket_start = chunk.bucket_start;
+
+            insert into readings_data.sensor_reading_rollups (
+                sensor_uuid, bucket_seconds, bucket_start, reading_count, reading_sum, min_reading, max_reading,
+                out_of_range_count
+            )
+                select chunk.sensor_uuid, chunk.bucket_seconds, chunk.bucket_start, chunk.reading_count, chunk.reading_sum,
+                    chunk.min_reading, chunk.max_reading, chunk.out_of_range_count
+                from readings_data.sensor_reading_rollup_chunks chunk
+                where not exists (
+                    select 1 from readings_data.sensor_reading_rollups stored
+                    where stored.sensor_uuid = chunk.sensor_uuid
+                        and stored.bucket_seconds = chunk.bucket_seconds
+                        and stored.bucket_start = chunk.bucket_start
+                );
+
+            delete from readings_data.sensor_reading_rollup_chunks;
+            cursor_ts := chunk_end_ts;
+            cursor_uuid := chunk_end_uuid;
+            delete from readings_data.reading_rollup_cursor;
+            insert into readings_data.reading_rollup_cursor (last_reading_ts, last_sensor_uuid)
+                values (:cursor_ts, :cursor_uuid);
+            commit;
+
+            processed_rows := processed_rows + chunk_rows;
+            if (chunk_rows < batch_rows) then
+                break;
+            end if;
+        end while;
+
+        system$log_info(concat('update_reading_rollups(): ', :processed_rows, ' readings, cursor at ',
+            :cursor_ts, ' / ', :cursor_uuid));
+        return concat('rolled up ', :processed_rows, ' readings');
+    exception
+        when other then
+            rollback;
+            system$log_error('update_reading_rollups(): ' || sqlerrm);
+            raise;
+    end;
+$$
+;
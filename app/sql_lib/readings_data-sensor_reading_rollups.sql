@@ -0,0 +1,38 @@
+-- sensor readings rolled up per sensor into buckets of a minute, an hour and a day
+-- (bucket_seconds 60, 3600 and 86400), so that charts over long date ranges read a row
+-- per bucket instead of every reading. The sum and count are kept rather than the
+-- average, so a bucket can be added to when more of its readings arrive; out_of_range_count
+-- counts readings outside of their sensor type's range.
+-- maintained by readings_code.update_reading_rollups()
+create table if not exists readings_data.sensor_reading_rollups (
+    sensor_uuid varchar not null,
+    bucket_seconds int not null,
+    bucket_start timestamp not null,
+    reading_count int not null,
+    reading_sum number,
+    min_reading number,
+    max_reading number,
+    out_of_range_count int not null
+);
+
+-- one chunk of new readings, rolled up at every resolution, before it is merged into
+-- sensor_reading_rollups
+create table if not exists readings_data.sensor_reading_rollup_chunks (
+    sensor_uuid varchar not null,
+    bucket_seconds int not null,
+    bucket_start timestamp not null,
+    reading_count int not null,
+    reading_sum number,
+    min_reading number,
+    max_reading number,
+    out_of_range_count int not null
+);
+
+-- the last reading rolled up, in (reading_time, sensor_uuid) order like
+-- warnings_data.warnings_reading_cursor; readings after it are not in the rollups yet
+create table if not exists readings_data.reading_rollup_cursor (
+    last_reading_ts timestamp not null,
+    last_sensor_uuid varchar
+);
+
+grant select on table readings_data.sensor_reading_rollups to application role app_admin;
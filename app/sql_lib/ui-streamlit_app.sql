@@ -0,0 +1,9 @@
+-- the app: one Streamlit, with a page per tab; Configuration and Performance
+-- are only listed for app_admin (see streamlit_app.py)
+create or replace
+    streamlit ui."Chairlift"
+    from 'src/ui' main_file='streamlit_app.py';
+
+grant usage
+    on streamlit ui."Chairlift"
+    to application role app_viewer;
@@ -0,0 +1,15 @@
+-- queries run by the streamlits, written by each streamlit process every minute;
+-- the Performance streamlit summarizes them per page and call site. The daily
+-- archive_warnings task deletes them after 7 days
+create table if not exists ui_data.query_stats (
+    recorded_at timestamp not null,
+    page varchar,
+    call_site varchar,
+    duration_ms float,
+    rows_returned int,
+    bytes_materialized int,
+    cache_hit boolean,
+    query_text varchar
+);
+
+grant select, delete on table ui_data.query_stats to application role app_admin;
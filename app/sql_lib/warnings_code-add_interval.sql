@@ -0,0 +1,15 @@
+-- dateadd() only accepts a literal date part, but sensor types store the units of
+-- their service interval and lifetime as data
+create or replace function warnings_code.add_interval(unit varchar, count int, from_date date)
+returns date
+as
+$$
+    case lower(unit)
+        when 'year' then dateadd(year, count, from_date)
+        when 'quarter' then dateadd(quarter, count, from_date)
+        when 'month' then dateadd(month, count, from_date)
+        when 'week' then dateadd(week, count, from_date)
+        when 'day' then dateadd(day, count, from_date)
+    end
+$$
+;
@@ -0,0 +1,41 @@
+-- body of the standalone task warnings_data.apply_warning_check_interval, which
+-- finish_warning_check() runs after recording a new warning_check_interval_minutes.
+-- the root task can only be rescheduled while suspended, and resuming it resumes its
+-- dependents, so neither may happen from inside the graph run that is still finishing:
+-- this waits (up to max_wait_seconds) for that run to end, then applies the interval.
+-- if the graph is still running by then, the interval stays recorded, and the next
+-- finalizer run that changes it tries again
+create or replace procedure warnings_code.apply_warning_check_interval()
+returns varchar
+language sql
+as
+$$
+    declare
+        interval_minutes INT default 1;
+        running_graphs INT default 0;
+        waited_seconds INT default 0;
+        max_wait_seconds INT default 120;
+    begin
+        select coalesce(warning_check_interval_minutes, 1) into :interval_minutes from config_data.configuration;
+        loop
+            select count(*) into :running_graphs
+                from table(information_schema.current_task_graphs(root_task_name => 'CHECK_WARNINGS_EVERY_MINUTE'))
+                where schema_name = 'WARNINGS_DATA' and state = 'EXECUTING';
+            if (running_graphs = 0) then
+                break;
+            end if;
+            if (waited_seconds >= max_wait_seconds) then
+                return 'warning check still running, schedule unchanged';
+            end if;
+            call system$wait(5);
+            waited_seconds := waited_seconds + 5;
+        end loop;
+        call warnings_code.set_warning_check_interval(:interval_minutes);
+        return concat('checking every ', :interval_minutes, ' minutes');
+    exception
+        when other then
+            system$log_error('apply_warning_check_interval(): ' || sqlerrm);
+            return 'could not change the schedule: ' || sqlerrm;
+    end;
+$$
+;
@@ -0,0 +1,58 @@
+-- body of the daily task warnings_data.archive_warnings_daily: moves acknowledged
+-- warning episodes whose last reading is older than warning_retention_days into
+-- warning_episodes_archive, and purges archived ones older than
+-- warning_archive_retention_days. Either setting left null keeps those episodes.
+-- open episodes are never acknowledged, so an episode is only archived once it ended.
+-- it also purges the streamlits' query statistics after 7 days
+create or replace procedure warnings_code.archive_warnings()
+returns varchar
+language sql
+as
+$$
+    declare
+        retention_days INT;
+        archive_retention_days INT;
+        archive_before timestamp;
+        archived_episodes INT default 0;
+        purged_episodes INT default 0;
+    begin
+        select warning_retention_days, warning_archive_retention_days
+            into :retention_days, :archive_retention_days
+            from config_data.configuration;
+
+        begin transaction;
+        if (retention_days is not null) then
+            archive_before := dateadd(day, -:retention_days, current_timestamp());
+            insert into warnings_data.warning_episodes_archive (
+                sensor_uuid, reason, first_reading_time, last_reading_time, reading_count, min_reading, max_reading
+            )
+                select sensor_uuid, reason, first_reading_time, last_reading_time, reading_count, min_reading, max_reading
+                from warnings_data.warning_episodes
+                where acknowledged and last_reading_time < :archive_before
+                order by last_reading_time;
+            archived_episodes := SQLROWCOUNT;
+            delete from warnings_data.warning_episodes
+                where acknowledged and last_reading_time < :archive_before;
+            -- the per-reading warnings written before episodes were migrated into
+            -- warning_episodes on upgrade, and are no longer read; like the episodes,
+            -- only the acknowledged ones are let go
+            delete from warnings_data.warnings where acknowledged and reading_time < :archive_before;
+        end if;
+        if (archive_retention_days is not null) then
+            delete from warnings_data.warning_episodes_archive
+                where last_reading_time < dateadd(day, -:archive_retention_days, current_timestamp());
+            purged_episodes := SQLROWCOUNT;
+        end if;
+        commit;
+        delete from ui_data.query_stats where recorded_at < dateadd(day, -7, current_timestamp());
+
+        system$log_info(concat('archive_warnings(): archived ', :archived_episodes, ', purged ', :purged_episodes));
+        return concat('archived ', :archived_episodes, ' warning episodes, purged ', :purged_episodes);
+    exception
+        when other then
+            rollback;
+            system$log_error('archive_warnings(): ' || sqlerrm);
+            raise;
+    end;
+$$
+;
@@ -0,0 +1,52 @@
+-- body of the root task warnings_data.check_warnings_every_minute: a cheap check for
+-- readings newer than the oldest watermark, of the partitions and of the rollups.
+-- max(reading_time) is answered from table metadata, so a run without new readings
+-- never scans them; the partition and rollup tasks only run when this returns 'CHECK'
+-- (see create_warning_check_task()), and this refreshes the sensors' maintenance
+-- status for them first.
+-- a reading at exactly the watermark's reading_time, with a later sensor_uuid, waits
+-- for the next run that has newer readings too
+create or replace procedure warnings_code.check_for_new_readings()
+returns varchar
+language sql
+as
+$$
+    declare
+        partition_count INT default 1;
+        interval_minutes INT default 1;
+        cursor_rows INT default 0;
+        oldest_cursor_ts timestamp;
+        newest_reading_ts timestamp;
+        outcome varchar default 'CHECK';
+    begin
+        select coalesce(warning_partition_count, 1), coalesce(warning_check_interval_minutes, 1)
+            into :partition_count, :interval_minutes
+            from config_data.configuration;
+        select count(*), min(last_reading_ts)
+            into :cursor_rows, :oldest_cursor_ts
+            from (
+                select last_reading_ts from warnings_data.warnings_reading_cursor
+                union all
+                select last_reading_ts from readings_data.reading_rollup_cursor
+            );
+        select max(reading_time) into :newest_reading_ts from REFERENCE('sensor_readings');
+
+        -- a partition (or the rollups) without a watermark hasn't run yet, and always checks
+        if (cursor_rows >= partition_count + 1
+                and (newest_reading_ts is null or newest_reading_ts <= oldest_cursor_ts)) then
+            outcome := 'SKIP';
+        else
+            call warnings_code.refresh_sensor_maintenance();
+        end if;
+        insert into warnings_data.warning_check_runs (started_at, skipped, interval_minutes)
+            values (current_timestamp(), :outcome = 'SKIP', :interval_minutes);
+        select system$set_return_value(:outcome);
+        return outcome;
+    exception
+        when other then
+            system$log_error('check_for_new_readings(): ' || sqlerrm);
+            select system$set_return_value('CHECK');
+            return 'CHECK';
+    end;
+$$
+;
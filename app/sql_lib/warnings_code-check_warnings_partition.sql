@@ -0,0 +1,208 @@
+-- check for warnings in one partition of the reading table: the readings of machines
+-- with abs(hash(machine_uuid)) % partition_count = partition_id
+-- new readings are evaluated set-based, in chunks of at most warning_check_batch_rows
+-- taken in (reading_time, sensor_uuid) order after the partition's watermark in
+-- warnings_reading_cursor; each chunk commits its warning episodes and the watermark
+-- together, so an interrupted catch-up resumes where it stopped. A run stops after
+-- warning_check_max_rows readings and leaves the rest to the next run.
+-- with until_ts / until_uuid, the run instead processes every reading up to and
+-- including that watermark, and no further (see set_warning_partition_count())
+-- sensors whose type has window rules (config_data.window_rules) also go through
+-- evaluate_window_rules(), which continues from the window the last chunk left in
+-- sensor_window_state, so earlier readings are never read again
+create or replace procedure warnings_code.check_warnings_partition(
+    partition_id int, partition_count int, until_ts timestamp, until_uuid varchar
+)
+returns varchar
+language sql
+as
+$$
+    declare
+        warning_processed INT default 0;
+        cursor_ts timestamp default dateadd(year, -1, current_timestamp());
+        cursor_uuid varchar default '';
+        chunk_end_ts timestamp;
+        chunk_end_uuid varchar;
+        chunk_rows INT default 0;
+        batch_rows INT default 100000;
+        max_rows INT default 1000000;
+        processed_rows INT default 0;
+        warning_runs INT default 0;
+        chunk_warning_runs INT default 0;
+        has_window_rules BOOLEAN default false;
+    begin
+        system$log_info(concat('check_warnings_partition(', :partition_id, ', ', :partition_count, ') started...'));
+        select count(*) into :warning_processed
+            from warnings_data.warnings_reading_cursor
+            where partition_id = :partition_id;
+        if (warning_processed > 0) then
+            select last_reading_ts, coalesce(last_sensor_uuid, '')
+                into :cursor_ts, :cursor_uuid
+                from warnings_data.warnings_reading_cursor
+                where partition_id = :partition_id;
+        end if;
+        select coalesce(warning_check_batch_rows, :batch_rows), coalesce(warning_check_max_rows, :max_rows)
+            into :batch_rows, :max_rows
+            from config_data.configuration;
+        select count(*) > 0 into :has_window_rules from config_data.window_rules;
+
+        while (processed_rows < max_rows or until_ts is not null) do
+            -- the last reading of the next chunk; fewer rows than asked for means we're caught up
+            select count(*), max(reading_time), max(iff(is_last, sensor_uuid, null))
+                into :chunk_rows, :chunk_end_ts, :chunk_end_uuid
+                from (
+                    select
+                        reading_time,
+                        sensor_uuid,
+                        row_number() over (order by reading_time desc, sensor_uuid desc) = 1 as is_last
+                    from (
+                        select sre.reading_time, sre.sensor_uuid
+                        from REFERENCE('sensor_readings') sre
+                        join REFERENCE('sensors') s on s.uuid = sre.sensor_uuid
+                        where sre.reading_time >= :cursor_ts
+                            and (sre.reading_time > :cursor_ts or sre.sensor_uuid > :cursor_uuid)
+                            and (:until_ts is null or sre.reading_time < :until_ts
+                                or (sre.reading_time = :until_ts and sre.sensor_uuid <= :until_uuid))
+                            and abs(hash(s.machine_uuid)) % :partition_count = :partition_id
+                        order by sre.reading_time asc, sre.sensor_uuid asc
+                        limit :batch_rows
+                    )
+                );
+            if (chunk_rows = 0) then
+                break;
+            end if;
+
+            begin transaction;
+            -- the readings that broke a window rule, which takes precedence over the
+            -- reading's other warnings below, and each sensor's window after the chunk;
+            -- a failed run's rows are cleared first, so its windows are never carried over
+            delete from warnings_data.window_rule_chunks where partition_id = :partition_id;
+            if (has_window_rules) then
+                insert into warnings_data.window_rule_chunks (partition_id, sensor_uuid, reading_time, reason, state)
+                    select :partition_id, readings.uuid, window_rule.reading_time, window_rule.reason, window_rule.state
+                    from (
+                        select
+                            s.uuid,
+                            sre.reading_time,
+                            sre.reading,
+                            stv.min_range,
+                            stv.max_range,
+                            type_rules.rules,
+                            window_state.state
+                        from REFERENCE('sensor_readings') sre
+                        join REFERENCE('sensors') s on s.uuid = sre.sensor_uuid
+                        join SHARED_CONTENT.SENSOR_TYPES_VIEW stv on s.sensor_type_id = stv.id
+                        join (
+                            select
+                                sensor_type_id,
+                                array_agg(object_construct(
+                                    'RULE', rule, 'WINDOW_READINGS', window_readings, 'THRESHOLD', threshold
+                                )) as rules
+                            from config_data.window_rules
+                            group by sensor_type_id
+                        ) type_rules on type_rules.sensor_type_id = s.sensor_type_id
+                        left join warnings_data.sensor_window_state window_state on window_state.sensor_uuid = s.uuid
+                        where sre.reading_time between :cursor_ts and :chunk_end_ts
+                            and (sre.reading_time > :cursor_ts or sre.sensor_uuid > :cursor_uuid)
+                            and (sre.reading_time < :chunk_end_ts or sre.sensor_uuid <= :chunk_end_uuid)
+                            and abs(hash(s.machine_uuid)) % :partition_count = :partition_id
+                    ) readings,
+                    table(warnings_code.evaluate_window_rules(
+                        readings.reading_time, readings.reading, readings.min_range, readings.max_range,
+                        readings.rules, readings.state
+                    ) over (partition by readings.uuid)) window_rule;
+            end if;
+
+            -- rows a failed run left behind would otherwise be merged along with this chunk's
+            delete from warnings_data.warning_episode_chunks where partition_id = :partition_id;
+            -- the chunk's readings, compacted into runs of the same reason per sensor (a reading
+            -- without a warning has a null reason, and ends a run), for merge_warning_episodes()
+            -- rule precedence matches the original per-row evaluation: a reading rule
+            -- (out of range / not sending data) overrides the sensor's maintenance warning
+            -- (lifetime expired / service due), which refresh_sensor_maintenance() precomputed
+            insert into warnings_data.warning_episode_chunks (
+                partition_id, sensor_uuid, reason, first_reading_time, last_reading_time, reading_count,
+                min_reading, max_reading, is_first, is_last
+            )
+                select
+                    :partition_id,
+                    uuid,
+                    reason,
+                    min(reading_time),
+                    max(reading_time),
+                    count(*),
+                    min(reading),
+                    max(reading),
+                    min(reading_time) = min(min(reading_time)) over (partition by uuid),
+                    max(reading_time) = max(max(reading_time)) over (partition by uuid)
+                from (
+                    select
+                        uuid,
+                        reason,
+                        reading,
+                        reading_time,
+                        row_number() over (partition by uuid order by reading_time)
+                            - row_number() over (partition by uuid, reason order by reading_time) as run
+                    from (
+                        select
+                            s.uuid,
+                            sre.reading,
+                            sre.reading_time,
+                            case
+                                when window_rule.reason is not null then window_rule.reason
+                                when sre.reading < stv.min_range then 'SENSOR_READING_OUT_OF_RANGE'
+                                when sre.reading > stv.max_range then 'SENSOR_READING_OUT_OF_RANGE'
+                                when sre.reading is null then 'SENSOR_NOT_SENDING_DATA'
+                                else sm.maintenance_reason
+                            end as reason
+                        from REFERENCE('sensor_readings') sre
+                        join REFERENCE('sensors') s on s.uuid = sre.sensor_uuid
+                        join SHARED_CONTENT.SENSOR_TYPES_VIEW stv on s.sensor_type_id = stv.id
+                        left join warnings_data.sensor_maintenance sm on sm.sensor_uuid = s.uuid
+                        left join warnings_data.window_rule_chunks window_rule
+                            on window_rule.partition_id = :partition_id
+                            and window_rule.sensor_uuid = s.uuid
+                            and window_rule.reading_time = sre.reading_time
+                            and window_rule.reason is not null
+                        where sre.reading_time between :cursor_ts and :chunk_end_ts
+                            and (sre.reading_time > :cursor_ts or sre.sensor_uuid > :cursor_uuid)
+                            and (sre.reading_time < :chunk_end_ts or sre.sensor_uuid <= :chunk_end_uuid)
+                            and abs(hash(s.machine_uuid)) % :partition_count = :partition_id
+                    )
+                )
+                group by uuid, reason, run;
+            select count_if(reason is not null) into :chunk_warning_runs
+                from warnings_data.warning_episode_chunks
+                where partition_id = :partition_id;
+            warning_runs := warning_runs + chunk_warning_runs;
+            call warnings_code.merge_warning_episodes(:partition_id);
+            if (has_window_rules) then
+                call warnings_code.merge_window_state(:partition_id);
+            end if;
+            call warnings_code.count_new_warnings(
+                :cursor_ts, :cursor_uuid, :chunk_end_ts, :chunk_end_uuid, :partition_id, :partition_count
+            );
+            cursor_ts := chunk_end_ts;
+            cursor_uuid := chunk_end_uuid;
+            delete from warnings_data.warnings_reading_cursor where partition_id = :partition_id;
+            insert into warnings_data.warnings_reading_cursor (partition_id, last_reading_ts, last_sensor_uuid)
+                values (:partition_id, :cursor_ts, :cursor_uuid);
+            commit;
+
+            processed_rows := processed_rows + chunk_rows;
+            if (chunk_rows < batch_rows) then
+                break;
+            end if;
+        end while;
+
+        system$log_info(concat('check_warnings_partition(', :partition_id, '): ', :warning_runs, ' runs of warnings in ',
+            :processed_rows, ' readings, cursor at ', :cursor_ts, ' / ', :cursor_uuid));
+        return concat(:warning_runs, ' runs of warnings in ', :processed_rows, ' readings');
+    exception
+        when other then
+            rollback;
+            system$log_error('check_warnings_partition(): ' || sqlerrm);
+            raise;
+    end;
+$$
+;
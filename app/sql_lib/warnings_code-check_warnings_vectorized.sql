@@ -0,0 +1,10 @@
+-- same job as check_warnings_partition(), with the rules evaluated column-wise in pandas
+-- (see src/python/warning_rules.py and window_rules.py, which can also be run and tested locally)
+create or replace procedure warnings_code.check_warnings_vectorized(partition_id int, partition_count int)
+returns varchar
+language python
+runtime_version = '3.8'
+packages = ('snowflake-snowpark-python', 'pandas', 'numpy')
+imports = ('/src/python/warning_rules.py', '/src/python/window_rules.py')
+handler = 'warning_rules.check_warnings'
+;
@@ -0,0 +1,39 @@
+-- adds the warning episodes that started with a reading after (from_ts, from_uuid), up to
+-- and including (to_ts, to_uuid), in (reading_time, sensor_uuid) order, of the machines
+-- in one partition, to warning_counts; called by the warning checks in the same
+-- transaction as merge_warning_episodes(). Episodes a chunk only extended started earlier,
+-- and were counted then
+create or replace procedure warnings_code.count_new_warnings(
+    from_ts timestamp, from_uuid varchar, to_ts timestamp, to_uuid varchar,
+    partition_id int, partition_count int
+)
+returns varchar
+language sql
+as
+$$
+    begin
+        merge into warnings_data.warning_counts counts
+            using (
+                select sensor.machine_uuid, sensor.sensor_type_id, warning.reason, count(*) as new_count
+                from warnings_data.warning_episodes warning
+                inner join reference('SENSORS') sensor
+                    on sensor.uuid = warning.sensor_uuid
+                where warning.first_reading_time between :from_ts and :to_ts
+                    and (warning.first_reading_time > :from_ts or warning.sensor_uuid > :from_uuid)
+                    and (warning.first_reading_time < :to_ts or warning.sensor_uuid <= :to_uuid)
+                    and abs(hash(sensor.machine_uuid)) % :partition_count = :partition_id
+                    and warning.acknowledged = false
+                group by 1, 2, 3
+            ) new_warnings
+            on equal_null(counts.machine_uuid, new_warnings.machine_uuid)
+                and equal_null(counts.sensor_type_id, new_warnings.sensor_type_id)
+                and equal_null(counts.reason, new_warnings.reason)
+            when matched then
+                update set unacknowledged_count = counts.unacknowledged_count + new_warnings.new_count
+            when not matched then
+                insert (machine_uuid, sensor_type_id, reason, unacknowledged_count)
+                values (new_warnings.machine_uuid, new_warnings.sensor_type_id, new_warnings.reason, new_warnings.new_count);
+        return 'counted ' || SQLROWCOUNT || ' warning groups';
+    end;
+$$
+;
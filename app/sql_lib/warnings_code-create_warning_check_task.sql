@@ -1,18 +1,81 @@
 -- stored procedure to create a task that checks for warnings in reading table
 -- task creation must be deferred to after app install because
 -- it depends on a privilege being granted by the user via the UI
+-- the root task runs every warning_check_interval_minutes and checks whether there are
+-- new readings at all (check_for_new_readings()); it has one child task per partition
+-- (see check_warnings_partition()), plus one that rolls the new readings up for the
+-- charts (see readings_code.update_reading_rollups()); they run at the same time, and
+-- only when it found some. The finalizer task finish_warning_check runs last, and adapts
+-- the schedule through the standalone task apply_warning_check_interval, which has no
+-- schedule of its own. A separate daily task archives and purges acknowledged warnings
 create or replace procedure warnings_code.create_warning_check_task()
 returns varchar
 language sql
 as
 $$
+    declare
+        partition_count INT default 1;
+        interval_minutes INT default 1;
+        statement varchar;
     begin
         system$log_info('creating task warnings_data.check_warnings_every_minute...');
-        create or replace task warnings_data.check_warnings_every_minute
+        select coalesce(warning_partition_count, 1), coalesce(warning_check_interval_minutes, 1)
+            into :partition_count, :interval_minutes
+            from config_data.configuration;
+
+        -- a child task can't outlive its root being replaced, so drop them first
+        alter task if exists warnings_data.check_warnings_every_minute suspend;
+        drop task if exists warnings_data.finish_warning_check;
+        drop task if exists warnings_data.update_reading_rollups;
+        let child_tasks resultset := (
+            execute immediate 'show tasks like ''CHECK_WARNINGS_PARTITION_%'' in schema warnings_data'
+        );
+        let child_task_cursor cursor for child_tasks;
+        for child_task in child_task_cursor do
+            statement := 'drop task if exists warnings_data.' || child_task."name";
+            execute immediate :statement;
+        end for;
+
+        statement := 'create or replace task warnings_data.check_warnings_every_minute
+                warehouse = reference(''consumer_warnings_generation_warehouse'')
+                schedule = ''' || interval_minutes || ' minute''
+            as
+            call warnings_code.check_for_new_readings()';
+        execute immediate :statement;
+
+        for partition_id in 0 to partition_count - 1 do
+            statement := 'create or replace task warnings_data.check_warnings_partition_' || partition_id || '
+                    warehouse = reference(''consumer_warnings_generation_warehouse'')
+                    after warnings_data.check_warnings_every_minute
+                    when system$get_predecessor_return_value(''CHECK_WARNINGS_EVERY_MINUTE'') = ''CHECK''
+                as
+                call warnings_code.check_warnings_partition(' || partition_id || ', ' || partition_count || ', null, null)';
+            execute immediate :statement;
+        end for;
+
+        create or replace task warnings_data.update_reading_rollups
             warehouse = reference('consumer_warnings_generation_warehouse')
-            schedule = '1 minute'
+            after warnings_data.check_warnings_every_minute
+            when system$get_predecessor_return_value('CHECK_WARNINGS_EVERY_MINUTE') = 'CHECK'
         as
-        call warnings_code.check_warnings();
+        call readings_code.update_reading_rollups();
+
+        create or replace task warnings_data.finish_warning_check
+            warehouse = reference('consumer_warnings_generation_warehouse')
+            finalize = warnings_data.check_warnings_every_minute
+        as
+        call warnings_code.finish_warning_check();
+
+        create or replace task warnings_data.apply_warning_check_interval
+            warehouse = reference('consumer_warnings_generation_warehouse')
+        as
+        call warnings_code.apply_warning_check_interval();
+
+        create or replace task warnings_data.archive_warnings_daily
+            warehouse = reference('consumer_warnings_generation_warehouse')
+            schedule = 'USING CRON 0 3 * * * UTC'
+        as
+        call warnings_code.archive_warnings();
     exception
         when other then
             system$log_error('create_warning_check_task(): ' || sqlerrm);
@@ -0,0 +1,15 @@
+-- the rolling-window rules over one sensor's new readings, called partitioned by sensor
+-- with its readings, its type's rules (config_data.window_rules, as an array) and its
+-- carried-over window (sensor_window_state). Returns the readings that broke a rule,
+-- and a last row with the sensor's window after them, in state
+-- (see src/python/window_rules.py, which can also be run and tested locally)
+create or replace function warnings_code.evaluate_window_rules(
+    reading_time timestamp, reading float, min_range float, max_range float, rules variant, state variant
+)
+returns table (reading_time timestamp, reason varchar, state varchar)
+language python
+runtime_version = '3.8'
+packages = ('pandas', 'numpy')
+imports = ('/src/python/window_rules.py')
+handler = 'window_rules.WindowRulesHandler'
+;
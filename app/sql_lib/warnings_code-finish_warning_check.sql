@@ -0,0 +1,68 @@
+-- body of the finalizer task warnings_data.finish_warning_check, which runs once the
+-- rest of a warning check run has finished or been skipped: records when the run
+-- ended and, with warning_check_adaptive, adapts the task's schedule to the readings.
+-- a run without new readings doubles the interval, up to warning_check_max_interval_minutes;
+-- a run that checked halves it, and a run that couldn't keep up (readings left over,
+-- e.g. after warning_check_max_rows) goes straight back to every minute.
+-- this runs inside the task graph, so it only records the new interval; the standalone
+-- apply_warning_check_interval task reschedules the root once the graph run has ended
+create or replace procedure warnings_code.finish_warning_check()
+returns varchar
+language sql
+as
+$$
+    declare
+        run_rows INT default 0;
+        started_at timestamp;
+        skipped BOOLEAN default false;
+        is_adaptive BOOLEAN default false;
+        interval_minutes INT default 1;
+        max_interval_minutes INT default 30;
+        new_interval_minutes INT;
+        oldest_cursor_ts timestamp;
+        newest_reading_ts timestamp;
+    begin
+        select count(*) into :run_rows from warnings_data.warning_check_runs where finished_at is null;
+        if (run_rows > 0) then
+            select started_at, skipped into :started_at, :skipped
+                from warnings_data.warning_check_runs
+                where finished_at is null
+                order by started_at desc
+                limit 1;
+            update warnings_data.warning_check_runs
+                set finished_at = current_timestamp()
+                where started_at = :started_at;
+        end if;
+        delete from warnings_data.warning_check_runs where started_at < dateadd(day, -7, current_timestamp());
+
+        select coalesce(warning_check_adaptive, false), coalesce(warning_check_interval_minutes, 1),
+                coalesce(warning_check_max_interval_minutes, 30)
+            into :is_adaptive, :interval_minutes, :max_interval_minutes
+            from config_data.configuration;
+        if (not is_adaptive or run_rows = 0) then
+            return 'schedule unchanged';
+        end if;
+
+        if (skipped) then
+            new_interval_minutes := least(interval_minutes * 2, max_interval_minutes);
+        else
+            select min(last_reading_ts) into :oldest_cursor_ts from warnings_data.warnings_reading_cursor;
+            select max(reading_time) into :newest_reading_ts from REFERENCE('sensor_readings');
+            if (newest_reading_ts > oldest_cursor_ts) then
+                new_interval_minutes := 1;
+            else
+                new_interval_minutes := greatest(floor(interval_minutes / 2), 1);
+            end if;
+        end if;
+        if (new_interval_minutes != interval_minutes) then
+            update config_data.configuration set warning_check_interval_minutes = :new_interval_minutes;
+            execute task warnings_data.apply_warning_check_interval;
+        end if;
+        return concat('checking every ', :new_interval_minutes, ' minutes');
+    exception
+        when other then
+            system$log_error('finish_warning_check(): ' || sqlerrm);
+            return 'could not finish the warning check: ' || sqlerrm;
+    end;
+$$
+;
@@ -0,0 +1,60 @@
+-- merges a partition's chunk, compacted into warnings_data.warning_episode_chunks, into
+-- warning_episodes; called by the warning checks once per chunk, in the chunk's transaction.
+-- a sensor's first run in the chunk continues its open episode if the reasons match, and
+-- closes it otherwise; every other run with a warning is a new episode, which stays open
+-- if it is the sensor's last run in the chunk
+create or replace procedure warnings_code.merge_warning_episodes(partition_id int)
+returns varchar
+language sql
+as
+$$
+    declare
+        new_episodes INT default 0;
+    begin
+        update warnings_data.warning_episodes episode
+            set is_open = false
+            from warnings_data.warning_episode_chunks chunk
+            where chunk.partition_id = :partition_id
+                and chunk.is_first
+                and episode.is_open
+                and episode.sensor_uuid = chunk.sensor_uuid
+                and (chunk.reason is null or episode.reason != chunk.reason);
+
+        insert into warnings_data.warning_episodes (
+            sensor_uuid, reason, first_reading_time, last_reading_time, reading_count,
+            min_reading, max_reading, is_open
+        )
+            select chunk.sensor_uuid, chunk.reason, chunk.first_reading_time, chunk.last_reading_time,
+                chunk.reading_count, chunk.min_reading, chunk.max_reading, chunk.is_last
+            from warnings_data.warning_episode_chunks chunk
+            where chunk.partition_id = :partition_id
+                and chunk.reason is not null
+                and not (chunk.is_first and exists (
+                    select 1 from warnings_data.warning_episodes episode
+                    where episode.is_open
+                        and episode.sensor_uuid = chunk.sensor_uuid
+                        and episode.reason = chunk.reason
+                ));
+        new_episodes := SQLROWCOUNT;
+
+        -- readings are null when the reason is SENSOR_NOT_SENDING_DATA, and least() /
+        -- greatest() of a null are null
+        update warnings_data.warning_episodes episode
+            set last_reading_time = chunk.last_reading_time,
+                reading_count = episode.reading_count + chunk.reading_count,
+                min_reading = least(coalesce(episode.min_reading, chunk.min_reading), coalesce(chunk.min_reading, episode.min_reading)),
+                max_reading = greatest(coalesce(episode.max_reading, chunk.max_reading), coalesce(chunk.max_reading, episode.max_reading)),
+                is_open = chunk.is_last
+            from warnings_data.warning_episode_chunks chunk
+            where chunk.partition_id = :partition_id
+                and chunk.is_first
+                and episode.is_open
+                and episode.sensor_uuid = chunk.sensor_uuid
+                and episode.reason = chunk.reason
+                and episode.last_reading_time < chunk.first_reading_time;
+
+        delete from warnings_data.warning_episode_chunks where partition_id = :partition_id;
+        return concat(:new_episodes, ' new episodes');
+    end;
+$$
+;
@@ -0,0 +1,32 @@
+-- stores the windows of a partition's chunk, in warnings_data.window_rule_chunks, in
+-- sensor_window_state, once the chunk's warning episodes were merged; called by the
+-- warning checks once per chunk, in the chunk's transaction
+create or replace procedure warnings_code.merge_window_state(partition_id int)
+returns varchar
+language sql
+as
+$$
+    begin
+        merge into warnings_data.sensor_window_state window_state
+            using (
+                select sensor_uuid, reading_time, state
+                from warnings_data.window_rule_chunks
+                where partition_id = :partition_id
+                    and state is not null
+            ) chunk
+            on window_state.sensor_uuid = chunk.sensor_uuid
+            when matched then update set
+                last_reading_time = chunk.reading_time,
+                state = parse_json(chunk.state)
+            when not matched then insert (sensor_uuid, last_reading_time, state)
+                values (chunk.sensor_uuid, chunk.reading_time, parse_json(chunk.state));
+
+        delete from warnings_data.window_rule_chunks where partition_id = :partition_id;
+        return 'window state merged';
+    exception
+        when other then
+            system$log_error('merge_window_state(): ' || sqlerrm);
+            raise;
+    end;
+$$
+;
@@ -0,0 +1,63 @@
+-- refreshes warnings_data.sensor_maintenance; called before every warning check, and
+-- only rewrites the table when the day changed, or the sensors' installation / service
+-- dates, types or their intervals did since the last refresh. Hashing the sensors is
+-- a scan of a table with a row per sensor, not per reading
+create or replace procedure warnings_code.refresh_sensor_maintenance()
+returns varchar
+language sql
+as
+$$
+    declare
+        sensors_hash NUMBER;
+        refreshed_hash NUMBER;
+        refreshed_on DATE;
+        refreshes INT default 0;
+        sensor_count INT default 0;
+    begin
+        select hash_agg(s.uuid, s.sensor_type_id, s.installation_date, s.last_service_date,
+                stv.service_interval_count, stv.service_interval_unit, stv.lifetime_count, stv.lifetime_unit)
+            into :sensors_hash
+            from REFERENCE('sensors') s
+            left join SHARED_CONTENT.SENSOR_TYPES_VIEW stv on s.sensor_type_id = stv.id;
+        select count(*), max(refreshed_on), max(sensors_hash)
+            into :refreshes, :refreshed_on, :refreshed_hash
+            from warnings_data.sensor_maintenance_refresh;
+        if (refreshes > 0 and refreshed_on = current_date() and refreshed_hash = sensors_hash) then
+            return 'sensor maintenance is up to date';
+        end if;
+
+        begin transaction;
+        delete from warnings_data.sensor_maintenance;
+        -- same precedence as the reading rules had: an expired lifetime beats a due service
+        insert into warnings_data.sensor_maintenance (sensor_uuid, next_service_date, next_replacement_date, maintenance_reason)
+            select
+                uuid,
+                next_service_date,
+                next_replacement_date,
+                case
+                    when next_replacement_date < current_date() then 'SENSOR_LIFETIME_EXPIRED'
+                    when next_service_date < current_date() then 'SENSOR_SERVICE_DUE'
+                end
+            from (
+                select
+                    s.uuid,
+                    warnings_code.add_interval(stv.service_interval_unit, stv.service_interval_count, s.last_service_date) as next_service_date,
+                    warnings_code.add_interval(stv.lifetime_unit, stv.lifetime_count, s.installation_date) as next_replacement_date
+                from REFERENCE('sensors') s
+                join SHARED_CONTENT.SENSOR_TYPES_VIEW stv on s.sensor_type_id = stv.id
+            );
+        sensor_count := SQLROWCOUNT;
+        delete from warnings_data.sensor_maintenance_refresh;
+        insert into warnings_data.sensor_maintenance_refresh (refreshed_on, sensors_hash)
+            values (current_date(), :sensors_hash);
+        commit;
+        system$log_info(concat('refresh_sensor_maintenance(): ', :sensor_count, ' sensors'));
+        return concat('refreshed the maintenance status of ', :sensor_count, ' sensors');
+    exception
+        when other then
+            rollback;
+            system$log_error('refresh_sensor_maintenance(): ' || sqlerrm);
+            raise;
+    end;
+$$
+;
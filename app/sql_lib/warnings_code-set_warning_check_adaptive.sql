@@ -0,0 +1,20 @@
+-- turns adaptive scheduling on or off; called from the UI. Turning it off goes back
+-- to running every minute
+create or replace procedure warnings_code.set_warning_check_adaptive(enable boolean)
+returns varchar
+language sql
+as
+$$
+    begin
+        update config_data.configuration set warning_check_adaptive = :enable;
+        if (not enable) then
+            call warnings_code.set_warning_check_interval(1);
+        end if;
+        return iff(enable, 'adaptive schedule enabled', 'checking every minute');
+    exception
+        when other then
+            system$log_error('set_warning_check_adaptive(): ' || sqlerrm);
+            return 'could not change the schedule: ' || sqlerrm;
+    end;
+$$
+;
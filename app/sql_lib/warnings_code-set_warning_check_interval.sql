@@ -0,0 +1,33 @@
+-- changes how often the warning check task runs; called by apply_warning_check_interval()
+-- when the schedule is adaptive, and when adaptive scheduling is turned off. It must not
+-- be called from inside the warning check's own task graph
+-- the root task can only be altered while it is suspended, so it is suspended and,
+-- if warning generation is enabled, resumed along with its dependents
+create or replace procedure warnings_code.set_warning_check_interval(interval_minutes int)
+returns varchar
+language sql
+as
+$$
+    declare
+        is_task_enabled BOOLEAN default false;
+        statement varchar;
+    begin
+        select enable_warning_generation_task into :is_task_enabled from config_data.configuration;
+        system$log_info(concat('set_warning_check_interval(): every ', :interval_minutes, ' minutes'));
+        update config_data.configuration set warning_check_interval_minutes = :interval_minutes;
+
+        alter task if exists warnings_data.check_warnings_every_minute suspend;
+        statement := 'alter task if exists warnings_data.check_warnings_every_minute set schedule = '''
+            || interval_minutes || ' minute''';
+        execute immediate :statement;
+        if (is_task_enabled) then
+            select system$task_dependents_enable('warnings_data.check_warnings_every_minute');
+        end if;
+        return concat('checking every ', :interval_minutes, ' minutes');
+    exception
+        when other then
+            system$log_error('set_warning_check_interval(): ' || sqlerrm);
+            return 'could not change the schedule: ' || sqlerrm;
+    end;
+$$
+;
@@ -0,0 +1,58 @@
+-- changes the number of partitions warnings are checked in; called from the UI
+-- partitions each have their own watermark, and those differ: before the readings are
+-- partitioned differently, every partition is caught up to the newest watermark, so
+-- the new partitions can all start from it without skipping or repeating a reading
+create or replace procedure warnings_code.set_warning_partition_count(new_partition_count int)
+returns varchar
+language sql
+as
+$$
+    declare
+        old_partition_count INT default 1;
+        is_task_enabled BOOLEAN default false;
+        cursor_rows INT default 0;
+        until_ts timestamp;
+        until_uuid varchar;
+    begin
+        if (new_partition_count < 1) then
+            return 'partition count must be at least 1';
+        end if;
+        select coalesce(warning_partition_count, 1), enable_warning_generation_task
+            into :old_partition_count, :is_task_enabled
+            from config_data.configuration;
+        system$log_info(concat('set_warning_partition_count(): ', :old_partition_count, ' -> ', :new_partition_count));
+        alter task if exists warnings_data.check_warnings_every_minute suspend;
+
+        select count(*) into :cursor_rows from warnings_data.warnings_reading_cursor;
+        if (cursor_rows > 0) then
+            call warnings_code.refresh_sensor_maintenance();
+            select last_reading_ts, coalesce(last_sensor_uuid, '') into :until_ts, :until_uuid
+                from warnings_data.warnings_reading_cursor
+                order by last_reading_ts desc, coalesce(last_sensor_uuid, '') desc
+                limit 1;
+            for partition_id in 0 to old_partition_count - 1 do
+                call warnings_code.check_warnings_partition(:partition_id, :old_partition_count, :until_ts, :until_uuid);
+            end for;
+            begin transaction;
+            delete from warnings_data.warnings_reading_cursor;
+            for partition_id in 0 to new_partition_count - 1 do
+                insert into warnings_data.warnings_reading_cursor (partition_id, last_reading_ts, last_sensor_uuid)
+                    values (:partition_id, :until_ts, :until_uuid);
+            end for;
+            commit;
+        end if;
+
+        update config_data.configuration set warning_partition_count = :new_partition_count;
+        call warnings_code.create_warning_check_task();
+        if (is_task_enabled) then
+            call warnings_code.update_warning_check_task_status(true);
+        end if;
+        return concat('checking warnings in ', :new_partition_count, ' partitions');
+    exception
+        when other then
+            rollback;
+            system$log_error('set_warning_partition_count(): ' || sqlerrm);
+            return 'could not change the partition count: ' || sqlerrm;
+    end;
+$$
+;
@@ -0,0 +1,36 @@
+-- replaces the window rules with `rules`, a JSON array of objects with the columns of
+-- config_data.window_rules; called from the UI. A sensor type's windows are kept: a
+-- longer window fills up over the next checks, and a shorter one is cut at the next check
+create or replace procedure warnings_code.set_window_rules(rules varchar)
+returns varchar
+language sql
+as
+$$
+    begin
+        begin transaction;
+        delete from config_data.window_rules;
+        insert into config_data.window_rules (sensor_type_id, rule, window_readings, threshold)
+            select
+                value:sensor_type_id::int,
+                upper(value:rule::varchar),
+                value:window_readings::int,
+                value:threshold::float
+            from table(flatten(input => parse_json(:rules)));
+        -- the windows of sensor types without rules any more are of no use
+        delete from warnings_data.sensor_window_state window_state
+            where not exists (
+                select 1
+                from reference('sensors') s
+                join config_data.window_rules wr on wr.sensor_type_id = s.sensor_type_id
+                where s.uuid = window_state.sensor_uuid
+            );
+        commit;
+        return 'window rules updated';
+    exception
+        when other then
+            rollback;
+            system$log_error('set_window_rules(): ' || sqlerrm);
+            return 'could not update the window rules: ' || sqlerrm;
+    end;
+$$
+;
@@ -1,5 +1,8 @@
 -- stored procedure to resume or suspend check_warnings_every_minute task
 -- this stored procedure will be called from the UI
+-- resuming goes through system$task_dependents_enable(), so the partition tasks that
+-- run after it are resumed too; suspending the root is enough to stop all of them.
+-- the daily archive_warnings_daily task is resumed and suspended with them
 create or replace procedure warnings_code.update_warning_check_task_status(enable boolean)
 returns varchar
 language sql
@@ -8,11 +11,13 @@ $$
     begin
         if (enable) then
             system$log_info('starting warning check task');
-            alter task if exists warnings_data.check_warnings_every_minute resume;
+            select system$task_dependents_enable('warnings_data.check_warnings_every_minute');
+            alter task if exists warnings_data.archive_warnings_daily resume;
             update config_data.configuration set enable_warning_generation_task = true;
         else
             system$log_info('stopping warning check task');
             alter task if exists warnings_data.check_warnings_every_minute suspend;
+            alter task if exists warnings_data.archive_warnings_daily suspend;
             update config_data.configuration set enable_warning_generation_task = false;
         end if;
     exception
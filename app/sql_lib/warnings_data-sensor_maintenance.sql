@@ -0,0 +1,20 @@
+-- one row per sensor: when it is next due for service and replacement, and the
+-- maintenance warning its readings get when no reading rule applies. These only
+-- depend on the sensor, its type and the date, so warnings_code.refresh_sensor_maintenance()
+-- works them out once a day (or when the sensors change) instead of
+-- check_warnings_partition() doing it for every reading
+create table if not exists warnings_data.sensor_maintenance (
+    sensor_uuid varchar not null,
+    next_service_date date,
+    next_replacement_date date,
+    maintenance_reason varchar
+);
+
+-- when sensor_maintenance was last refreshed, and the hash of the sensor data it was
+-- refreshed from
+create table if not exists warnings_data.sensor_maintenance_refresh (
+    refreshed_on date not null,
+    sensors_hash number
+);
+
+grant select on table warnings_data.sensor_maintenance to application role app_admin;
@@ -0,0 +1,22 @@
+-- one row per sensor with window rules: what its rules need to know about its readings
+-- so far (the last readings, as many as its longest rule looks back, and how many in
+-- a row were out of range), as of last_reading_time. The warning checks carry it over
+-- from one run to the next, so they never read a sensor's earlier readings again
+create table if not exists warnings_data.sensor_window_state (
+    sensor_uuid varchar not null,
+    last_reading_time timestamp,
+    state variant
+);
+
+-- a chunk's window rule results on their way into warning_episode_chunks and
+-- sensor_window_state: the readings that broke a rule, and each sensor's window after
+-- the chunk (in a row with a null reason); see merge_window_state()
+create table if not exists warnings_data.window_rule_chunks (
+    partition_id int,
+    sensor_uuid varchar,
+    reading_time timestamp,
+    reason varchar,
+    state varchar
+);
+
+grant select on table warnings_data.sensor_window_state to application role app_admin;
@@ -0,0 +1,11 @@
+-- one row per run of the warning check task graph: check_for_new_readings() records
+-- whether the run checked or skipped the partitions, finish_warning_check() when the
+-- run ended; the Configuration page sums up the skipped runs and the time they saved
+create table if not exists warnings_data.warning_check_runs (
+    started_at timestamp not null,
+    finished_at timestamp,
+    skipped boolean not null,
+    interval_minutes int
+);
+
+grant select on table warnings_data.warning_check_runs to application role app_admin;
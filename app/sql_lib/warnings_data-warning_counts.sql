@@ -0,0 +1,30 @@
+-- unacknowledged warning episodes per machine, sensor type and reason, kept up to date by
+-- check_warnings() and by the dashboard when warnings are acknowledged, so that
+-- the UI doesn't need to count the episodes on every page render
+create table if not exists warnings_data.warning_counts (
+    machine_uuid varchar,
+    sensor_type_id int,
+    reason varchar,
+    unacknowledged_count int not null
+);
+
+-- on upgrade, count the episodes we already have; on a fresh install the
+-- sensors reference isn't bound yet, but there are no warnings to count either
+execute immediate $$
+    begin
+        insert into warnings_data.warning_counts (machine_uuid, sensor_type_id, reason, unacknowledged_count)
+            select sensor.machine_uuid, sensor.sensor_type_id, warning.reason, count(*)
+            from warnings_data.warning_episodes warning
+            inner join reference('SENSORS') sensor
+                on sensor.uuid = warning.sensor_uuid
+            where warning.acknowledged = false
+                and not exists (select 1 from warnings_data.warning_counts)
+            group by 1, 2, 3;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+grant select on table warnings_data.warning_counts to application role app_admin;
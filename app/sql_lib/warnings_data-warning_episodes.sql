@@ -0,0 +1,81 @@
+-- warnings are stored as episodes: the consecutive readings of a sensor that got the
+-- same warning, in one row with their first and last reading_time, count and range.
+-- a sensor's newest episode stays open while its readings keep getting that warning,
+-- and the warning checks extend it instead of adding a row per reading; acknowledging
+-- an episode closes it, so a sensor that is still out of range starts a new one
+create table if not exists warnings_data.warning_episodes (
+    sensor_uuid varchar,
+    reason varchar,
+    first_reading_time timestamp,
+    last_reading_time timestamp,
+    reading_count int,
+    min_reading int,
+    max_reading int,
+    is_open boolean default false,
+    acknowledged boolean default false,
+    created_at timestamp default current_timestamp()
+);
+
+-- a chunk of readings of one partition, compacted into runs of the same reason (or of
+-- no warning) per sensor, on its way into warning_episodes; see merge_warning_episodes()
+create table if not exists warnings_data.warning_episode_chunks (
+    partition_id int,
+    sensor_uuid varchar,
+    reason varchar,
+    first_reading_time timestamp,
+    last_reading_time timestamp,
+    reading_count int,
+    min_reading int,
+    max_reading int,
+    is_first boolean,
+    is_last boolean
+);
+
+-- on upgrade, compact the per-reading warnings written before episodes, once: warnings
+-- of a sensor in a row with the same reason and acknowledgement become one closed
+-- episode. warning_counts is emptied, so warning_counts.sql recounts it from episodes
+execute immediate $$
+    declare
+        episode_rows INT default 0;
+    begin
+        select count(*) into :episode_rows from warnings_data.warning_episodes;
+        if (episode_rows = 0) then
+            insert into warnings_data.warning_episodes (
+                sensor_uuid, reason, first_reading_time, last_reading_time, reading_count,
+                min_reading, max_reading, is_open, acknowledged
+            )
+                select sensor_uuid, reason, min(reading_time), max(reading_time), count(*),
+                    min(reading), max(reading), false, acknowledged
+                from (
+                    select
+                        sensor_uuid, reason, reading, reading_time, acknowledged,
+                        row_number() over (partition by sensor_uuid order by reading_time)
+                            - row_number() over (partition by sensor_uuid, reason, acknowledged order by reading_time) as run
+                    from warnings_data.warnings
+                )
+                group by sensor_uuid, reason, acknowledged, run;
+            delete from warnings_data.warning_counts;
+        end if;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+-- every dashboard query filters on acknowledged and a range of last_reading_time;
+-- clustered by both (by day, to keep reclustering cheap), the unacknowledged episodes
+-- the dashboard lists are in a few micro-partitions of their own, however scattered
+-- over time the acknowledgements were
+execute immediate $$
+    begin
+        alter table warnings_data.warning_episodes
+            cluster by (acknowledged, to_date(last_reading_time));
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+grant select on table warnings_data.warning_episodes to application role app_admin;
@@ -0,0 +1,18 @@
+-- acknowledged warning episodes older than warning_retention_days, moved out of
+-- warning_episodes by warnings_code.archive_warnings() so that the dashboard's queries
+-- on unacknowledged episodes only scan recent data. Archived episodes are closed and
+-- acknowledged, so only what they were is kept; they are inserted in last_reading_time
+-- order, which keeps queries over a date range pruning micro-partitions without
+-- a clustering key. Episodes older than warning_archive_retention_days are purged
+create table if not exists warnings_data.warning_episodes_archive (
+    sensor_uuid varchar,
+    reason varchar,
+    first_reading_time timestamp,
+    last_reading_time timestamp,
+    reading_count int,
+    min_reading int,
+    max_reading int,
+    archived_at timestamp default current_timestamp()
+);
+
+grant select on table warnings_data.warning_episodes_archive to application role app_admin;
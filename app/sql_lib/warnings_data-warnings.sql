@@ -1,3 +1,6 @@
+-- one row per reading that got a warning, from before warnings were stored as episodes
+-- (see warnings_data-warning_episodes.sql); no longer written, and compacted into
+-- warning_episodes on upgrade
 create table if not exists warnings_data.warnings (
     sensor_uuid varchar,
     reading int,
@@ -1,6 +1,31 @@
 --This table keep track of what was the last reading that was processed for warnings.
+-- readings are processed in (reading_time, sensor_uuid) order, so the watermark is
+-- both: readings of other sensors with the same reading_time are never skipped.
+-- there is one row per partition of warnings_code.check_warnings_partition()
 create table if not exists warnings_data.warnings_reading_cursor (
     last_reading_ts timestamp not null
 );
 
+execute immediate $$
+    begin
+        alter table warnings_data.warnings_reading_cursor
+            add column last_sensor_uuid varchar;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
+execute immediate $$
+    begin
+        alter table warnings_data.warnings_reading_cursor
+            add column partition_id int default 0;
+    exception
+        when other then
+            return 1;
+    end;
+$$
+;
+
 grant select on table warnings_data.warnings_reading_cursor to application role app_admin;
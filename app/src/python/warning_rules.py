@@ -0,0 +1,301 @@
+"""
+Vectorized evaluation of the warning rules in warnings_code.check_warnings().
+
+The rules are evaluated over whole columns, so they can be unit-tested and profiled
+over a pandas DataFrame locally, and the same code runs inside Snowflake as the
+handler of warnings_code.check_warnings_vectorized().
+"""
+import datetime as dt
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from window_rules import evaluate_sensors
+
+SENSOR_READING_OUT_OF_RANGE = 'SENSOR_READING_OUT_OF_RANGE'
+SENSOR_NOT_SENDING_DATA = 'SENSOR_NOT_SENDING_DATA'
+SENSOR_LIFETIME_EXPIRED = 'SENSOR_LIFETIME_EXPIRED'
+SENSOR_SERVICE_DUE = 'SENSOR_SERVICE_DUE'
+
+# date parts accepted by warnings_code.add_interval()
+MONTHS_PER_UNIT = {'year': 12, 'quarter': 3, 'month': 1}
+DAYS_PER_UNIT = {'week': 7, 'day': 1}
+
+
+def add_interval(dates, units, counts) -> np.ndarray:
+    """
+    Column-wise warnings_code.add_interval(): adds `counts` `units` to each date.
+    Like Snowflake's dateadd(), month arithmetic clamps to the end of the month.
+    Returns datetime64[D], with NaT wherever an input is null or the unit unknown.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+    units = pd.Series(units, dtype=object).str.lower()
+    counts = pd.to_numeric(pd.Series(counts), errors='coerce').to_numpy(dtype=float)
+    result = np.full(len(dates), np.datetime64('NaT'), dtype='datetime64[D]')
+    valid = ~np.isnat(dates) & ~np.isnan(counts)
+
+    months_per_unit = units.map(MONTHS_PER_UNIT).to_numpy(dtype=float)
+    by_month = valid & ~np.isnan(months_per_unit)
+    if by_month.any():
+        from_dates = dates[by_month]
+        from_months = from_dates.astype('datetime64[M]')
+        day_of_month = (from_dates - from_months.astype('datetime64[D]')).astype(np.int64)
+        to_months = from_months + (counts[by_month] * months_per_unit[by_month]).astype(np.int64)
+        days_in_month = ((to_months + 1).astype('datetime64[D]') - to_months.astype('datetime64[D]')).astype(np.int64)
+        result[by_month] = to_months.astype('datetime64[D]') + np.minimum(day_of_month, days_in_month - 1)
+
+    days_per_unit = units.map(DAYS_PER_UNIT).to_numpy(dtype=float)
+    by_day = valid & ~np.isnan(days_per_unit)
+    if by_day.any():
+        result[by_day] = dates[by_day] + (counts[by_day] * days_per_unit[by_day]).astype(np.int64)
+
+    return result
+
+
+def add_interval_distinct(dates, units, counts) -> np.ndarray:
+    """
+    add_interval() evaluated once per distinct (date, unit, count); a batch repeats
+    the same few inputs for every reading of a sensor.
+    """
+    inputs = pd.DataFrame({'date': dates, 'unit': units, 'count': counts})
+    codes = inputs.groupby(['date', 'unit', 'count'], dropna=False, sort=False).ngroup().to_numpy()
+    distinct = inputs.drop_duplicates()
+    return add_interval(distinct['date'], distinct['unit'], distinct['count'])[codes]
+
+
+def maintenance_reasons(next_service_date, next_replacement_date, today: Optional[dt.date] = None) -> np.ndarray:
+    """
+    Column-wise warnings_data.sensor_maintenance.maintenance_reason: an expired lifetime
+    beats a due service, and None where neither applies.
+    """
+    today = np.datetime64(today or dt.date.today(), 'D')
+    next_service_date = pd.to_datetime(pd.Series(next_service_date)).to_numpy().astype('datetime64[D]')
+    next_replacement_date = pd.to_datetime(pd.Series(next_replacement_date)).to_numpy().astype('datetime64[D]')
+    return np.select(
+        [next_replacement_date < today, next_service_date < today],
+        [SENSOR_LIFETIME_EXPIRED, SENSOR_SERVICE_DUE],
+        default=None
+    )
+
+
+def evaluate_rules(reading, min_range, max_range, maintenance_reason) -> np.ndarray:
+    """
+    Returns the warning reason for each reading, or None where there is no warning.
+
+    Precedence is the same as check_warnings(): a reading that is out of range or
+    missing always wins over the sensor's maintenance reason. Null inputs compare
+    as false, like they do in SQL.
+    """
+    reading = pd.to_numeric(pd.Series(reading), errors='coerce').to_numpy(dtype=float)
+    min_range = pd.to_numeric(pd.Series(min_range), errors='coerce').to_numpy(dtype=float)
+    max_range = pd.to_numeric(pd.Series(max_range), errors='coerce').to_numpy(dtype=float)
+    maintenance_reason = pd.Series(maintenance_reason, dtype=object).to_numpy()
+
+    # comparisons against NaN are false, which is SQL's null semantics here
+    with np.errstate(invalid='ignore'):
+        out_of_range = (reading < min_range) | (reading > max_range)
+    reasons = np.where(pd.isna(maintenance_reason), None, maintenance_reason)
+    reasons[np.isnan(reading)] = SENSOR_NOT_SENDING_DATA
+    reasons[out_of_range] = SENSOR_READING_OUT_OF_RANGE
+    return reasons
+
+
+def evaluate(readings: pd.DataFrame, today: Optional[dt.date] = None) -> pd.Series:
+    """
+    Evaluates the rules over a frame shaped like check_warnings()' batch query:
+    READING, MIN_RANGE, MAX_RANGE and the sensor's MAINTENANCE_REASON, as
+    precomputed in warnings_data.sensor_maintenance. Without a MAINTENANCE_REASON
+    column, it is worked out from INSTALLATION_DATE, LAST_SERVICE_DATE,
+    SERVICE_INTERVAL_COUNT, SERVICE_INTERVAL_UNIT, LIFETIME_COUNT and LIFETIME_UNIT.
+    """
+    if 'MAINTENANCE_REASON' in readings:
+        maintenance_reason = readings['MAINTENANCE_REASON']
+    else:
+        maintenance_reason = maintenance_reasons(
+            add_interval_distinct(readings['LAST_SERVICE_DATE'], readings['SERVICE_INTERVAL_UNIT'], readings['SERVICE_INTERVAL_COUNT']),
+            add_interval_distinct(readings['INSTALLATION_DATE'], readings['LIFETIME_UNIT'], readings['LIFETIME_COUNT']),
+            today
+        )
+    reasons = evaluate_rules(readings['READING'], readings['MIN_RANGE'], readings['MAX_RANGE'], maintenance_reason)
+    return pd.Series(reasons, index=readings.index, name='REASON', dtype=object)
+
+
+EPISODE_COLUMNS = [
+    'SENSOR_UUID', 'REASON', 'FIRST_READING_TIME', 'LAST_READING_TIME', 'READING_COUNT',
+    'MIN_READING', 'MAX_READING', 'IS_FIRST', 'IS_LAST'
+]
+
+
+def compact_episodes(readings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compacts evaluated readings (SENSOR_UUID, READING_TIME, READING, REASON) into runs
+    of the same REASON per sensor, shaped like warnings_data.warning_episode_chunks.
+    Runs without a warning are kept, with a null REASON: they end a sensor's open episode.
+    """
+    if len(readings) == 0:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+    readings = readings.sort_values(['SENSOR_UUID', 'READING_TIME'], kind='stable')
+    sensor = readings['SENSOR_UUID'].to_numpy(dtype=object)
+    reason = readings['REASON'].to_numpy(dtype=object)
+    reading_time = readings['READING_TIME'].to_numpy()
+    reading = pd.to_numeric(readings['READING'], errors='coerce').to_numpy(dtype=float)
+
+    # readings are in order within each sensor, so a run is a stretch between boundaries;
+    # nulls are compared as '' so that readings without a warning form runs too
+    comparable_reason = np.where(pd.isna(reason), '', reason)
+    boundary = np.ones(len(readings), dtype=bool)
+    boundary[1:] = (sensor[1:] != sensor[:-1]) | (comparable_reason[1:] != comparable_reason[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(readings)) - 1
+    # fmin / fmax skip NaN, so a run of missing readings keeps a NaN range
+    with np.errstate(invalid='ignore'):
+        minimums = np.fmin.reduceat(reading, starts)
+        maximums = np.fmax.reduceat(reading, starts)
+
+    run_sensor = sensor[starts]
+    return pd.DataFrame({
+        'SENSOR_UUID': run_sensor,
+        'REASON': reason[starts],
+        'FIRST_READING_TIME': reading_time[starts],
+        'LAST_READING_TIME': reading_time[ends],
+        'READING_COUNT': ends - starts + 1,
+        'MIN_READING': minimums,
+        'MAX_READING': maximums,
+        'IS_FIRST': np.append(True, run_sensor[1:] != run_sensor[:-1]),
+        'IS_LAST': np.append(run_sensor[:-1] != run_sensor[1:], True),
+    })
+
+
+DEFAULT_BATCH_ROWS = 100_000
+DEFAULT_MAX_ROWS = 1_000_000
+
+# rows per insert_rows() statement, which keeps each bound JSON array well under
+# Snowflake's 16 MB limit for a bind value
+INSERT_BATCH_ROWS = 10_000
+
+EPISODE_CHUNK_TYPES = {
+    'PARTITION_ID': 'int', 'SENSOR_UUID': 'varchar', 'REASON': 'varchar',
+    'FIRST_READING_TIME': 'timestamp', 'LAST_READING_TIME': 'timestamp', 'READING_COUNT': 'int',
+    'MIN_READING': 'int', 'MAX_READING': 'int', 'IS_FIRST': 'boolean', 'IS_LAST': 'boolean',
+}
+WINDOW_CHUNK_TYPES = {
+    'PARTITION_ID': 'int', 'SENSOR_UUID': 'varchar', 'READING_TIME': 'timestamp', 'REASON': 'varchar',
+    'STATE': 'varchar',
+}
+
+
+def insert_rows(session, table: str, rows: pd.DataFrame, types: Dict[str, str]) -> None:
+    """
+    Inserts `rows` into `table`, casting each column to its type in `types`, as bound
+    JSON arrays of at most INSERT_BATCH_ROWS rows. Unlike session.write_pandas(), which
+    creates a temporary stage and file format, this runs no DDL, so it doesn't commit
+    the transaction it runs in.
+    """
+    columns = list(types)
+    values = ', '.join(f"value:{column}::{types[column]}" for column in columns)
+    for start in range(0, len(rows), INSERT_BATCH_ROWS):
+        batch = rows[columns].iloc[start:start + INSERT_BATCH_ROWS]
+        session.sql(
+            f"insert into {table} ({', '.join(columns)}) select {values} from table(flatten(input => parse_json(?)))",
+            params=[batch.to_json(orient='records', date_format='iso', date_unit='us')]
+        ).collect()
+
+
+def check_warnings(session, partition_id: int = 0, partition_count: int = 1) -> str:
+    """
+    Stored procedure handler; same partitioning, chunking and (reading_time, sensor_uuid)
+    watermark as check_warnings_partition(), committing each chunk's warning episodes with the watermark
+    """
+    session.sql("call warnings_code.refresh_sensor_maintenance()").collect()
+    cursor_rows = session.sql("""
+        select last_reading_ts, coalesce(last_sensor_uuid, '') as LAST_SENSOR_UUID
+        from warnings_data.warnings_reading_cursor
+        where partition_id = ?
+    """, params=[partition_id]).collect()
+    if cursor_rows:
+        cursor_ts, cursor_uuid = cursor_rows[0]['LAST_READING_TS'], cursor_rows[0]['LAST_SENSOR_UUID']
+    else:
+        cursor_ts, cursor_uuid = dt.datetime.now() - pd.DateOffset(years=1), ''
+    config = session.sql("""
+        select warning_check_batch_rows, warning_check_max_rows from config_data.configuration
+    """).collect()[0]
+    batch_rows = config['WARNING_CHECK_BATCH_ROWS'] or DEFAULT_BATCH_ROWS
+    max_rows = config['WARNING_CHECK_MAX_ROWS'] or DEFAULT_MAX_ROWS
+
+    processed_rows, warning_runs = 0, 0
+    while processed_rows < max_rows:
+        readings = session.sql("""
+            select s.uuid as SENSOR_UUID, sre.reading_time, sre.reading, stv.min_range, stv.max_range,
+                    sm.maintenance_reason, type_rules.rules, window_state.state
+                from reference('sensor_readings') sre
+                join reference('sensors') s on s.uuid = sre.sensor_uuid
+                join shared_content.sensor_types_view stv on s.sensor_type_id = stv.id
+                left join warnings_data.sensor_maintenance sm on sm.sensor_uuid = s.uuid
+                left join (
+                    select sensor_type_id, array_agg(object_construct(
+                        'RULE', rule, 'WINDOW_READINGS', window_readings, 'THRESHOLD', threshold
+                    )) as rules
+                    from config_data.window_rules
+                    group by sensor_type_id
+                ) type_rules on type_rules.sensor_type_id = s.sensor_type_id
+                left join warnings_data.sensor_window_state window_state on window_state.sensor_uuid = s.uuid
+                where sre.reading_time >= ?
+                    and (sre.reading_time > ? or sre.sensor_uuid > ?)
+                    and abs(hash(s.machine_uuid)) % ? = ?
+                order by sre.reading_time asc, sre.sensor_uuid asc
+                limit ?
+        """, params=[cursor_ts, cursor_ts, cursor_uuid, partition_count, partition_id, batch_rows]).to_pandas()
+        if len(readings) == 0:
+            break
+        chunk_end_ts, chunk_end_uuid = readings['READING_TIME'].iloc[-1], readings['SENSOR_UUID'].iloc[-1]
+
+        readings['REASON'] = evaluate(readings)
+        # a window rule's warning beats the reading's other warnings
+        window_reasons, window_states = evaluate_sensors(readings)
+        readings['REASON'] = window_reasons.where(window_reasons.notna(), readings['REASON'])
+        episodes = compact_episodes(readings)
+        episodes.insert(0, 'PARTITION_ID', partition_id)
+
+        session.sql("begin transaction").collect()
+        try:
+            # rows a failed run left behind would otherwise be merged along with this chunk's
+            session.sql(
+                "delete from warnings_data.warning_episode_chunks where partition_id = ?", params=[partition_id]
+            ).collect()
+            insert_rows(session, 'warnings_data.warning_episode_chunks', episodes, EPISODE_CHUNK_TYPES)
+            session.sql("call warnings_code.merge_warning_episodes(?)", params=[partition_id]).collect()
+            if len(window_states):
+                window_states = window_states.rename(columns={'LAST_READING_TIME': 'READING_TIME'})
+                window_states.insert(0, 'PARTITION_ID', partition_id)
+                window_states.insert(3, 'REASON', None)
+                # as with the episodes: a failed run's windows must not be carried over
+                session.sql(
+                    "delete from warnings_data.window_rule_chunks where partition_id = ?", params=[partition_id]
+                ).collect()
+                insert_rows(session, 'warnings_data.window_rule_chunks', window_states, WINDOW_CHUNK_TYPES)
+                session.sql("call warnings_code.merge_window_state(?)", params=[partition_id]).collect()
+            session.sql(
+                "call warnings_code.count_new_warnings(?, ?, ?, ?, ?, ?)",
+                params=[cursor_ts, cursor_uuid, chunk_end_ts, chunk_end_uuid, partition_id, partition_count]
+            ).collect()
+            session.sql(
+                "delete from warnings_data.warnings_reading_cursor where partition_id = ?", params=[partition_id]
+            ).collect()
+            session.sql(
+                "insert into warnings_data.warnings_reading_cursor (partition_id, last_reading_ts, last_sensor_uuid)"
+                " values (?, ?, ?)",
+                params=[partition_id, chunk_end_ts, chunk_end_uuid]
+            ).collect()
+            session.sql("commit").collect()
+        except Exception:
+            # the chunk's episodes, counts and watermark go together, or not at all
+            session.sql("rollback").collect()
+            raise
+        cursor_ts, cursor_uuid = chunk_end_ts, chunk_end_uuid
+
+        processed_rows += len(readings)
+        warning_runs += int(episodes['REASON'].notna().sum())
+        if len(readings) < batch_rows:
+            break
+    return f"{warning_runs} runs of warnings in {processed_rows} readings, cursor at {cursor_ts} / {cursor_uuid}"
@@ -0,0 +1,227 @@
+"""
+Rolling-window warning rules, configured per sensor type in config_data.window_rules,
+on top of the fixed min / max ranges of warning_rules.py:
+
+- RATE_OF_CHANGE: a reading differs from the one `window_readings` readings before it
+  by more than `threshold`
+- ROLLING_ZSCORE: a reading is more than `threshold` standard deviations away from the
+  mean of the `window_readings` readings before it
+- CONSECUTIVE_OUT_OF_RANGE: a reading is the `window_readings`th (or later) out of range
+  reading in a row
+
+The rules are evaluated per sensor, over its readings in time order. What a sensor's
+rules need to know about its earlier readings (its window) is carried over from one
+warning check to the next in warnings_data.sensor_window_state, so a check only reads
+its new readings, however long the windows are. The same code runs inside Snowflake
+as the handler of the warnings_code.evaluate_window_rules() table function.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+RATE_OF_CHANGE = 'RATE_OF_CHANGE'
+ROLLING_ZSCORE = 'ROLLING_ZSCORE'
+CONSECUTIVE_OUT_OF_RANGE = 'CONSECUTIVE_OUT_OF_RANGE'
+
+# the warning each rule gives, highest precedence first; any of them beats the reading's
+# warning_rules.evaluate() reason, as it says more about the same reading
+RULE_REASONS = {
+    CONSECUTIVE_OUT_OF_RANGE: 'SENSOR_READING_OUT_OF_RANGE_REPEATEDLY',
+    ROLLING_ZSCORE: 'SENSOR_READING_ANOMALOUS',
+    RATE_OF_CHANGE: 'SENSOR_READING_CHANGING_TOO_FAST',
+}
+
+# the table function's arguments, in order, and what it returns
+INPUT_COLUMNS = ['READING_TIME', 'READING', 'MIN_RANGE', 'MAX_RANGE', 'RULES', 'STATE']
+OUTPUT_COLUMNS = ['READING_TIME', 'REASON', 'STATE']
+
+
+@dataclass
+class WindowRule:
+    rule: str
+    window_readings: int
+    threshold: Optional[float] = None
+
+
+@dataclass
+class WindowState:
+    """
+    A sensor's window: its latest readings, oldest first, as many as its longest rule
+    looks back, and how many readings in a row it has been out of range. The rolling
+    sums are rebuilt from the readings on every check, so they never drift.
+    """
+    readings: List[float] = field(default_factory=list)
+    out_of_range_run: int = 0
+
+    def to_json(self) -> str:
+        return json.dumps({'readings': self.readings, 'out_of_range_run': self.out_of_range_run})
+
+    @classmethod
+    def from_variant(cls, value: Any) -> 'WindowState':
+        """ From a VARIANT, which Snowflake hands over as a JSON string; empty when there is none yet """
+        value = _from_json(value)
+        if not value:
+            return cls()
+        return cls([float(reading) for reading in value.get('readings', [])], int(value.get('out_of_range_run', 0)))
+
+
+def _from_json(value: Any) -> Any:
+    if isinstance(value, str):
+        return json.loads(value)
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else value
+
+
+def parse_rules(value: Any) -> List[WindowRule]:
+    """ A sensor type's rules, as aggregated from config_data.window_rules; unknown rules are ignored """
+    return [
+        WindowRule(
+            rule['RULE'],
+            int(rule['WINDOW_READINGS']),
+            float(rule['THRESHOLD']) if rule.get('THRESHOLD') is not None else None
+        )
+        for rule in (_from_json(value) or [])
+        if rule.get('RULE') in RULE_REASONS and int(rule.get('WINDOW_READINGS') or 0) > 0
+    ]
+
+
+def window_size(rules: List[WindowRule]) -> int:
+    """ The readings a sensor's window holds: enough for the rule that looks back the furthest """
+    return max((rule.window_readings for rule in rules if rule.rule != CONSECUTIVE_OUT_OF_RANGE), default=0)
+
+
+def rolling_previous_sums(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ The sum and the sum of squares of the `window` values before each value; NaN while there are fewer """
+    sums = np.concatenate([[0.0], np.cumsum(values)])
+    squares = np.concatenate([[0.0], np.cumsum(values * values)])
+    positions = np.arange(len(values))
+    has_window = positions >= window
+    start = np.where(has_window, positions - window, 0)
+    window_sums = np.where(has_window, sums[positions] - sums[start], np.nan)
+    window_squares = np.where(has_window, squares[positions] - squares[start], np.nan)
+    return window_sums, window_squares
+
+
+def rule_matches(rule: WindowRule, values: np.ndarray, history: int, out_of_range_runs: np.ndarray) -> np.ndarray:
+    """ Whether each of the new values (values[history:]) breaks `rule`; values[:history] is the window """
+    new = values[history:]
+    if rule.rule == CONSECUTIVE_OUT_OF_RANGE:
+        return out_of_range_runs >= rule.window_readings
+    if rule.threshold is None:
+        return np.zeros(len(new), dtype=bool)
+
+    window = rule.window_readings
+    positions = np.arange(history, len(values))
+    if rule.rule == RATE_OF_CHANGE:
+        has_previous = positions >= window
+        previous = values[np.where(has_previous, positions - window, 0)]
+        return has_previous & (np.abs(new - previous) > rule.threshold)
+
+    # ROLLING_ZSCORE, with the population standard deviation of the previous readings
+    window_sums, window_squares = rolling_previous_sums(values, window)
+    mean = window_sums[history:] / window
+    variance = np.maximum(window_squares[history:] / window - mean * mean, 0)
+    std = np.sqrt(variance)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # a window without a spread (or not full yet) has no z-score: NaN compares false
+        zscore = np.where(std > 0, np.abs(new - mean) / std, np.nan)
+        return zscore > rule.threshold
+
+
+def evaluate_window(
+    reading, min_range: Optional[float], max_range: Optional[float], rules: List[WindowRule], state: WindowState
+) -> Tuple[np.ndarray, WindowState]:
+    """
+    Evaluates one sensor's new readings, in time order, against its rules, continuing
+    from its window. Returns the reason for each reading (None where no rule applies)
+    and the window to carry over to the next check. Null readings are left out of
+    the windows, like a reading that never came.
+    """
+    reading = pd.to_numeric(pd.Series(reading), errors='coerce').to_numpy(dtype=float)
+    reasons = np.full(len(reading), None, dtype=object)
+    sent = ~np.isnan(reading)
+    new = reading[sent]
+    history = np.asarray(state.readings, dtype=float)
+    values = np.concatenate([history, new])
+
+    # how many readings in a row each new reading makes out of range, counting from the window's
+    min_range = np.nan if min_range is None else float(min_range)
+    max_range = np.nan if max_range is None else float(max_range)
+    with np.errstate(invalid='ignore'):
+        out_of_range = (new < min_range) | (new > max_range)
+    positions = np.arange(len(new))
+    last_in_range = np.maximum.accumulate(np.where(out_of_range, -1, positions)) if len(new) else positions
+    out_of_range_runs = np.where(last_in_range < 0, positions + 1 + state.out_of_range_run, positions - last_in_range)
+
+    # lowest precedence first, so that a rule with higher precedence overwrites it
+    new_reasons = np.full(len(new), None, dtype=object)
+    for rule_name in reversed(list(RULE_REASONS)):
+        for rule in rules:
+            if rule.rule == rule_name:
+                new_reasons[rule_matches(rule, values, len(history), out_of_range_runs)] = RULE_REASONS[rule_name]
+    reasons[sent] = new_reasons
+
+    size = window_size(rules)
+    carried = WindowState(
+        values[max(len(values) - size, 0):].tolist() if size else [],
+        int(out_of_range_runs[-1]) if len(new) else state.out_of_range_run
+    )
+    return reasons, carried
+
+
+class WindowRulesHandler:
+    """
+    Handler of the warnings_code.evaluate_window_rules() table function, partitioned by
+    sensor: returns the readings that broke a rule, and a last row with the sensor's
+    window as it stands after them
+    """
+
+    def end_partition(self, readings: pd.DataFrame) -> pd.DataFrame:
+        readings = readings.set_axis(INPUT_COLUMNS, axis=1).sort_values('READING_TIME', kind='stable')
+        if len(readings) == 0:
+            return pd.DataFrame(columns=OUTPUT_COLUMNS)
+        first = readings.iloc[0]
+        reasons, state = evaluate_window(
+            readings['READING'], first['MIN_RANGE'], first['MAX_RANGE'],
+            parse_rules(first['RULES']), WindowState.from_variant(first['STATE'])
+        )
+        warned = reasons != None  # noqa: E711 (element-wise)
+        return pd.concat([
+            pd.DataFrame({
+                'READING_TIME': readings['READING_TIME'].to_numpy()[warned],
+                'REASON': reasons[warned],
+                'STATE': None,
+            }),
+            pd.DataFrame({'READING_TIME': [readings['READING_TIME'].iloc[-1]], 'REASON': [None], 'STATE': [state.to_json()]}),
+        ], ignore_index=True)
+
+    end_partition._sf_vectorized_input = pd.DataFrame
+
+
+def evaluate_sensors(readings: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    The table function over a whole batch, for the pandas warning check: readings of
+    any number of sensors with SENSOR_UUID and the table function's arguments as
+    columns. Returns the reason of every reading, aligned with `readings` (None where
+    no rule applies, or the sensor has no rules), and the windows to carry over, as
+    SENSOR_UUID, LAST_READING_TIME and STATE.
+    """
+    reasons = pd.Series([None] * len(readings), index=readings.index, name='WINDOW_REASON', dtype=object)
+    states: List[Dict[str, Any]] = []
+    has_rules = readings['RULES'].notna()
+    for sensor_uuid, sensor_readings in readings[has_rules].groupby('SENSOR_UUID', sort=False):
+        sensor_readings = sensor_readings.sort_values('READING_TIME', kind='stable')
+        first = sensor_readings.iloc[0]
+        sensor_reasons, state = evaluate_window(
+            sensor_readings['READING'], first['MIN_RANGE'], first['MAX_RANGE'],
+            parse_rules(first['RULES']), WindowState.from_variant(first['STATE'])
+        )
+        reasons.loc[sensor_readings.index] = sensor_reasons
+        states.append({
+            'SENSOR_UUID': sensor_uuid,
+            'LAST_READING_TIME': sensor_readings['READING_TIME'].iloc[-1],
+            'STATE': state.to_json(),
+        })
+    return reasons, pd.DataFrame(states, columns=['SENSOR_UUID', 'LAST_READING_TIME', 'STATE'])
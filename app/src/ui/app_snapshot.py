@@ -0,0 +1,82 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import streamlit as st
+from snowflake.snowpark import Session
+
+from chairlift_data import Machine, SensorType, get_machines, get_sensor_types
+from query_scheduler import QueryScheduler
+from references import Reference
+
+SNAPSHOT_KEY = 'app_snapshot'
+
+@dataclass
+class AppSnapshot:
+    """
+    What every page needs to know about the app before it renders anything: whether
+    setup is finished, and the state the pages' filters and settings start from.
+    Loaded once per session, the machines and sensor types when a page first asks
+    for them; only the actions that change it invalidate it.
+    """
+    is_first_time_setup_dismissed: bool
+    is_warning_task_enabled: bool
+    is_app_admin: bool
+    references: List[Reference] = field(default_factory=list)
+    machines: Optional[List[Machine]] = None
+    sensor_types: Optional[List[SensorType]] = None
+    # machines / sensor types being loaded by prefetch_snapshot_lists()
+    pending: Dict[str, Future] = field(default_factory=dict, repr=False)
+
+    @property
+    def has_unbound_references(self) -> bool:
+        return not self.references or any(not ref.bound_alias for ref in self.references)
+
+def load_app_snapshot(session: Session) -> AppSnapshot:
+    config = session.sql(f"""
+        select
+            is_first_time_setup_dismissed,
+            enable_warning_generation_task,
+            is_application_role_in_session('APP_ADMIN') as is_app_admin
+        from config_data.configuration
+    """).collect()[0]
+    # first-time setup reads the references itself, as they get bound
+    return AppSnapshot(
+        bool(config['IS_FIRST_TIME_SETUP_DISMISSED']),
+        bool(config['ENABLE_WARNING_GENERATION_TASK']),
+        bool(config['IS_APP_ADMIN'])
+    )
+
+def get_app_snapshot(session: Session) -> AppSnapshot:
+    """ This session's snapshot, loading it if it was never loaded or has been invalidated """
+    if SNAPSHOT_KEY not in st.session_state:
+        st.session_state[SNAPSHOT_KEY] = load_app_snapshot(session)
+    return st.session_state[SNAPSHOT_KEY]
+
+def invalidate_app_snapshot():
+    st.session_state.pop(SNAPSHOT_KEY, None)
+
+SNAPSHOT_LISTS: Dict[str, Callable[[Session], list]] = {
+    'machines': get_machines,
+    'sensor_types': get_sensor_types,
+}
+
+def prefetch_snapshot_lists(session: Session, queries: QueryScheduler):
+    """ Starts loading the machines and sensor types the snapshot doesn't hold yet, alongside a page's queries """
+    snapshot = get_app_snapshot(session)
+    for name, load in SNAPSHOT_LISTS.items():
+        if getattr(snapshot, name) is None and name not in snapshot.pending:
+            snapshot.pending[name] = queries.submit(load, session)
+
+def _get_snapshot_list(session: Session, name: str) -> list:
+    snapshot = get_app_snapshot(session)
+    if getattr(snapshot, name) is None:
+        pending = snapshot.pending.pop(name, None)
+        setattr(snapshot, name, pending.result() if pending else SNAPSHOT_LISTS[name](session))
+    return getattr(snapshot, name)
+
+def get_snapshot_machines(session: Session) -> List[Machine]:
+    return _get_snapshot_list(session, 'machines')
+
+def get_snapshot_sensor_types(session: Session) -> List[SensorType]:
+    return _get_snapshot_list(session, 'sensor_types')
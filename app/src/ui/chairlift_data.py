@@ -2,14 +2,14 @@ from dataclasses import dataclass
 from typing import List
 from snowflake.snowpark import Session
 
-import streamlit as st
+from query_stats import cache_data
 
 @dataclass
 class Machine:
     uuid: str
     name: str
 
-@st.cache_data
+@cache_data
 def get_machines(_session: Session) -> List[Machine]:
     machine_tuples = _session.sql(f"""
         select UUID, NAME from reference('MACHINES')
@@ -23,7 +23,7 @@ class SensorType:
     min_range: float
     max_range: float
 
-@st.cache_data
+@cache_data
 def get_sensor_types(_session: Session) -> List[SensorType]:
     sensor_type_tuples = _session.sql(f"""
         select ID, NAME, MIN_RANGE, MAX_RANGE
@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterable
+import gzip
+import tempfile
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import streamlit as st
+from snowflake.snowpark import DataFrame
+from snowflake.snowpark.types import BinaryType, BooleanType, ByteType, DataType, DateType, DecimalType, \
+    DoubleType, FloatType, IntegerType, LongType, ShortType, StructType, TimestampType
+
+@dataclass(frozen=True)
+class ExportFormat:
+    extension: str
+    mime: str
+
+EXPORT_FORMATS = {
+    'Parquet': ExportFormat('parquet', 'application/vnd.apache.parquet'),
+    'CSV (gzip)': ExportFormat('csv.gz', 'application/gzip'),
+}
+
+# the Arrow types query results of each Snowpark type can be written as; anything else as text
+ARROW_TYPES = [
+    ((ByteType, ShortType, IntegerType, LongType), pa.int64()),
+    ((FloatType, DoubleType), pa.float64()),
+    ((BooleanType,), pa.bool_()),
+    ((TimestampType,), pa.timestamp('ns')),
+    ((DateType,), pa.date32()),
+    ((BinaryType,), pa.binary()),
+]
+
+def arrow_type(datatype: DataType) -> pa.DataType:
+    if isinstance(datatype, DecimalType):
+        return pa.int64() if datatype.scale == 0 else pa.float64()
+    for datatypes, arrow in ARROW_TYPES:
+        if isinstance(datatype, datatypes):
+            return arrow
+    return pa.string()
+
+def arrow_schema(schema: StructType) -> pa.Schema:
+    """ The Arrow schema of a query's result, from its Snowpark schema """
+    return pa.schema([(field.name, arrow_type(field.datatype)) for field in schema.fields])
+
+class BatchWriter:
+    """ Writes Arrow tables with the same schema one after the other, compressed, into a file """
+
+    def __init__(self, export_format: str, sink: BinaryIO, schema: pa.Schema):
+        self.schema = schema
+        if EXPORT_FORMATS[export_format].extension == 'parquet':
+            self.stream = None
+            self.writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            # closing a GzipFile leaves the file it writes to open, to be read back
+            self.stream = gzip.GzipFile(fileobj=sink, mode='wb')
+            self.writer = pa_csv.CSVWriter(self.stream, schema)
+
+    def write(self, table: pa.Table):
+        # a column that is all nulls in one batch can come back typed as null
+        self.writer.write_table(table.cast(self.schema) if table.schema != self.schema else table)
+
+    def close(self):
+        self.writer.close()
+        if self.stream is not None:
+            self.stream.close()
+
+def file_schema(batch: pa.Schema, declared: pa.Schema) -> pa.Schema:
+    """
+    The first batch's schema, except for columns that are all null in it, and so came
+    typed as null: those take the type the query declares, so later batches fit
+    """
+    return pa.schema([
+        declared.field(field.name) if pa.types.is_null(field.type) and field.name in declared.names else field
+        for field in batch
+    ])
+
+def write_batches(batches: Iterable[pa.Table], export_format: str, sink: BinaryIO, declared: pa.Schema) -> int:
+    """
+    Writes query results to `sink` batch by batch, as they are fetched, so only one
+    batch is ever in memory; returns the rows written. `declared` is the query's
+    schema; without any rows, the file only has its columns.
+    """
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = BatchWriter(export_format, sink, file_schema(batch.schema, declared))
+            writer.write(batch)
+            rows += batch.num_rows
+        if writer is None:
+            writer = BatchWriter(export_format, sink, declared)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def export_query(df: DataFrame, export_format: str) -> BinaryIO:
+    """ The whole result of `df`, in `export_format`, in a temporary file that is gone once closed """
+    sink = tempfile.TemporaryFile()
+    write_batches(df.to_arrow_batches(), export_format, sink, arrow_schema(df.schema))
+    sink.seek(0)
+    return sink
+
+def render_export(label: str, key: str, file_stem: str, query: Callable[[], DataFrame]):
+    """
+    A format picker and a download button for everything `query` returns; the query
+    only runs, and is only written out, when the button is clicked
+    """
+    col1, col2 = st.columns([0.3, 0.7], vertical_alignment='bottom')
+    export_format = col1.selectbox('Export as', list(EXPORT_FORMATS), key=f'{key}_format')
+    col2.download_button(
+        label,
+        data=lambda: export_query(query(), export_format),
+        file_name=f'{file_stem}.{EXPORT_FORMATS[export_format].extension}',
+        mime=EXPORT_FORMATS[export_format].mime,
+        on_click='ignore',
+        key=f'{key}_download'
+    )
@@ -0,0 +1,77 @@
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Optional, Tuple
+import datetime as dt
+import json
+
+from chairlift_data import Machine, SensorType
+
+@dataclass
+class SqlFilter:
+    """
+    WHERE predicates with their bind parameters, in the order they appear.
+
+    The query text only depends on which filters are in use, never on the values
+    selected, so identical logical filters produce byte-identical SQL and bind
+    values; that is what lets the warehouse reuse cached results and plans.
+    """
+    predicates: List[str] = field(default_factory=list)
+    params: List[Any] = field(default_factory=list)
+
+    def add(self, predicate: str, *params: Any) -> "SqlFilter":
+        self.predicates.append(predicate)
+        self.params.extend(params)
+        return self
+
+    def extend(self, other: "SqlFilter") -> "SqlFilter":
+        self.predicates.extend(other.predicates)
+        self.params.extend(other.params)
+        return self
+
+    def where_clause(self) -> str:
+        return f"where {' and '.join(self.predicates)}" if self.predicates else ""
+
+def array_bind(values: Iterable[Any]) -> str:
+    """ One bind value for a whole list; sorted so the same selection binds the same way """
+    return json.dumps(sorted(set(values)))
+
+def in_array(column: str, cast: str) -> str:
+    return f"{column} in (select value::{cast} from table(flatten(input => parse_json(?))))"
+
+def machine_filter(column: str, machines: Optional[List[Machine]]) -> SqlFilter:
+    if not machines:
+        return SqlFilter()
+    return SqlFilter().add(in_array(column, "varchar"), array_bind(machine.uuid for machine in machines))
+
+def sensor_type_filter(column: str, sensor_types: Optional[List[SensorType]]) -> SqlFilter:
+    if not sensor_types:
+        return SqlFilter()
+    return SqlFilter().add(in_array(column, "int"), array_bind(sensor_type.id for sensor_type in sensor_types))
+
+def half_open_range(
+    min_ts: Optional[dt.datetime],
+    max_ts: Optional[dt.datetime]
+) -> Tuple[Optional[dt.datetime], Optional[dt.datetime]]:
+    """
+    [min_ts, max_ts] as picked in the UI, to the second, becomes [start, end), with
+    end one second after max_ts, so no reading in the last second of the range is missed.
+    """
+    start = min_ts.replace(microsecond=0) if min_ts else None
+    end = max_ts.replace(microsecond=0) + dt.timedelta(seconds=1) if max_ts else None
+    return start, end
+
+def time_range_filter(
+    column: str,
+    start: Optional[dt.datetime],
+    end: Optional[dt.datetime]
+) -> SqlFilter:
+    """ start <= column < end; either bound may be None """
+    sql_filter = SqlFilter()
+    if start is not None:
+        sql_filter.add(f"{column} >= ?::timestamp", to_bind(start))
+    if end is not None:
+        sql_filter.add(f"{column} < ?::timestamp", to_bind(end))
+    return sql_filter
+
+def to_bind(timestamp: dt.datetime) -> str:
+    """ Timestamps are bound as ISO strings, so every driver binds them the same way """
+    return timestamp.isoformat(sep=' ')
@@ -1,6 +1,7 @@
 import streamlit as st
 from snowflake.snowpark import Session
 from references import get_app_references, render_reference_pane
+from app_snapshot import get_app_snapshot, invalidate_app_snapshot
 import snowflake.permissions as permission
 
 APP_CONFIG_TABLE = "config_data.configuration"
@@ -14,11 +15,7 @@ def set_is_first_time_setup_dismissed(session: Session, value):
     session.sql(f"""
         update {APP_CONFIG_TABLE} set is_first_time_setup_dismissed={value}
     """).collect()
-
-def get_is_first_time_setup_dismissed(session: Session):
-    return session.sql(f"""
-        select is_first_time_setup_dismissed from {APP_CONFIG_TABLE}
-    """).collect()[0]["IS_FIRST_TIME_SETUP_DISMISSED"]
+    invalidate_app_snapshot()
 
 def request_account_privileges():
     st.caption(f"The following privileges are needed")
@@ -31,7 +28,11 @@ def render(session: Session):
         Follow the instructions below to set up your application.
         Once you have completed the steps, you will be able to continue to the main dashboard.
     """)
-    for ref in get_app_references(session):
+    snapshot = get_app_snapshot(session)
+    # references are bound in a dialog outside of the app: read them again until they all are
+    if snapshot.has_unbound_references:
+        snapshot.references = get_app_references(session)
+    for ref in snapshot.references:
         render_reference_pane(ref)
 
         # don't overwhelm the user with multiple actions to take
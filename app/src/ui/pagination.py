@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional
+import datetime as dt
+
+import pandas as pd
+import streamlit as st
+
+from filter_sql import SqlFilter, to_bind
+
+PAGE_SIZES = [20, 50, 100, 500]
+
+@dataclass(frozen=True)
+class PageKey:
+    """
+    Position of a row in the (reading_time desc, machine_uuid, sensor_name) order
+    that both the warnings list and the raw readings table are sorted by.
+    """
+    reading_time: dt.datetime
+    machine_uuid: str
+    sensor_name: str
+
+def after_key_filter(
+    key: PageKey,
+    reading_time_column: str,
+    machine_uuid_column: str,
+    sensor_name_column: str
+) -> SqlFilter:
+    """
+    Rows strictly after `key`. Paging with this instead of an offset means the
+    warehouse never sorts or skips the rows of the pages before this one. It still
+    scans the micro-partitions that the filter can't prune, so a deep page costs
+    about what the first one does, not less.
+    """
+    reading_time = to_bind(pd.Timestamp(key.reading_time).to_pydatetime())
+    return SqlFilter().add(
+        f"""(
+        {reading_time_column} < ?::timestamp
+        or ({reading_time_column} = ?::timestamp and (
+            {machine_uuid_column} > ?
+            or ({machine_uuid_column} = ? and {sensor_name_column} > ?)
+        ))
+    )""",
+        reading_time, reading_time, key.machine_uuid, key.machine_uuid, key.sensor_name
+    )
+
+class Pager:
+    """
+    Next / previous paging over a keyset-ordered query, for a single list on a page.
+
+    The start key of every page we've visited is kept in session state, so going back
+    is as cheap as going forward. Page queries should fetch `page_size + 1` rows;
+    the extra row only tells us whether there is a next page.
+    """
+
+    def __init__(self, key: str, filters: Any):
+        self.key = key
+        state = st.session_state.setdefault(f"{key}_pager", {'filters': None, 'page_starts': [None]})
+        # any change to the filters starts over from the first page
+        if state['filters'] != filters:
+            state['filters'] = filters
+            state['page_starts'] = [None]
+        self.page_starts: List[Optional[PageKey]] = state['page_starts']
+        self.page_size: int = st.session_state.get(f"{key}_page_size", PAGE_SIZES[0])
+
+    @property
+    def after(self) -> Optional[PageKey]:
+        return self.page_starts[-1]
+
+    def current_page(self, rows: pd.DataFrame, reading_time_column: str) -> pd.DataFrame:
+        """ Takes the rows of a page query, and returns those that belong on the page """
+        self.next_start: Optional[PageKey] = None
+        if len(rows) > self.page_size:
+            last = rows.iloc[self.page_size - 1]
+            self.next_start = PageKey(last[reading_time_column], last['MACHINE_UUID'], last['SENSOR_NAME'])
+        return rows.head(self.page_size)
+
+    def next_page(self):
+        self.page_starts.append(self.next_start)
+
+    def previous_page(self):
+        self.page_starts.pop()
+
+    def first_page(self):
+        del self.page_starts[1:]
+
+    def render_controls(self):
+        col1, col2, col3, col4 = st.columns([0.15, 0.15, 0.4, 0.3])
+        col1.button(
+            "← Previous",
+            on_click=self.previous_page,
+            disabled=len(self.page_starts) == 1,
+            key=f"{self.key}_previous"
+        )
+        col2.button(
+            "Next →",
+            on_click=self.next_page,
+            disabled=self.next_start is None,
+            key=f"{self.key}_next"
+        )
+        col3.caption(f"Page {len(self.page_starts)}")
+        col4.selectbox(
+            'Rows per page',
+            options=PAGE_SIZES,
+            key=f"{self.key}_page_size",
+            on_change=self.first_page
+        )
@@ -0,0 +1,52 @@
+from typing import List, Sequence
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from snowflake.snowpark import DataFrame
+
+def to_compact_pandas(
+    df: DataFrame,
+    categories: Sequence[str] = (),
+    integers: Sequence[str] = (),
+    floats: Sequence[str] = ()
+) -> pd.DataFrame:
+    """
+    Materializes a query result with compact dtypes, instead of .to_pandas():
+    - the result is fetched as Arrow record batches, each converted to pandas in turn
+    - `categories`: repeated text columns (names, statuses, reasons) become categoricals
+    - `integers` / `floats`: downcast to the smallest dtype that holds every value
+    - timestamps stay datetime64; format them for display in the UI, not the query
+    """
+    # only one Arrow batch is held at a time: each is dropped once converted. The
+    # converted frames are all kept, as the result needs every row, and are compact
+    # already (dictionary-encoded categories), so they cost about what the result does
+    frames = []
+    for batch in df.to_arrow_batches():
+        for column in categories:
+            index = batch.schema.get_field_index(column)
+            batch = batch.set_column(index, column, batch.column(column).dictionary_encode())
+        frames.append(batch.to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=df.schema.names)
+
+    result = concat_compact(frames) if len(frames) > 1 else frames[0]
+    # the batches' frames were copied into the result; don't keep both while downcasting
+    del frames
+    for column in integers:
+        values = pd.to_numeric(result[column], downcast='integer')
+        if values.dtype.kind == 'f':
+            # nulls came back as NaN; keep them as <NA> in a nullable integer instead
+            values = pd.to_numeric(values.astype('Int64'), downcast='integer')
+        result[column] = values
+    for column in floats:
+        result[column] = pd.to_numeric(result[column], downcast='float')
+    return result
+
+def concat_compact(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """ pd.concat() that keeps categoricals categorical when their categories differ """
+    result = pd.concat(frames, ignore_index=True)
+    for column in frames[0].columns:
+        columns = [frame[column] for frame in frames]
+        if all(isinstance(c.dtype, pd.CategoricalDtype) for c in columns):
+            result[column] = union_categoricals(columns)
+    return result
@@ -0,0 +1,65 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from snowflake.snowpark import DataFrame
+
+# queries a page runs at once; a page has a handful that don't depend on each other
+MAX_WORKERS = 4
+
+class PendingResult:
+    """ A query that was submitted, and `transform`ed the first time its result is asked for """
+
+    def __init__(self, job: Any, transform: Optional[Callable[[Any], Any]] = None):
+        self._job = job
+        self._transform = transform
+        self._done = False
+        self._result = None
+
+    def result(self) -> Any:
+        if not self._done:
+            result = self._job.result()
+            self._result = self._transform(result) if self._transform else result
+            self._done = True
+        return self._result
+
+class QueryScheduler:
+    """
+    Starts a page's independent queries up front, so that they run on the warehouse
+    at the same time, and hands out their results when the widgets that show them are
+    rendered: a page then takes about as long as its slowest query, rather than the
+    sum of them all.
+
+    Plain queries are submitted as Snowpark async jobs. Page functions that run
+    their own queries, and may answer from a cache without running any, are run on
+    a worker thread instead, which can use Streamlit's caches like the page can.
+
+    Each scheduler has worker threads of its own, so one session's page never waits
+    for another's queries. Use it as a context manager around the page's render:
+    the threads are let go once it's drawn.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or MAX_WORKERS, thread_name_prefix='page_queries')
+
+    def __enter__(self) -> 'QueryScheduler':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        # a page has taken every result it submitted by the time it's drawn
+        self.executor.shutdown(wait=False)
+
+    def collect(self, df: DataFrame, transform: Optional[Callable[[list], Any]] = None) -> PendingResult:
+        return PendingResult(df.collect_nowait(), transform)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        ctx = get_script_run_ctx()
+
+        def run():
+            add_script_run_ctx(ctx=ctx)
+            return func(*args, **kwargs)
+
+        return self.executor.submit(run)
@@ -0,0 +1,284 @@
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from snowflake.snowpark import Session
+
+# durations kept per call site, for its p50 / p95
+HISTOGRAM_SIZE = 500
+
+# recent queries kept in memory, for the slowest ones
+RECENT_SIZE = 200
+
+# how often each Streamlit process writes what it recorded to ui_data.query_stats,
+# from a thread of its own; the daily archive_warnings task purges rows after 7 days
+FLUSH_SECONDS = 60
+
+QUERY_TEXT_LENGTH = 200
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class QueryRecord:
+    recorded_at: float
+    page: str
+    call_site: str
+    duration_ms: float
+    rows_returned: int
+    bytes_materialized: int
+    cache_hit: bool
+    query_text: str
+
+class QueryStats:
+    """
+    Rolling, in-memory statistics of the queries run by one Streamlit process.
+
+    Every Streamlit process keeps its own, so records are also queued up and
+    written to ui_data.query_stats every FLUSH_SECONDS, where the Performance
+    page can see those of every process. The writes run on a thread of their own,
+    never in the page render whose queries they record.
+    """
+
+    def __init__(self, flush_seconds: float = FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self.histograms: Dict[str, Deque[float]] = {}
+        self.recent: Deque[QueryRecord] = deque(maxlen=RECENT_SIZE)
+        self.pending: List[QueryRecord] = []
+        self.lock = threading.Lock()
+        # the session the pending records are written with, and the thread that does
+        self.session: Optional[Session] = None
+        self.flusher: Optional[threading.Thread] = None
+        self.flush_failed = False
+
+    def record(self, record: QueryRecord):
+        with self.lock:
+            self.histograms.setdefault(record.call_site, deque(maxlen=HISTOGRAM_SIZE)).append(record.duration_ms)
+            self.recent.append(record)
+            self.pending.append(record)
+
+    def write_with(self, session: Session):
+        """ Writes the pending records with `session` from now on; starts the writes the first time """
+        with self.lock:
+            self.session = session
+            if self.flusher is not None:
+                return
+            self.flusher = threading.Thread(target=self._flush_periodically, name='query-stats-flush', daemon=True)
+            self.flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+            session = self.session
+        if not pending or session is None:
+            return
+        try:
+            write_query_stats(session, pending)
+        except Exception:
+            # statistics are best effort; never fail over them, but say why, once
+            if not self.flush_failed:
+                self.flush_failed = True
+                logger.warning("could not write query statistics to ui_data.query_stats", exc_info=True)
+
+    def summary(self) -> pd.DataFrame:
+        with self.lock:
+            rows = [
+                (call_site, len(durations), np.percentile(durations, 50), np.percentile(durations, 95))
+                for call_site, durations in self.histograms.items()
+            ]
+        return pd.DataFrame(rows, columns=['CALL_SITE', 'QUERIES', 'P50_MS', 'P95_MS']) \
+            .sort_values('P95_MS', ascending=False, ignore_index=True)
+
+    def slowest(self, count: int = 20) -> pd.DataFrame:
+        with self.lock:
+            records = sorted(self.recent, key=lambda record: record.duration_ms, reverse=True)[:count]
+        return pd.DataFrame([asdict(record) for record in records], columns=list(QueryRecord.__annotations__))
+
+@st.cache_resource
+def get_query_stats() -> QueryStats:
+    return QueryStats()
+
+# call sites currently inside a cached function, and whether they ran a query
+_cached_calls = threading.local()
+
+def _call_site(depth: int = 2) -> str:
+    """ file.function of the first caller outside this module """
+    frame = sys._getframe(depth)
+    while frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}.{frame.f_code.co_name}"
+
+def _size_of(rows: list) -> int:
+    return sum(sys.getsizeof(value) for row in rows for value in row)
+
+class InstrumentedDataFrame:
+    """
+    A Snowpark DataFrame that records how long it takes to materialize, and how
+    much it returns. Everything but collect / collect_nowait / to_pandas /
+    to_arrow_batches is passed through as is.
+    """
+
+    def __init__(self, session: "InstrumentedSession", df, call_site: str, query: str):
+        self._session = session
+        self._df = df
+        self._call_site = call_site
+        self._query = query
+
+    def __getattr__(self, name: str):
+        return getattr(self._df, name)
+
+    def collect(self, *args, **kwargs) -> list:
+        start = time.perf_counter()
+        rows = self._df.collect(*args, **self._tagged(kwargs))
+        self._record(start, len(rows), _size_of(rows))
+        return rows
+
+    def collect_nowait(self, *args, **kwargs) -> "InstrumentedAsyncJob":
+        # recorded when the result is taken: from submission until then is how long the page waited
+        start = time.perf_counter()
+        return InstrumentedAsyncJob(self, self._df.collect_nowait(*args, **self._tagged(kwargs)), start)
+
+    def to_pandas(self, *args, **kwargs) -> pd.DataFrame:
+        start = time.perf_counter()
+        result = self._df.to_pandas(*args, **self._tagged(kwargs))
+        self._record(start, len(result), int(result.memory_usage(deep=True).sum()))
+        return result
+
+    def to_arrow_batches(self, *args, **kwargs) -> Iterator:
+        # recorded once the caller has consumed every batch
+        start = time.perf_counter()
+        rows, size = 0, 0
+        try:
+            for batch in self._df.to_arrow_batches(*args, **self._tagged(kwargs)):
+                rows += batch.num_rows
+                size += batch.nbytes
+                yield batch
+        finally:
+            self._record(start, rows, size)
+
+    def _tagged(self, kwargs: dict) -> dict:
+        statement_params = dict(kwargs.get('statement_params') or {})
+        statement_params.setdefault('QUERY_TAG', f"chairlift:{self._session.page}:{self._call_site}")
+        return {**kwargs, 'statement_params': statement_params}
+
+    def _record(self, start: float, rows: int, size: int):
+        self._session.record(self._call_site, time.perf_counter() - start, rows, size, False, self._query)
+
+class InstrumentedAsyncJob:
+    """ A Snowpark AsyncJob for a collect_nowait(), recorded when its rows are taken """
+
+    def __init__(self, df: InstrumentedDataFrame, job, start: float):
+        self._df = df
+        self._job = job
+        self._start = start
+
+    def __getattr__(self, name: str):
+        return getattr(self._job, name)
+
+    def result(self, *args, **kwargs) -> list:
+        rows = self._job.result(*args, **kwargs)
+        self._df._record(self._start, len(rows), _size_of(rows))
+        return rows
+
+class InstrumentedSession:
+    """
+    Wraps the Snowpark session for a page: every query is tagged with the page and
+    the function that runs it, and timed into get_query_stats(). Pass it anywhere
+    a Session is expected.
+    """
+
+    def __init__(self, session: Session, page: str):
+        self._session = session
+        self.page = page
+
+    def __getattr__(self, name: str):
+        return getattr(self._session, name)
+
+    def sql(self, query: str, params: Optional[list] = None) -> InstrumentedDataFrame:
+        df = self._session.sql(query, params=params) if params is not None else self._session.sql(query)
+        return InstrumentedDataFrame(self, df, _call_site(), query)
+
+    def record(self, call_site: str, seconds: float, rows: int, size: int, cache_hit: bool, query: str = ""):
+        if not cache_hit and getattr(_cached_calls, 'active', None) is not None:
+            _cached_calls.active = True
+        stats = get_query_stats()
+        stats.record(QueryRecord(
+            time.time(), self.page, call_site, seconds * 1000, rows, size, cache_hit,
+            ' '.join(query.split())[:QUERY_TEXT_LENGTH]
+        ))
+        stats.write_with(self._session)
+
+def write_query_stats(session: Session, records: List[QueryRecord]):
+    session.sql("""
+        insert into ui_data.query_stats
+            (recorded_at, page, call_site, duration_ms, rows_returned, bytes_materialized, cache_hit, query_text)
+        select
+            to_timestamp(value:recorded_at::number(38, 3)),
+            value:page::varchar,
+            value:call_site::varchar,
+            value:duration_ms::float,
+            value:rows_returned::int,
+            value:bytes_materialized::int,
+            value:cache_hit::boolean,
+            value:query_text::varchar
+        from table(flatten(input => parse_json(?)))
+    """, params=[json.dumps([asdict(record) for record in records])]).collect()
+
+def record_cache_use(func: Callable, call: Optional[Callable] = None) -> Callable:
+    """
+    Records calls to a cached function: when `call` (func with its cache in front)
+    runs no query, the result came from the cache, and is recorded as a hit under
+    func's call site. Misses are recorded by the queries they run.
+    """
+    call = call or func
+    module = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+    call_site = f"{module}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_cached_calls, 'active', None)
+        _cached_calls.active = False
+        start = time.perf_counter()
+        try:
+            result = call(*args, **kwargs)
+        finally:
+            ran_query = _cached_calls.active
+            _cached_calls.active = None if outer is None else (outer or ran_query)
+
+        session = next((arg for arg in [*args, *kwargs.values()] if isinstance(arg, InstrumentedSession)), None)
+        if session is not None and not ran_query:
+            size = int(result.memory_usage(deep=True).sum()) if isinstance(result, pd.DataFrame) else 0
+            rows = len(result) if hasattr(result, '__len__') else 0
+            session.record(call_site, time.perf_counter() - start, rows, size, True)
+        return result
+
+    return wrapper
+
+def cache_data(
+    func: Optional[Callable] = None,
+    *,
+    ttl: Optional[float] = None,
+    max_entries: Optional[int] = None
+) -> Callable:
+    """
+    st.cache_data, recording cache hits in the query statistics. Like st.cache_data,
+    used either bare (@cache_data) or with its `ttl` / `max_entries` (@cache_data(ttl=30))
+    """
+    if func is None:
+        return functools.partial(cache_data, ttl=ttl, max_entries=max_entries)
+    return record_cache_use(func, st.cache_data(func, ttl=ttl, max_entries=max_entries))
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Sequence
+import datetime as dt
+import threading
+import time
+
+import pandas as pd
+
+from query_results import concat_compact
+
+# fetch(min_ts, max_ts, from_ts) returns the rows with min_ts <= ts < max_ts and
+# ts >= from_ts, sorted newest first; any bound may be None
+Fetch = Callable[[Optional[pd.Timestamp], Optional[pd.Timestamp], Optional[pd.Timestamp]], pd.DataFrame]
+
+@dataclass
+class CacheEntry:
+    data: pd.DataFrame
+    min_ts: Optional[pd.Timestamp]
+    max_ts: Optional[pd.Timestamp]
+    newest_ts: Optional[pd.Timestamp]
+    refreshed_at: float
+    size: int
+
+    def covers(self, min_ts: Optional[pd.Timestamp], max_ts: Optional[pd.Timestamp]) -> bool:
+        covers_start = self.min_ts is None or (min_ts is not None and self.min_ts <= min_ts)
+        covers_end = self.max_ts is None or (max_ts is not None and max_ts <= self.max_ts)
+        return covers_start and covers_end
+
+@dataclass
+class FetchLock:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # callers holding or waiting for `lock`; it is only dropped once there are none
+    users: int = 0
+
+class AppendOnlyCache:
+    """
+    Caches query results over append-only, time-ordered rows such as sensor readings.
+
+    There is one entry per filter signature, holding the widest date window fetched
+    for it. Asking for a narrower window is served from memory; a refresh only
+    fetches rows from the newest one held on, and prepends those it doesn't have:
+    a row that arrives late, at the same time as the newest one held, is still
+    picked up. `key_columns`, with `ts_column`, identify a row. Entries are evicted
+    least recently used first, once the cached frames exceed `max_bytes`.
+
+    The cache is shared by every session. Fetches run outside of its lock, so that a
+    query for one signature never waits for another's; callers asking for the same
+    signature at once take turns, and the later ones are served the earlier one's rows.
+    """
+
+    def __init__(self, ts_column: str, max_bytes: int, refresh_seconds: float, key_columns: Sequence[str] = ()):
+        self.ts_column = ts_column
+        self.key_columns = [ts_column, *key_columns]
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # guards `entries` and `fetch_locks`; never held during a fetch
+        self.lock = threading.Lock()
+        self.fetch_locks: Dict[Hashable, FetchLock] = {}
+
+    def get(
+        self,
+        signature: Hashable,
+        min_ts: Optional[pd.Timestamp],
+        max_ts: Optional[pd.Timestamp],
+        fetch: Fetch
+    ) -> pd.DataFrame:
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(signature, FetchLock())
+            fetch_lock.users += 1
+        try:
+            # only the holder of the signature's fetch lock changes its entry
+            with fetch_lock.lock:
+                with self.lock:
+                    entry = self.entries.get(signature)
+                if entry is None or not entry.covers(min_ts, max_ts):
+                    entry = self._load(min_ts, max_ts, fetch)
+                elif self._needs_refresh(entry):
+                    self._refresh(entry, fetch)
+                with self.lock:
+                    # (back) in, even if another signature's caller evicted it during the fetch
+                    self.entries[signature] = entry
+                    self.entries.move_to_end(signature)
+                    self._evict()
+                return self._window(entry.data, min_ts, max_ts)
+        finally:
+            with self.lock:
+                fetch_lock.users -= 1
+                if not fetch_lock.users and signature not in self.entries \
+                        and self.fetch_locks.get(signature) is fetch_lock:
+                    del self.fetch_locks[signature]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            # a lock that is in use stays, so that its callers still take turns
+            self._drop_unused_fetch_locks()
+
+    @property
+    def size(self) -> int:
+        return sum(entry.size for entry in self.entries.values())
+
+    def _load(self, min_ts, max_ts, fetch: Fetch) -> CacheEntry:
+        refreshed_at = time.time()
+        data = fetch(min_ts, max_ts, None)
+        return CacheEntry(data, min_ts, max_ts, self._newest(data), refreshed_at, self._size_of(data))
+
+    def _needs_refresh(self, entry: CacheEntry) -> bool:
+        # nothing can be appended to a window that closed before we last looked. The
+        # window's bounds are naive local times, as picked in the date filter, so the
+        # time we looked is too
+        refreshed_at = pd.Timestamp(dt.datetime.fromtimestamp(entry.refreshed_at))
+        if entry.max_ts is not None and refreshed_at > entry.max_ts:
+            return False
+        return time.time() - entry.refreshed_at >= self.refresh_seconds
+
+    def _refresh(self, entry: CacheEntry, fetch: Fetch):
+        refreshed_at = time.time()
+        newer = self._not_held(entry, fetch(entry.min_ts, entry.max_ts, entry.newest_ts))
+        if len(newer) > 0:
+            entry.data = concat_compact([newer, entry.data])
+            entry.newest_ts = self._newest(entry.data)
+            entry.size = self._size_of(entry.data)
+        entry.refreshed_at = refreshed_at
+
+    def _not_held(self, entry: CacheEntry, newer: pd.DataFrame) -> pd.DataFrame:
+        """ `newer` without the rows at entry.newest_ts that the entry already has """
+        if entry.newest_ts is None or len(newer) == 0:
+            return newer
+        held = entry.data[pd.to_datetime(entry.data[self.ts_column]) == entry.newest_ts]
+        is_held = pd.MultiIndex.from_frame(newer[self.key_columns]).isin(
+            pd.MultiIndex.from_frame(held[self.key_columns])
+        )
+        return newer[~is_held]
+
+    def _evict(self):
+        # the most recently used entry stays, even if it is over budget on its own
+        while len(self.entries) > 1 and self.size > self.max_bytes:
+            self.entries.popitem(last=False)
+        self._drop_unused_fetch_locks()
+
+    def _drop_unused_fetch_locks(self):
+        # callers of an evicted signature still hold or wait for its lock; a new one
+        # would let the next caller fetch alongside them
+        for signature in [s for s, fetch_lock in self.fetch_locks.items()
+                          if not fetch_lock.users and s not in self.entries]:
+            del self.fetch_locks[signature]
+
+    def _window(self, data: pd.DataFrame, min_ts, max_ts) -> pd.DataFrame:
+        if min_ts is None and max_ts is None:
+            return data
+        ts = pd.to_datetime(data[self.ts_column])
+        mask = pd.Series(True, index=data.index)
+        if min_ts is not None:
+            mask &= ts >= min_ts
+        if max_ts is not None:
+            mask &= ts < max_ts
+        return data[mask]
+
+    def _newest(self, data: pd.DataFrame) -> Optional[pd.Timestamp]:
+        return pd.to_datetime(data[self.ts_column]).max() if len(data) > 0 else None
+
+    def _size_of(self, data: pd.DataFrame) -> int:
+        return int(data.memory_usage(deep=True).sum())
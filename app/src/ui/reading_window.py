@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import time
+
+import numpy as np
+import pandas as pd
+
+SeriesKey = Tuple[str, str]
+
+@dataclass
+class RingSeries:
+    """ The latest `size` readings of one machine's sensor, oldest overwritten first """
+    ts: np.ndarray
+    values: np.ndarray
+    start: int = 0
+    count: int = 0
+
+    @classmethod
+    def allocate(cls, size: int) -> 'RingSeries':
+        return cls(np.empty(size, dtype='datetime64[ns]'), np.empty(size, dtype='float64'))
+
+    def append(self, ts: np.ndarray, values: np.ndarray):
+        size = len(self.ts)
+        # more new readings than the window holds: only the latest ones would survive
+        ts, values = ts[-size:], values[-size:]
+        positions = (self.start + self.count + np.arange(len(ts))) % size
+        self.ts[positions] = ts
+        self.values[positions] = values
+        overflow = max(self.count + len(ts) - size, 0)
+        self.start = (self.start + overflow) % size
+        self.count = min(self.count + len(ts), size)
+
+    @property
+    def newest_ts(self) -> Optional[np.datetime64]:
+        return self.ts[(self.start + self.count - 1) % len(self.ts)] if self.count else None
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        positions = (self.start + np.arange(self.count)) % len(self.ts)
+        return self.ts[positions], self.values[positions]
+
+@dataclass
+class ReadingWindow:
+    """
+    A fixed-size sliding window over the latest readings of each machine's sensors,
+    for charts that follow the readings as they come in. Every series is a ring
+    buffer allocated once, at its full size, so the memory a window holds stays the
+    same however long it is kept; appending only writes the new readings over the
+    oldest ones.
+    """
+    size: int
+    series: Dict[SeriesKey, RingSeries] = field(default_factory=dict)
+    # the newest reading held: the next poll asks for the readings from it on, as
+    # another sensor's reading at the same time may not have arrived the last time
+    last_ts: Optional[pd.Timestamp] = None
+    polled_at: Optional[float] = None
+    # bumped for a sensor type (SENSOR_NAME) each time any of its series changes
+    versions: Dict[str, int] = field(default_factory=dict)
+
+    def is_due(self, refresh_seconds: float) -> bool:
+        return self.polled_at is None or time.monotonic() - self.polled_at >= refresh_seconds
+
+    def append(self, readings: pd.DataFrame) -> Set[str]:
+        """
+        Adds readings with TS, MACHINE_NAME, SENSOR_NAME and VALUE columns, in any
+        order, and returns the sensor types that got any. A series skips the readings
+        that aren't newer than those it holds, so polls may overlap the window.
+        """
+        self.polled_at = time.monotonic()
+        if readings.empty:
+            return set()
+
+        readings = readings.sort_values('TS', kind='stable')
+        changed = set()
+        for (machine_name, sensor_name), rows in readings.groupby(['MACHINE_NAME', 'SENSOR_NAME'], observed=True, sort=False):
+            key = (str(machine_name), str(sensor_name))
+            if key not in self.series:
+                self.series[key] = RingSeries.allocate(self.size)
+            series = self.series[key]
+            ts = rows['TS'].to_numpy(dtype='datetime64[ns]')
+            values = rows['VALUE'].to_numpy(dtype='float64')
+            if series.newest_ts is not None:
+                newer = ts > series.newest_ts
+                ts, values = ts[newer], values[newer]
+            if len(ts):
+                series.append(ts, values)
+                changed.add(key[1])
+
+        newest = pd.Timestamp(readings['TS'].iloc[-1])
+        self.last_ts = newest if self.last_ts is None else max(self.last_ts, newest)
+        for sensor_name in changed:
+            self.versions[sensor_name] = self.versions.get(sensor_name, 0) + 1
+        return changed
+
+    def sensor_readings(self, sensor_name: str) -> pd.DataFrame:
+        """ The window of every machine's `sensor_name` sensor, oldest first """
+        frames: List[pd.DataFrame] = []
+        for (machine_name, series_sensor), series in self.series.items():
+            if series_sensor != sensor_name or not series.count:
+                continue
+            ts, values = series.ordered()
+            frames.append(pd.DataFrame({
+                'TS': ts,
+                'MACHINE_NAME': machine_name,
+                'SENSOR_NAME': sensor_name,
+                'VALUE': values,
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['TS', 'MACHINE_NAME', 'SENSOR_NAME', 'VALUE'])
+        return pd.concat(frames, ignore_index=True)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(series.ts.nbytes + series.values.nbytes for series in self.series.values())
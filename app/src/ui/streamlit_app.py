@@ -0,0 +1,32 @@
+import streamlit as st
+from snowflake.snowpark import Session
+
+from app_snapshot import get_app_snapshot
+from first_time_setup import render as render_first_time_setup
+from query_stats import InstrumentedSession
+
+# every page is its own script, which also runs on its own (see its __main__ block)
+VIEWER_PAGES = [
+    ("v_dashboard.py", "Dashboard", "⚠️"),
+    ("v_sensor_data.py", "Sensor data", "📈"),
+]
+ADMIN_PAGES = [
+    ("v_configuration.py", "Configuration", "⚙️"),
+    ("v_performance.py", "Performance", "⏱️"),
+]
+
+def pages(is_app_admin: bool):
+    """ The pages the current application role may see; the Dashboard comes first """
+    return [
+        st.Page(path, title=title, icon=icon, default=path == VIEWER_PAGES[0][0])
+        for path, title, icon in VIEWER_PAGES + (ADMIN_PAGES if is_app_admin else [])
+    ]
+
+if __name__ == "__main__":
+    session = InstrumentedSession(Session.builder.getOrCreate(), page="Navigation")
+    # the snapshot is loaded once per session: moving between pages runs no setup queries
+    snapshot = get_app_snapshot(session)
+    if not snapshot.is_first_time_setup_dismissed:
+        render_first_time_setup(session)
+    else:
+        st.navigation(pages(snapshot.is_app_admin)).run()
@@ -1,16 +1,37 @@
 import urllib.parse
+from typing import Dict, Optional
 
 import streamlit as st
 from snowflake.snowpark import Session
 
+from query_scheduler import PendingResult, QueryScheduler
 from util import get_app_name
 
-def warnings_banner(session: Session):
-    warning_count = session.sql(f"""
-        select count(*) as WARNING_COUNT from warnings_data.warnings where ACKNOWLEDGED = false
-    """).collect()[0]["WARNING_COUNT"]
+WARNING_COUNTS_QUERY = """
+    select machine_uuid as MACHINE_UUID, sum(unacknowledged_count) as WARNING_COUNT
+    from warnings_data.warning_counts
+    group by machine_uuid
+"""
+
+def to_warning_counts(count_rows) -> Dict[str, int]:
+    return {row["MACHINE_UUID"]: row["WARNING_COUNT"] for row in count_rows}
+
+def get_warning_counts(session: Session) -> Dict[str, int]:
+    """ Unacknowledged warnings per machine uuid, from the maintained warning_counts table """
+    return to_warning_counts(session.sql(WARNING_COUNTS_QUERY).collect())
+
+def submit_warning_counts(session: Session, queries: QueryScheduler) -> PendingResult:
+    """ get_warning_counts(), started on the warehouse now and read when it's needed """
+    return queries.collect(session.sql(WARNING_COUNTS_QUERY), to_warning_counts)
+
+def warnings_banner(session: Session, warning_counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """ Shows the unacknowledged warning count, and returns the per-machine counts it is based on """
+    if warning_counts is None:
+        warning_counts = get_warning_counts(session)
+    warning_count = sum(warning_counts.values())
     if warning_count > 0:
         st.warning(f'There are {warning_count} new unacknowledged warnings.', icon="⚠️")
+    return warning_counts
 
 def link_to_streamlit(session: Session, text, streamlit_name, schema="UI"):
     """ N.B. all non-quoted identifiers must be UPPERCASE """
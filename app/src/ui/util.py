@@ -1,7 +1,8 @@
-import streamlit as st
 from snowflake.snowpark import Session
 
-@st.cache_data
+from query_stats import cache_data
+
+@cache_data
 def get_app_name(_session: Session) -> str:
     return _session.sql("""
         select current_database()
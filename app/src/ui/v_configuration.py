@@ -1,18 +1,158 @@
+import json
+from typing import Dict, Optional
+
+import pandas as pd
 import streamlit as st
-from first_time_setup import get_is_first_time_setup_dismissed, \
-    render as render_first_time_setup
+from first_time_setup import render as render_first_time_setup
 from snowflake.snowpark import Session
 
-def check_warning_task_enabled(session: Session):
-    is_warning_task_enabled = session.sql(f"""
-        select enable_warning_generation_task from config_data.configuration limit 1
-    """).collect()[0]['ENABLE_WARNING_GENERATION_TASK']
-    return is_warning_task_enabled
+from app_snapshot import get_app_snapshot, get_snapshot_sensor_types, invalidate_app_snapshot
+
+from query_stats import InstrumentedSession
+
+MAX_WARNING_PARTITIONS = 16
+
+# the days a retention input offers while it is set to null (keep forever): the default
+# of config_data.configuration, or a year for the archive, which is kept by default
+DEFAULT_WARNING_RETENTION_DAYS = 30
+DEFAULT_WARNING_ARCHIVE_RETENTION_DAYS = 365
+
+# the retention settings of config_data.configuration: their labels, and the days to
+# start from when they were set to keep forever
+RETENTION_SETTINGS = {
+    'WARNING_RETENTION_DAYS': ("Archive acknowledged warnings after (days)", DEFAULT_WARNING_RETENTION_DAYS),
+    'WARNING_ARCHIVE_RETENTION_DAYS': ("Delete archived warnings after (days)", DEFAULT_WARNING_ARCHIVE_RETENTION_DAYS),
+}
+
+# the rules of config_data.window_rules (see src/python/window_rules.py)
+WINDOW_RULES = {
+    'RATE_OF_CHANGE': 'Changes by more than the threshold over the window',
+    'ROLLING_ZSCORE': 'More than threshold standard deviations from the window',
+    'CONSECUTIVE_OUT_OF_RANGE': 'Out of range for the whole window',
+}
+WINDOW_RULE_COLUMNS = ['SENSOR TYPE', 'RULE', 'WINDOW (READINGS)', 'THRESHOLD']
 
 def update_warning_task_enabled(session: Session, should_enable):
     session.sql(f"""
         call warnings_code.update_warning_check_task_status({should_enable})
     """).collect()
+    invalidate_app_snapshot()
+
+def get_warning_partition_count(session: Session) -> int:
+    return session.sql(f"""
+        select warning_partition_count from config_data.configuration limit 1
+    """).collect()[0]['WARNING_PARTITION_COUNT'] or 1
+
+def set_warning_partition_count(session: Session, partition_count: int):
+    session.sql(f"""
+        call warnings_code.set_warning_partition_count(?)
+    """, params=[partition_count]).collect()
+
+def get_warning_check_schedule(session: Session):
+    return session.sql(f"""
+        select warning_check_adaptive, warning_check_interval_minutes, warning_check_max_interval_minutes
+        from config_data.configuration limit 1
+    """).collect()[0]
+
+def set_warning_check_adaptive(session: Session, enable: bool):
+    session.sql(f"""
+        call warnings_code.set_warning_check_adaptive(?)
+    """, params=[enable]).collect()
+
+def get_warning_check_runs(session: Session):
+    return session.sql(f"""
+        select
+            count(*) as runs,
+            count_if(skipped) as skipped_runs,
+            coalesce(sum(interval_minutes), 0) - count(*) as avoided_runs,
+            avg(iff(skipped, null, datediff(millisecond, started_at, finished_at))) / 1000 as avg_check_s,
+            avg(iff(skipped, datediff(millisecond, started_at, finished_at), null)) / 1000 as avg_skip_s
+        from warnings_data.warning_check_runs
+        where started_at >= dateadd(day, -1, current_timestamp())
+    """).collect()[0]
+
+def warehouse_time_saved_s(runs) -> float:
+    """
+    Estimates the warehouse time that runs without new readings saved: a skipped
+    run takes avg_skip_s instead of avg_check_s, and a run the adaptive schedule
+    didn't start (a run at an interval of n minutes stands in for n) takes none
+    """
+    avg_check_s = runs['AVG_CHECK_S'] or 0
+    avg_skip_s = runs['AVG_SKIP_S'] or 0
+    return runs['SKIPPED_RUNS'] * max(avg_check_s - avg_skip_s, 0) + runs['AVOIDED_RUNS'] * avg_skip_s
+
+def get_warning_retention(session: Session):
+    return session.sql(f"""
+        select warning_retention_days, warning_archive_retention_days
+        from config_data.configuration limit 1
+    """).collect()[0]
+
+def set_warning_retention(session: Session, changes: Dict[str, Optional[int]]):
+    """ Saves the RETENTION_SETTINGS in `changes`, None to keep forever, and leaves the others as they are """
+    # only known settings become column names in the statement
+    changes = {setting: days for setting, days in changes.items() if setting in RETENTION_SETTINGS}
+    session.sql(f"""
+        update config_data.configuration
+        set {', '.join(f"{setting.lower()} = ?" for setting in changes)}
+    """, params=list(changes.values())).collect()
+
+def get_window_rules(session: Session):
+    return session.sql(f"""
+        select sensor_type_id, rule, window_readings, threshold
+        from config_data.window_rules
+        order by sensor_type_id, rule
+    """).collect()
+
+def set_window_rules(session: Session, rules: pd.DataFrame):
+    """ Replaces the rules with the editor's rows, as sensor type ids; incomplete rows are left out """
+    sensor_type_ids = {sensor_type.name: sensor_type.id for sensor_type in get_snapshot_sensor_types(session)}
+    rules = rules.dropna(subset=['SENSOR TYPE', 'RULE', 'WINDOW (READINGS)'])
+    session.sql(f"""
+        call warnings_code.set_window_rules(?)
+    """, params=[json.dumps([
+        {
+            'sensor_type_id': sensor_type_ids[rule['SENSOR TYPE']],
+            'rule': rule['RULE'],
+            'window_readings': int(rule['WINDOW (READINGS)']),
+            'threshold': None if pd.isna(rule['THRESHOLD']) else float(rule['THRESHOLD']),
+        }
+        for _, rule in rules.iterrows()
+    ])]).collect()
+
+def render_window_rules(session: Session):
+    sensor_types = get_snapshot_sensor_types(session)
+    sensor_type_names = {sensor_type.id: sensor_type.name for sensor_type in sensor_types}
+    rules = pd.DataFrame([
+        [sensor_type_names.get(rule['SENSOR_TYPE_ID']), rule['RULE'], rule['WINDOW_READINGS'], rule['THRESHOLD']]
+        for rule in get_window_rules(session)
+    ], columns=WINDOW_RULE_COLUMNS)
+
+    st.subheader("Window rules")
+    st.caption("""
+        Besides readings out of the sensor type's range, warn about readings that
+        break a rule over the readings before them, per sensor type:
+    """ + ', '.join(f"**{rule}**: {description.lower()}" for rule, description in WINDOW_RULES.items()) + '.')
+    edited = st.data_editor(
+        rules,
+        column_config={
+            'SENSOR TYPE': st.column_config.SelectboxColumn(
+                options=[sensor_type.name for sensor_type in sensor_types], required=True
+            ),
+            'RULE': st.column_config.SelectboxColumn(options=list(WINDOW_RULES), required=True),
+            'WINDOW (READINGS)': st.column_config.NumberColumn(min_value=1, step=1, required=True),
+            'THRESHOLD': st.column_config.NumberColumn(min_value=0),
+        },
+        num_rows='dynamic',
+        hide_index=True,
+        use_container_width=True,
+        key='window_rules'
+    )
+    st.button(
+        label="Apply",
+        on_click=lambda: set_window_rules(session, edited),
+        disabled=edited.equals(rules),
+        key='apply_window_rules'
+    )
 
 def generate_warnings_once(session: Session):
     result = session.sql(f"""
@@ -31,15 +171,70 @@ def render(session):
     """)
 
     # warning task
-    is_warning_task_enabled = check_warning_task_enabled(session)
-    new_value = st.checkbox(
-        label="Enable warning generation task (⚠️ runs every 60s!)",
+    is_warning_task_enabled = get_app_snapshot(session).is_warning_task_enabled
+    schedule = get_warning_check_schedule(session)
+    st.checkbox(
+        label=f"Enable warning generation task (⚠️ runs every {schedule['WARNING_CHECK_INTERVAL_MINUTES'] or 1} min!)",
         value=is_warning_task_enabled,
-        key='warning_task_enabled'
+        key='warning_task_enabled',
+        on_change=lambda: update_warning_task_enabled(session, st.session_state.warning_task_enabled),
+    )
+
+    # runs without new readings skip the warning check; the adaptive schedule also runs less often
+    st.checkbox(
+        label=f"Adaptive schedule (runs less often, down to every {schedule['WARNING_CHECK_MAX_INTERVAL_MINUTES']} min, "
+              f"while no new readings arrive)",
+        value=bool(schedule['WARNING_CHECK_ADAPTIVE']),
+        key='warning_check_adaptive',
+        on_change=lambda: set_warning_check_adaptive(session, st.session_state.warning_check_adaptive),
+    )
+    runs = get_warning_check_runs(session)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Checking every", f"{schedule['WARNING_CHECK_INTERVAL_MINUTES']} min")
+    col2.metric("Runs skipped (24h)", f"{runs['SKIPPED_RUNS']:,} of {runs['RUNS']:,}")
+    col3.metric("Warehouse time saved (24h)", f"{warehouse_time_saved_s(runs) / 60:,.1f} min")
+
+    # readings are split by machine into partitions, each checked by a task of its own
+    partition_count = get_warning_partition_count(session)
+    col1, col2 = st.columns([0.7, 0.3])
+    new_partition_count = col1.number_input(
+        label="Warning check partitions (checked in parallel, split by machine)",
+        min_value=1,
+        max_value=MAX_WARNING_PARTITIONS,
+        value=partition_count,
+        key='warning_partitions'
+    )
+    col2.button(
+        label="Apply",
+        on_click=lambda: set_warning_partition_count(session, new_partition_count),
+        disabled=new_partition_count == partition_count,
+    )
+
+    # a daily task moves old acknowledged warnings to an archive, and purges the archive
+    retention = get_warning_retention(session)
+    col1, col2, col3 = st.columns([0.35, 0.35, 0.3])
+    retention_changes = {}
+    for column, (setting, (label, default_days)) in zip([col1, col2], RETENTION_SETTINGS.items()):
+        stored_days = retention[setting]
+        days_input = column.container()
+        # null (keep forever) is a setting of its own, not the default's number of days
+        keep_forever = column.checkbox("Keep forever", value=stored_days is None, key=f'{setting.lower()}_forever')
+        days = days_input.number_input(
+            label=label,
+            min_value=1,
+            value=stored_days or default_days,
+            disabled=keep_forever,
+            key=setting.lower()
+        )
+        new_days = None if keep_forever else days
+        if new_days != stored_days:
+            retention_changes[setting] = new_days
+    col3.button(
+        label="Apply",
+        on_click=lambda: set_warning_retention(session, retention_changes),
+        disabled=not retention_changes,
+        key='apply_warning_retention'
     )
-    if is_warning_task_enabled != new_value:
-        update_warning_task_enabled(session, new_value)
-        st.experimental_rerun()
 
     # one-time warning generation
     st.button(
@@ -48,9 +243,11 @@ def render(session):
         disabled=is_warning_task_enabled,
     )
 
+    render_window_rules(session)
+
 if __name__ == "__main__":
-    session = Session.builder.getOrCreate()
-    if not get_is_first_time_setup_dismissed(session):
+    session = InstrumentedSession(Session.builder.getOrCreate(), page="Configuration")
+    if not get_app_snapshot(session).is_first_time_setup_dismissed:
         render_first_time_setup(session)
     else:
         render(session)
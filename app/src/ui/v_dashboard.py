@@ -1,13 +1,54 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 import datetime as dt
+import json
+import pandas as pd
 import streamlit as st
-from snowflake.snowpark import Session
+from snowflake.snowpark import DataFrame, Session
+
+from ui_common import submit_warning_counts, warnings_banner
+from app_snapshot import get_app_snapshot, get_snapshot_machines, get_snapshot_sensor_types, \
+    prefetch_snapshot_lists
+from first_time_setup import render as render_first_time_setup
+from export import render_export
+from chairlift_data import Machine, SensorType
+from pagination import PageKey, Pager, after_key_filter
+from filter_sql import SqlFilter, half_open_range, machine_filter, \
+    sensor_type_filter, time_range_filter, to_bind
+from query_results import to_compact_pandas
+from query_scheduler import QueryScheduler
+from query_stats import InstrumentedSession
+
+# warning_episodes plus the acknowledged episodes archived by warnings_code.archive_warnings()
+EPISODES_WITH_ARCHIVE = """(
+            select sensor_uuid, reason, first_reading_time, last_reading_time, reading_count,
+                min_reading, max_reading, acknowledged
+            from warnings_data.warning_episodes
+            union all
+            select sensor_uuid, reason, first_reading_time, last_reading_time, reading_count,
+                min_reading, max_reading, true
+            from warnings_data.warning_episodes_archive
+        )"""
+
+def warning_filter(
+        machines: Optional[List[Machine]] = None,
+        sensor_types: Optional[List[SensorType]] = None,
+        min_ts: Optional[Tuple[dt.date, dt.time]] = None,
+        max_ts: Optional[Tuple[dt.date, dt.time]] = None
+) -> SqlFilter:
+    """
+    Predicates on `warning` and `sensor` for the dashboard filters; shared by the
+    warnings list and by acknowledging everything that matches the filters.
+    A warning episode matches the time range if any of its readings fall in it.
+    """
 
-from ui_common import warnings_banner
-from first_time_setup import get_is_first_time_setup_dismissed, \
-    render as render_first_time_setup
-from chairlift_data import Machine, SensorType, get_machines, \
-    get_sensor_types
+    start, end = half_open_range(
+        dt.datetime.combine(*min_ts) if min_ts else None,
+        dt.datetime.combine(*max_ts) if max_ts else None
+    )
+    return machine_filter("sensor.machine_uuid", machines) \
+        .extend(sensor_type_filter("sensor.sensor_type_id", sensor_types)) \
+        .extend(time_range_filter("warning.last_reading_time", start, None)) \
+        .extend(time_range_filter("warning.first_reading_time", None, end))
 
 def get_warning_data(
         session: Session,
@@ -15,84 +56,185 @@ def get_warning_data(
         sensor_types: Optional[List[SensorType]] = None,
         min_ts: Optional[Tuple[dt.date, dt.time]] = None,
         max_ts: Optional[Tuple[dt.date, dt.time]] = None,
-        acknowledged: Optional[bool] = False
+        acknowledged: Optional[bool] = False,
+        after: Optional[PageKey] = None,
+        page_size: int = 20,
+        archived: bool = False
 ) -> None:
     """
     Fetches sensor data from snowflake, with optional filtering.
     Uses references defined in the app manfiest.yml to query consumer data directly.
+    Returns the page of warning episodes that follows `after`, plus one extra row if there's
+    a next page, most recently active first. With `archived`, acknowledged episodes that
+    were archived are included; they are only read when asked for.
     """
 
-    where_predicates: List[str] = []
+    where = warning_filter(machines, sensor_types, min_ts, max_ts)
 
-    if machines:
-        predicates = [f"sensor.machine_uuid = '{machine.uuid}'" for machine in machines]
-        or_clause = ' or '.join(predicates)
-        where_predicates.append(f"({or_clause})")
+    where.add("warning.acknowledged = ?", bool(acknowledged))
 
-    if sensor_types:
-        predicates = [f"sensor.sensor_type_id = {sensor_type.id}" for sensor_type in sensor_types]
-        or_clause = ' or '.join(predicates)
-        where_predicates.append(f"({or_clause})")
+    if after:
+        where.extend(after_key_filter(after, "warning.last_reading_time", "sensor.machine_uuid", "sensor.name"))
 
-    if min_ts:
-        min_epoch_sec = int(dt.datetime.combine(min_ts[0], min_ts[1]).timestamp())
-        where_predicates.append(f"warning.reading_time >= to_timestamp({min_epoch_sec})")
-
-    if max_ts:
-        max_epoch_sec = int(dt.datetime.combine(max_ts[0], max_ts[1]).timestamp())
-        where_predicates.append(f"warning.reading_time <= to_timestamp({max_epoch_sec})")
-
-    where_predicates.append(f"warning.acknowledged = {acknowledged}")
-
-    where_clause = f"where {' and '.join(where_predicates)}" if where_predicates else ""
+    return to_compact_pandas(warning_query(session, where, archived, limit=page_size + 1),
+        categories=['MACHINE_NAME', 'SENSOR_NAME', 'REASON', 'MACHINE_UUID'],
+        integers=['READING_COUNT', 'MIN_READING', 'MAX_READING'])
 
+def warning_query(session: Session, where: SqlFilter, archived: bool = False, limit: Optional[int] = None) -> DataFrame:
+    """ The warning episodes matching `where`, most recently active first, without fetching them """
     return session.sql(f"""
         select 
             warning.sensor_uuid as SENSOR_UUID, 
-            warning.reading_time as READING_TIME, 
-            concat(to_date(warning.reading_time), ' ', to_time(warning.reading_time)) as readable_time, 
+            warning.first_reading_time as FIRST_READING_TIME, 
+            warning.last_reading_time as LAST_READING_TIME, 
             machine.name as machine_name, 
             sensor.name as sensor_name, 
-            warning.reading as reading, 
-            warning.reason as reason
-        from warnings_data.warnings warning 
+            warning.reading_count as reading_count, 
+            warning.min_reading as min_reading, 
+            warning.max_reading as max_reading, 
+            warning.reason as reason,
+            sensor.machine_uuid as MACHINE_UUID
+        from {EPISODES_WITH_ARCHIVE if archived else 'warnings_data.warning_episodes'} warning 
         inner join reference('SENSORS') sensor 
             on sensor.uuid = warning.sensor_uuid 
         inner join reference('MACHINES') machine 
             on machine.uuid = sensor.machine_uuid 
 
-        {where_clause}
+        {where.where_clause()}
 
         order by
-            reading_time desc,
+            last_reading_time desc,
             machine_uuid asc,
             sensor_name asc
         
-        limit 20
-    """).to_pandas()
-
-def render(session: Session, selected_rows):
+        {f'limit {limit}' if limit is not None else ''}
+    """, params=where.params)
+
+def get_episode_readings(session: Session, sensor_uuid: str, first_reading_time, last_reading_time) -> pd.DataFrame:
+    """ The readings behind one warning episode """
+    return to_compact_pandas(session.sql(f"""
+        select reading_time as READING_TIME, reading as READING
+        from reference('SENSOR_READINGS')
+        where sensor_uuid = ?
+            and reading_time >= ?::timestamp
+            and reading_time <= ?::timestamp
+        order by reading_time asc
+    """, params=[
+        sensor_uuid,
+        to_bind(pd.Timestamp(first_reading_time).to_pydatetime()),
+        to_bind(pd.Timestamp(last_reading_time).to_pydatetime())
+    ]), integers=['READING'])
+
+def readable_time(reading_time) -> str:
+    return pd.Timestamp(reading_time).strftime('%Y-%m-%d %H:%M:%S')
+
+def readable_time_range(first_reading_time, last_reading_time) -> str:
+    first, last = readable_time(first_reading_time), readable_time(last_reading_time)
+    return first if first == last else f"{first} → {last}"
+
+def readable_reading_range(min_reading, max_reading) -> str:
+    if pd.isna(min_reading):
+        return ''
+    return str(min_reading) if min_reading == max_reading else f"{min_reading} – {max_reading}"
+
+def warning_key(sensor_uuid: str, first_reading_time) -> Tuple[str, str]:
+    """ What identifies a warning episode in the selection: its sensor, and when it started """
+    return sensor_uuid, str(pd.Timestamp(first_reading_time))
+
+def warning_grid(warning_data: pd.DataFrame, selected: Set[Tuple[str, str]]) -> pd.DataFrame:
+    """ The page of warning episodes as the rows of the warnings grid, ticked if they're selected """
+    keys = [warning_key(*key) for key in zip(warning_data['SENSOR_UUID'], warning_data['FIRST_READING_TIME'])]
+    return pd.DataFrame({
+        'READING TIMES': [readable_time_range(*times) for times in
+                          zip(warning_data['FIRST_READING_TIME'], warning_data['LAST_READING_TIME'])],
+        'MACHINE NAME': warning_data['MACHINE_NAME'].astype(str).to_numpy(),
+        'SENSOR NAME': warning_data['SENSOR_NAME'].astype(str).to_numpy(),
+        'READINGS': [readable_reading_range(*readings) for readings in
+                     zip(warning_data['MIN_READING'], warning_data['MAX_READING'])],
+        'READING COUNT': warning_data['READING_COUNT'].to_numpy(),
+        'REASON': warning_data['REASON'].astype(str).to_numpy(),
+        'ACKNOWLEDGE': [key in selected for key in keys],
+    })
+
+def update_selection(grid_key: str, keys: List[Tuple[str, str]], selected_rows: Set[Tuple[str, str]]):
+    """
+    Folds the ticks and unticks made in the warnings grid into the selection. The grid
+    then starts over from the selection (a new key), so it never holds edits of its own
+    that "Select page" or the next page would contradict.
+    """
+    for row, edits in st.session_state[grid_key]['edited_rows'].items():
+        if edits.get('ACKNOWLEDGE'):
+            selected_rows.add(keys[int(row)])
+        else:
+            selected_rows.discard(keys[int(row)])
+    st.session_state['warnings_grid_revision'] = st.session_state.get('warnings_grid_revision', 0) + 1
+
+def select_page(keys: List[Tuple[str, str]], selected_rows: Set[Tuple[str, str]]):
+    selected_rows.update(keys)
+    st.session_state['warnings_grid_revision'] = st.session_state.get('warnings_grid_revision', 0) + 1
+
+def clear_selection(selected_rows: Set[Tuple[str, str]]):
+    selected_rows.clear()
+    st.session_state['warnings_grid_revision'] = st.session_state.get('warnings_grid_revision', 0) + 1
+
+def episode_label(episode) -> str:
+    reading_count = episode['READING_COUNT']
+    return f"{episode['SENSOR_NAME']} on {episode['MACHINE_NAME']}, " \
+        f"{readable_time_range(episode['FIRST_READING_TIME'], episode['LAST_READING_TIME'])} " \
+        f"({reading_count:,} reading{'' if reading_count == 1 else 's'})"
+
+def show_episode_readings(episode: Optional[Dict]):
+    st.session_state['episode'] = episode
+
+def show_chosen_episode_readings(warning_data: pd.DataFrame):
+    row = st.session_state['episode_choice']
+    show_episode_readings(None if row is None else warning_data.iloc[row].to_dict())
+
+def close_episode_readings():
+    st.session_state['episode_choice'] = None
+    show_episode_readings(None)
+
+def render_episode_readings(episode: Dict, readings: pd.DataFrame):
+    """ Drill-down from one warning episode to the readings it stands for """
+    st.subheader(f"{episode['SENSOR_NAME']} on {episode['MACHINE_NAME']}: {episode['REASON']}")
+    st.dataframe(readings, hide_index=True, use_container_width=True)
+    st.button("Close", on_click=close_episode_readings, key='close_episode')
+    st.divider()
+
+def machine_label(machine: Machine, warning_counts: Dict[str, int]) -> str:
+    warning_count = warning_counts.get(machine.uuid, 0)
+    return f"{machine.name} ({warning_count} ⚠️)" if warning_count > 0 else machine.name
+
+def render(session: Session, selected_rows: Set[Tuple[str, str]]):
+    with QueryScheduler() as queries:
+        render_page(session, selected_rows, queries)
+
+def render_page(session: Session, selected_rows: Set[Tuple[str, str]], queries: QueryScheduler):
     st.set_page_config(layout="wide")
-    warnings_banner(session)
+    warning_counts = submit_warning_counts(session, queries)
+    prefetch_snapshot_lists(session, queries)
+    banner = st.container()
     st.header("Warnings")
     st.button("Dismiss all", on_click=lambda: dismiss_all(session))
 
-    st.caption("Showing first 20")
     col1, col2 = st.columns([0.5, 0.5])
     acknowledged_filter = col1.checkbox('Show acknowledged warnings')
+    include_archived = acknowledged_filter and col2.checkbox(
+        'Include archived warnings (slower)', key='include_archived'
+    )
 
     if not acknowledged_filter:
         # filters
         col1, col2 = st.columns([0.5, 0.5])
         machines = col1.multiselect(
             'Filter by machine',
-            options=get_machines(session),
-            format_func=lambda machine: machine.name,
+            options=get_snapshot_machines(session),
+            format_func=lambda machine: machine_label(machine, warning_counts.result()),
             key='machines'
         )
         sensor_types = col2.multiselect(
             'Filter by sensor type',
-            options=get_sensor_types(session),
+            options=get_snapshot_sensor_types(session),
             format_func=lambda sensor_type: sensor_type.name,
             key='sensorTypes'
         )
@@ -106,100 +248,185 @@ def render(session: Session, selected_rows):
             from_date = col1.date_input('From date', max_value=dt.date.today(), value=dt.date.today() - dt.timedelta(days=1))
             from_time = col2.time_input('From time', value=dt.time(0, 0, 0))
             to_date = col3.date_input('To date', min_value=from_date, value=dt.date.today())
-            to_time = col4.time_input('To time', value=dt.time(23, 59, 59)) # FIXME: might miss last second of day!
+            to_time = col4.time_input('To time', value=dt.time(23, 59, 59))
     else:
         machines = None
         sensor_types = None
         enable_ts_filter = None
 
-    warning_data = get_warning_data(
+    min_ts = (from_date, from_time) if enable_ts_filter else None
+    max_ts = (to_date, to_time) if enable_ts_filter else None
+    if machines or sensor_types or enable_ts_filter:
+        st.button(
+            "Dismiss all matching filters",
+            on_click=lambda: dismiss_matching(session, machines, sensor_types, min_ts, max_ts)
+        )
+
+    pager = Pager('warnings', (machines, sensor_types, min_ts, max_ts, acknowledged_filter, include_archived))
+    # the page of warnings and the readings of the episode drilled into are started together
+    warning_page = queries.submit(
+        get_warning_data,
         session=session,
         machines=machines,
         sensor_types=sensor_types,
-        min_ts=(from_date, from_time) if enable_ts_filter else None,
-        max_ts=(to_date, to_time) if enable_ts_filter else None,
-        acknowledged=acknowledged_filter
+        min_ts=min_ts,
+        max_ts=max_ts,
+        acknowledged=acknowledged_filter,
+        after=pager.after,
+        page_size=pager.page_size,
+        archived=include_archived
+    )
+    episode = st.session_state.get('episode')
+    episode_readings = episode and queries.submit(
+        get_episode_readings,
+        session, episode['SENSOR_UUID'], episode['FIRST_READING_TIME'], episode['LAST_READING_TIME']
     )
 
-    cols_width = [0.15,0.10,0.15,0.10,0.20,0.15]
-
-    col1, col2, col3, col4, col5, col6 = st.columns(cols_width);
-    select_all = False
-    with col1:
-        st.caption('READING TIME')
-
-    with col2:
-        st.caption('MACHINE NAME')
-
-    with col3:
-        st.caption('SENSOR NAME')
-
-    with col4:
-        st.caption('READING')
-
-    with col5:
-        st.caption('REASON')
-
-    with col6:
-        st.caption('ACKNOWLEDGE')
-        if not acknowledged_filter:
-            select_all = st.checkbox(label='Select All', key='selectAll')
-            st.button("Dismiss", on_click=lambda: dismiss_selected(session, selected_rows))
-
-    for index, row in warning_data.iterrows():
-        col1, col2, col3, col4, col5, col6 = st.columns(cols_width);
-
-        with col1:
-            st.write(row['READABLE_TIME'])
-
-        with col2:
-            st.write(row['MACHINE_NAME'])
-
-        with col3:
-            st.write(row['SENSOR_NAME'])
-
-        with col4:
-            st.write(row['READING'])
-
-        with col5:
-            st.write(row['REASON'])
+    with banner: warnings_banner(session, warning_counts.result())
+    warning_data = pager.current_page(warning_page.result(), 'LAST_READING_TIME')
+    if episode:
+        render_episode_readings(episode, episode_readings.result())
 
-        with col6:
-            # TODO possible duplicate IDs
-            id = row['SENSOR_UUID'] + '/' + str(row['READABLE_TIME'])
-            if not acknowledged_filter:
-                args = [row['SENSOR_UUID'], row['READING_TIME'], id]
-                val = st.checkbox(label='', value=select_all, key=id, args=args)
-                if val:
-                    selected_rows[id] = args
-                elif id in selected_rows:
-                    del selected_rows[id]
-            else:
-                st.checkbox(label='', value=True, disabled=True, key=id)
-        st.divider()
+    keys = [warning_key(*key) for key in zip(warning_data['SENSOR_UUID'], warning_data['FIRST_READING_TIME'])]
+    if not acknowledged_filter:
+        col1, col2, col3, col4 = st.columns([0.15, 0.15, 0.15, 0.55])
+        col1.button("Select page", on_click=select_page, args=[keys, selected_rows], key='selectAll')
+        col2.button("Clear selection", on_click=clear_selection, args=[selected_rows], key='clearSelection')
+        col3.button("Dismiss", on_click=lambda: dismiss_selected(session, selected_rows), key='dismissSelected')
+        col4.caption(f"{len(selected_rows):,} selected")
+
+    # one grid for the whole page, rather than a row of widgets per warning; its key
+    # changes whenever the selection is changed from outside it (see update_selection())
+    grid_key = f"warnings_grid/{st.session_state.get('warnings_grid_revision', 0)}"
+    st.data_editor(
+        warning_grid(warning_data, set(keys) if acknowledged_filter else selected_rows),
+        hide_index=True,
+        use_container_width=True,
+        disabled=acknowledged_filter or [
+            'READING TIMES', 'MACHINE NAME', 'SENSOR NAME', 'READINGS', 'READING COUNT', 'REASON'
+        ],
+        column_config={
+            'READING COUNT': st.column_config.NumberColumn(format="%d"),
+            'ACKNOWLEDGE': st.column_config.CheckboxColumn(),
+        },
+        key=grid_key,
+        on_change=update_selection,
+        args=[grid_key, keys, selected_rows]
+    )
+    st.selectbox(
+        'Show the readings of',
+        options=range(len(warning_data)),
+        index=None,
+        format_func=lambda row: episode_label(warning_data.iloc[row]),
+        key='episode_choice',
+        on_change=show_chosen_episode_readings,
+        args=[warning_data]
+    )
 
+    pager.render_controls()
+    # every matching warning, not just the page; streamed to the file batch by batch
+    export_where = warning_filter(machines, sensor_types, min_ts, max_ts)
+    export_where.add("warning.acknowledged = ?", bool(acknowledged_filter))
+    render_export(
+        'Export warnings', 'warnings', 'warnings',
+        lambda: warning_query(session, export_where, include_archived)
+    )
     st.session_state['selected_rows'] = selected_rows
 
-def dismiss_selected(session: Session, selected_rows):
-    for x in selected_rows.keys():
-        val = selected_rows[x]
+def acknowledge_warnings(session: Session, where: SqlFilter, extra_source: str = "", source_params: Optional[List] = None):
+    """
+    Acknowledges the unacknowledged warning episodes matching `where` (over `warning`,
+    `sensor` and the optional `extra_source`, whose binds are `source_params`), and
+    takes them off the warning_counts that the banner reads, in one transaction.
+    An acknowledged episode is closed: if its sensor keeps getting the warning, the
+    next warning check starts a new one.
+    """
+    source = f"reference('SENSORS') sensor{', ' + extra_source if extra_source else ''}"
+    where_clause = ' and '.join(
+        ["sensor.uuid = warning.sensor_uuid", "warning.acknowledged = false"] + where.predicates
+    )
+    params = (source_params or []) + where.params
+    session.sql("begin transaction").collect()
+    try:
         session.sql(f"""
-            update warnings_data.warnings set acknowledged = true where sensor_uuid = '{val[0]}' and reading_time = '{val[1]}'
-        """).collect()
-    st.session_state['selected_rows'] = {}
+            merge into warnings_data.warning_counts counts
+                using (
+                    select sensor.machine_uuid, sensor.sensor_type_id, warning.reason, count(*) as acknowledged_count
+                    from warnings_data.warning_episodes warning, {source}
+                    where {where_clause}
+                    group by 1, 2, 3
+                ) acknowledged
+                on equal_null(counts.machine_uuid, acknowledged.machine_uuid)
+                    and equal_null(counts.sensor_type_id, acknowledged.sensor_type_id)
+                    and equal_null(counts.reason, acknowledged.reason)
+                when matched and counts.unacknowledged_count <= acknowledged.acknowledged_count then delete
+                when matched then
+                    update set unacknowledged_count = counts.unacknowledged_count - acknowledged.acknowledged_count
+        """, params=params).collect()
+        session.sql(f"""
+            update warnings_data.warning_episodes warning
+                set acknowledged = true, is_open = false
+                from {source}
+                where {where_clause}
+        """, params=params).collect()
+        session.sql("commit").collect()
+    except Exception:
+        # a failed statement must not leave the session inside the transaction
+        session.sql("rollback").collect()
+        raise
+
+def dismiss_selected(session: Session, selected_rows: Set[Tuple[str, str]]):
+    """ Acknowledges every selected warning at once, whatever the number selected """
+    if selected_rows:
+        warning_keys = [list(key) for key in sorted(selected_rows)]
+        acknowledge_warnings(
+            session,
+            SqlFilter([
+                "warning.sensor_uuid = selected.sensor_uuid",
+                "warning.first_reading_time = selected.first_reading_time",
+            ]),
+            extra_source="""(
+                select
+                    warning_key.value[0]::varchar as sensor_uuid,
+                    warning_key.value[1]::timestamp as first_reading_time
+                from table(flatten(input => parse_json(?))) warning_key
+            ) selected""",
+            source_params=[json.dumps(warning_keys)]
+        )
+    st.session_state['selected_rows'] = set()
+
+def dismiss_matching(
+        session: Session,
+        machines: Optional[List[Machine]] = None,
+        sensor_types: Optional[List[SensorType]] = None,
+        min_ts: Optional[Tuple[dt.date, dt.time]] = None,
+        max_ts: Optional[Tuple[dt.date, dt.time]] = None
+):
+    """ Acknowledges every warning matching the dashboard filters, not just the ones on screen """
+    acknowledge_warnings(session, warning_filter(machines, sensor_types, min_ts, max_ts))
+    st.session_state['selected_rows'] = set()
 
 def dismiss_all(session: Session):
-    session.sql(f"update warnings_data.warnings set acknowledged = true").collect()
-    st.session_state['selected_rows'] = {}
+    session.sql("begin transaction").collect()
+    try:
+        session.sql(f"""
+            update warnings_data.warning_episodes set acknowledged = true, is_open = false where acknowledged = false
+        """).collect()
+        session.sql(f"delete from warnings_data.warning_counts").collect()
+        session.sql("commit").collect()
+    except Exception:
+        session.sql("rollback").collect()
+        raise
+    st.session_state['selected_rows'] = set()
 
 if __name__ == "__main__":
-    session = Session.builder.getOrCreate()
+    session = InstrumentedSession(Session.builder.getOrCreate(), page="Dashboard")
     if 'selected_rows' not in st.session_state:
-        st.session_state['selected_rows'] = {}
+        st.session_state['selected_rows'] = set()
 
     selected_rows = st.session_state['selected_rows']
 
-    if not get_is_first_time_setup_dismissed(session):
+    if not get_app_snapshot(session).is_first_time_setup_dismissed:
         render_first_time_setup(session)
     else:
         render(session, selected_rows)
@@ -0,0 +1,66 @@
+import streamlit as st
+from snowflake.snowpark import Session
+
+from app_snapshot import get_app_snapshot
+from first_time_setup import render as render_first_time_setup
+from query_stats import InstrumentedSession, get_query_stats
+
+WINDOWS = {'Last hour': 1, 'Last day': 24, 'Last week': 24 * 7}
+
+def get_call_site_stats(session: Session, window_hours: int):
+    return session.sql(f"""
+        select
+            page,
+            call_site,
+            count(*) as queries,
+            percentile_cont(0.5) within group (order by duration_ms) as p50_ms,
+            percentile_cont(0.95) within group (order by duration_ms) as p95_ms,
+            avg(rows_returned) as avg_rows,
+            avg(bytes_materialized) as avg_bytes,
+            avg(iff(cache_hit, 1, 0)) as cache_hit_rate
+        from ui_data.query_stats
+        where recorded_at >= dateadd(hour, -?, sysdate())
+        group by page, call_site
+        order by p95_ms desc
+    """, params=[window_hours]).to_pandas()
+
+def get_slowest_queries(session: Session, window_hours: int, count: int = 20):
+    return session.sql(f"""
+        select recorded_at, page, call_site, duration_ms, rows_returned, bytes_materialized, query_text
+        from ui_data.query_stats
+        where recorded_at >= dateadd(hour, -?, sysdate())
+            and not cache_hit
+        order by duration_ms desc
+        limit {count}
+    """, params=[window_hours]).to_pandas()
+
+def clear_stats(session: Session):
+    session.sql("delete from ui_data.query_stats").collect()
+
+def render(session: Session):
+    st.set_page_config(layout="wide")
+    st.header("Performance")
+    st.caption("""
+        Queries run by each page, timed from the Streamlit process that ran them.
+        Pages write what they recorded here once a minute.
+    """)
+
+    col1, col2 = st.columns([0.7, 0.3])
+    window = col1.selectbox('Time window', options=list(WINDOWS), key='window')
+    col2.button("Clear statistics", on_click=lambda: clear_stats(session))
+
+    st.subheader("Per call site")
+    st.dataframe(get_call_site_stats(session, WINDOWS[window]), use_container_width=True)
+
+    st.subheader("Slowest recent queries")
+    st.dataframe(get_slowest_queries(session, WINDOWS[window]), use_container_width=True)
+
+    with st.expander("This page's own queries, since it started"):
+        st.dataframe(get_query_stats().summary(), use_container_width=True)
+
+if __name__ == "__main__":
+    session = InstrumentedSession(Session.builder.getOrCreate(), page="Performance")
+    if not get_app_snapshot(session).is_first_time_setup_dismissed:
+        render_first_time_setup(session)
+    else:
+        render(session)
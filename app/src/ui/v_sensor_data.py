@@ -1,17 +1,26 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple, Any
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple, Any
 import datetime as dt
 
 import altair as alt
 import pandas as pd
 import streamlit as st
-from snowflake.snowpark import Session
-
-from ui_common import warnings_banner
-from first_time_setup import get_is_first_time_setup_dismissed, \
-    render as render_first_time_setup
-from chairlift_data import Machine, SensorType, get_machines, \
-    get_sensor_types
+from snowflake.snowpark import DataFrame, Session
+
+from ui_common import submit_warning_counts, warnings_banner
+from app_snapshot import get_app_snapshot, get_snapshot_machines, get_snapshot_sensor_types, \
+    prefetch_snapshot_lists
+from first_time_setup import render as render_first_time_setup
+from export import render_export
+from chairlift_data import Machine, SensorType
+from pagination import PageKey, Pager, after_key_filter
+from filter_sql import SqlFilter, half_open_range, machine_filter, \
+    sensor_type_filter, time_range_filter, to_bind
+from reading_cache import AppendOnlyCache
+from reading_window import ReadingWindow
+from query_results import to_compact_pandas
+from query_scheduler import QueryScheduler
+from query_stats import InstrumentedSession, cache_data, record_cache_use
 
 @dataclass
 class TimestampFilter:
@@ -41,7 +50,73 @@ class Filters:
 st.set_page_config(layout="wide")
 
 
-@st.cache_data
+# charts never need more points per series than they have pixels to draw them on
+CHART_MAX_POINTS = 1500
+
+# readings arrive every 30s, so there's nothing to gain from smaller buckets
+MIN_BUCKET_SECONDS = 30
+
+# how often cached results that include the latest readings look for newer ones
+READING_REFRESH_SECONDS = MIN_BUCKET_SECONDS
+
+# the resolutions of readings_data.sensor_reading_rollups, coarsest first
+ROLLUP_DATE_PARTS = {86400: 'day', 3600: 'hour', 60: 'minute'}
+
+# charts read the coarsest rollup that still gives them this many points per series;
+# date ranges too short for any rollup read the readings themselves
+CHART_MIN_POINTS = 300
+
+# full-resolution readings held in memory by each Streamlit process
+READING_CACHE_BYTES = 256 * 1024 * 1024
+
+# repeated on every row of a sensor data result
+CATEGORY_COLUMNS = ['MACHINE_NAME', 'SENSOR_NAME', 'STATUS']
+
+# live mode charts the latest readings of each sensor: two hours of 30s readings
+LIVE_WINDOW_READINGS = 240
+LIVE_REFRESH_SECONDS = [5, 15, 30, 60]
+LIVE_GRAPH_KEY = 'live_graph'
+
+# charts per row
+MAX_COLUMNS = 3
+
+
+def sensor_data_filter(filters: Optional[Filters]) -> SqlFilter:
+    """ Everything but the date range, which callers add as a half-open range """
+    sql_filter = SqlFilter()
+    if filters:
+        sql_filter.extend(machine_filter("sensor.machine_uuid", filters.machines))
+        sql_filter.extend(sensor_type_filter("sensor.sensor_type_id", filters.sensor_types))
+        if filters.only_alerts:
+            sql_filter.add("(reading.reading < sensor_range.min_range or reading.reading > sensor_range.max_range)")
+    return sql_filter
+
+def sensor_data_range(filters: Optional[Filters]) -> Tuple[Optional[dt.datetime], Optional[dt.datetime]]:
+    if not filters:
+        return None, None
+    return half_open_range(
+        filters.min_ts.to_datetime() if filters.min_ts else None,
+        filters.max_ts.to_datetime() if filters.max_ts else None
+    )
+
+def sensor_data_where(filters: Optional[Filters]) -> SqlFilter:
+    return sensor_data_filter(filters).extend(
+        time_range_filter("reading.reading_time", *sensor_data_range(filters))
+    )
+
+
+def to_cache_ts(timestamp: Optional[dt.datetime]) -> Optional[pd.Timestamp]:
+    return pd.Timestamp(timestamp) if timestamp is not None else None
+
+@st.cache_resource
+def get_reading_cache() -> AppendOnlyCache:
+    # a machine's sensor has one reading at a time
+    return AppendOnlyCache(
+        'TS', max_bytes=READING_CACHE_BYTES, refresh_seconds=READING_REFRESH_SECONDS,
+        key_columns=['MACHINE_NAME', 'SENSOR_NAME']
+    )
+
+@record_cache_use
 def get_sensor_data(
     _session: Session,
     filters: Optional[Filters] = None
@@ -49,34 +124,41 @@ def get_sensor_data(
     """
     Fetches sensor data from snowflake, with optional filtering.
     Uses references defined in the app manfiest.yml to query consumer data directly.
-    """
-
-    where_predicates: List[str] = []
-    if filters:
-        if filters.machines:
-            predicates = [f"sensor.machine_uuid = '{machine.uuid}'" for machine in filters.machines]
-            or_clause = ' or '.join(predicates)
-            where_predicates.append(f"({or_clause})")
-        
-        if filters.sensor_types:
-            predicates = [f"sensor.sensor_type_id = {sensor_type.id}" for sensor_type in filters.sensor_types]
-            or_clause = ' or '.join(predicates)
-            where_predicates.append(f"({or_clause})")
-        
-        if filters.only_alerts:
-            where_predicates.append(f"status <> ''")
-
-        if filters.min_ts:
-            min_epoch_sec = filters.min_ts.to_unix_timestamp()
-            where_predicates.append(f"reading.reading_time >= TO_TIMESTAMP({min_epoch_sec})")
-
-        if filters.max_ts:
-            max_epoch_sec = filters.max_ts.to_unix_timestamp()
-            where_predicates.append(f"reading.reading_time <= TO_TIMESTAMP({max_epoch_sec})")
 
-    where_clause = f"where {' and '.join(where_predicates)}" if where_predicates else ""
-
-    return _session.sql(f"""
+    Readings are append-only, so results are cached per machine / sensor type /
+    alert filter; later calls only fetch readings from the newest one cached on,
+    and a date range inside one that was already fetched doesn't query at all.
+    """
+    filters = filters or Filters([], [], None, None, False)
+    sql_filter = sensor_data_filter(filters)
+    # the bound query text and values identify the filter, whatever order it was picked in
+    signature = (tuple(sql_filter.predicates), tuple(sql_filter.params))
+    start, end = sensor_data_range(filters)
+
+    def fetch(min_ts, max_ts, from_ts) -> pd.DataFrame:
+        where = sensor_data_filter(filters).extend(time_range_filter("reading.reading_time", min_ts, max_ts))
+        if from_ts is not None:
+            where.add("reading.reading_time >= ?::timestamp", to_bind(from_ts))
+        return query_sensor_data(_session, where)
+
+    return get_reading_cache().get(signature, to_cache_ts(start), to_cache_ts(end), fetch)
+
+def query_sensor_data(session: Session, where: SqlFilter) -> pd.DataFrame:
+    return to_compact_pandas(sensor_data_query(session, where), categories=CATEGORY_COLUMNS, integers=['VALUE'])
+
+def sensor_data_query(
+    session: Session,
+    where: SqlFilter,
+    limit: Optional[int] = None,
+    with_machine_uuid: bool = False
+) -> DataFrame:
+    """
+    The readings matching `where`, newest first, without fetching them; the first
+    `limit` of them, if given. Pages also need the MACHINE_UUID they are keyed on.
+    """
+    machine_uuid_column = ",\n            sensor.machine_uuid as machine_uuid" if with_machine_uuid else ""
+    limit_clause = f"limit {int(limit)}" if limit is not None else ""
+    return session.sql(f"""
         select 
             reading.reading_time as ts,
             machine.name as machine_name,
@@ -86,7 +168,7 @@ def get_sensor_data(
                 when reading.reading < sensor_range.min_range then '⚠️ LOW'
                 when reading.reading > sensor_range.max_range then '⚠️ HIGH'
                 else ''
-            end as status
+            end as status{machine_uuid_column}
 
         from reference('SENSOR_READINGS') reading
         inner join reference('SENSORS') sensor
@@ -96,25 +178,305 @@ def get_sensor_data(
         inner join shared_content.SENSOR_RANGES sensor_range
             on sensor_range.id = sensor.sensor_type_id
     
-        {where_clause}
+        {where.where_clause()}
 
         order by
             ts desc,
             machine_uuid asc,
             sensor_name asc
-    """).to_pandas()
+
+        {limit_clause}
+    """, params=where.params)
+
+def get_live_readings(
+    session: Session,
+    filters: Filters,
+    after: Optional[pd.Timestamp]
+) -> pd.DataFrame:
+    """
+    The readings from `after` on, including those at `after`, which ReadingWindow
+    skips if it has them already; the first time, the last LIVE_WINDOW_READINGS
+    readings' worth of time up to the newest reading. The date filter doesn't apply.
+    """
+    where = sensor_data_filter(filters)
+    if after is not None:
+        where.add("reading.reading_time >= ?::timestamp", to_bind(after.to_pydatetime()))
+    else:
+        where.add(
+            "reading.reading_time > dateadd(second, ?, (select max(reading_time) from reference('SENSOR_READINGS')))",
+            -LIVE_WINDOW_READINGS * MIN_BUCKET_SECONDS
+        )
+    return query_sensor_data(session, where)
+
+@cache_data(ttl=READING_REFRESH_SECONDS)
+def get_sensor_data_page(
+    _session: Session,
+    filters: Optional[Filters] = None,
+    after: Optional[PageKey] = None,
+    page_size: int = 20
+) -> pd.DataFrame:
+    """
+    One page of get_sensor_data(): the readings that follow `after`, plus one extra
+    row if there's a next page. Cached for READING_REFRESH_SECONDS, so that the first
+    page keeps up with new readings.
+    """
+
+    where = sensor_data_where(filters)
+    if after:
+        where.extend(after_key_filter(after, "reading.reading_time", "sensor.machine_uuid", "sensor.name"))
+
+    return to_compact_pandas(
+        sensor_data_query(_session, where, limit=page_size + 1, with_machine_uuid=True),
+        categories=CATEGORY_COLUMNS + ['MACHINE_UUID'], integers=['VALUE']
+    )
+
+class NoRollupsYet(Exception):
+    pass
+
+@cache_data
+def query_first_rollup_day(_session: Session) -> dt.datetime:
+    first_day = _session.sql("""
+        select min(bucket_start) as FIRST_DAY
+        from readings_data.sensor_reading_rollups
+        where bucket_seconds = 86400
+    """).collect()[0]['FIRST_DAY']
+    if first_day is None:
+        # raised rather than returned, as st.cache_data doesn't keep exceptions
+        raise NoRollupsYet()
+    return pd.Timestamp(first_day).to_pydatetime()
+
+def get_first_rollup_day(_session: Session) -> Optional[dt.datetime]:
+    """
+    The first day of rolled up readings; None until the rollups first ran. Only a
+    day that was found is cached, so the charts start using the rollups once they do.
+    """
+    try:
+        return query_first_rollup_day(_session)
+    except NoRollupsYet:
+        return None
+
+def rollup_bucket_seconds(start: dt.datetime, end: dt.datetime) -> Optional[int]:
+    """ The coarsest rollup with CHART_MIN_POINTS buckets in [start, end), if any """
+    span_seconds = (end - start).total_seconds()
+    return next(
+        (seconds for seconds in ROLLUP_DATE_PARTS if span_seconds / seconds >= CHART_MIN_POINTS),
+        None
+    )
+
+@cache_data(ttl=READING_REFRESH_SECONDS)
+def get_downsampled_sensor_data(
+    _session: Session,
+    filters: Optional[Filters] = None,
+    max_points: int = CHART_MAX_POINTS
+) -> pd.DataFrame:
+    """
+    Like get_sensor_data(), but groups readings into at most `max_points` time buckets
+    per machine and sensor, sized to the range of the selected readings. Each bucket
+    has the average reading as VALUE, plus MIN_VALUE and MAX_VALUE so that spikes
+    inside a bucket are still visible on the chart.
+
+    Long date ranges are read from the rollups instead of the readings (see
+    get_rolled_up_sensor_data()); hiding in-spec readings needs every reading.
+    Cached for READING_REFRESH_SECONDS, so that the chart keeps up with new readings.
+    """
+
+    start, end = sensor_data_range(filters)
+    if not (filters and filters.only_alerts):
+        first = start or get_first_rollup_day(_session)
+        bucket_seconds = rollup_bucket_seconds(first, end or dt.datetime.now()) if first else None
+        if bucket_seconds:
+            return get_rolled_up_sensor_data(_session, filters, bucket_seconds, max_points)
+
+    where = sensor_data_where(filters)
+
+    return to_compact_pandas(_session.sql(f"""
+        with readings as (
+            select
+                reading.reading_time,
+                reading.reading,
+                sensor.machine_uuid,
+                machine.name as machine_name,
+                sensor.name as sensor_name,
+                sensor_range.min_range,
+                sensor_range.max_range
+
+            from reference('SENSOR_READINGS') reading
+            inner join reference('SENSORS') sensor
+                on sensor.uuid = reading.sensor_uuid
+            inner join reference('MACHINES') machine
+                on machine.uuid = sensor.machine_uuid
+            inner join shared_content.SENSOR_RANGES sensor_range
+                on sensor_range.id = sensor.sensor_type_id
+
+            {where.where_clause()}
+        ),
+        buckets as (
+            select
+                min(reading_time) as first_ts,
+                greatest(
+                    ceil(datediff(second, min(reading_time), max(reading_time)) / {max_points}),
+                    {MIN_BUCKET_SECONDS}
+                ) as bucket_seconds
+            from readings
+        )
+        select
+            dateadd(
+                second,
+                floor(datediff(second, buckets.first_ts, readings.reading_time) / buckets.bucket_seconds) * buckets.bucket_seconds,
+                buckets.first_ts
+            ) as ts,
+            readings.machine_name,
+            readings.sensor_name,
+            avg(readings.reading) as value,
+            min(readings.reading) as min_value,
+            max(readings.reading) as max_value,
+            case
+                when min(readings.reading) < min(readings.min_range) then '⚠️ LOW'
+                when max(readings.reading) > max(readings.max_range) then '⚠️ HIGH'
+                else ''
+            end as status
+
+        from readings, buckets
+
+        group by
+            ts,
+            readings.machine_uuid,
+            readings.machine_name,
+            readings.sensor_name
+
+        order by
+            ts desc,
+            readings.machine_uuid asc,
+            readings.sensor_name asc
+    """, params=where.params), categories=CATEGORY_COLUMNS, floats=['VALUE'], integers=['MIN_VALUE', 'MAX_VALUE'])
+
+def get_rolled_up_sensor_data(
+    _session: Session,
+    filters: Optional[Filters],
+    bucket_seconds: int,
+    max_points: int = CHART_MAX_POINTS
+) -> pd.DataFrame:
+    """
+    get_downsampled_sensor_data() from the `bucket_seconds` rollups: the stored buckets
+    that start in the date range, plus the readings that came in after the rollups'
+    watermark, rolled up the same way, so the chart is as recent as the readings.
+    Buckets are then grouped into at most `max_points` per machine and sensor.
+    """
+    start, end = sensor_data_range(filters)
+    # the bucket the range starts in is charted whole
+    rollup_start = pd.Timestamp(start).floor(f"{bucket_seconds}s").to_pydatetime() if start else None
+    rollup_where = SqlFilter().add(f"stored.bucket_seconds = {bucket_seconds}").extend(
+        time_range_filter("stored.bucket_start", rollup_start, end)
+    )
+    recent_where = SqlFilter().add(
+        "(reading.reading_time > rollup_cursor.last_reading_ts"
+        " or (reading.reading_time = rollup_cursor.last_reading_ts and reading.sensor_uuid > rollup_cursor.last_sensor_uuid))"
+    ).extend(time_range_filter("reading.reading_time", start, end))
+    sensor_where = sensor_data_filter(filters)
+    date_part = ROLLUP_DATE_PARTS[bucket_seconds]
+
+    return to_compact_pandas(_session.sql(f"""
+        with rollup_cursor as (
+            select
+                coalesce(max(last_reading_ts), '1970-01-01'::timestamp) as last_reading_ts,
+                coalesce(max(last_sensor_uuid), '') as last_sensor_uuid
+            from readings_data.reading_rollup_cursor
+        ),
+        rollups as (
+            select
+                stored.sensor_uuid,
+                stored.bucket_start,
+                stored.reading_count,
+                stored.reading_sum,
+                stored.min_reading,
+                stored.max_reading
+            from readings_data.sensor_reading_rollups stored
+            {rollup_where.where_clause()}
+
+            union all
+
+            select
+                reading.sensor_uuid,
+                date_trunc('{date_part}', reading.reading_time) as bucket_start,
+                count(reading.reading) as reading_count,
+                sum(reading.reading) as reading_sum,
+                min(reading.reading) as min_reading,
+                max(reading.reading) as max_reading
+            from reference('SENSOR_READINGS') reading, rollup_cursor
+            {recent_where.where_clause()}
+            group by reading.sensor_uuid, date_trunc('{date_part}', reading.reading_time)
+        ),
+        readings as (
+            select
+                rollups.*,
+                sensor.machine_uuid,
+                machine.name as machine_name,
+                sensor.name as sensor_name,
+                sensor_range.min_range,
+                sensor_range.max_range
+
+            from rollups
+            inner join reference('SENSORS') sensor
+                on sensor.uuid = rollups.sensor_uuid
+            inner join reference('MACHINES') machine
+                on machine.uuid = sensor.machine_uuid
+            inner join shared_content.SENSOR_RANGES sensor_range
+                on sensor_range.id = sensor.sensor_type_id
+
+            {sensor_where.where_clause()}
+        ),
+        buckets as (
+            select
+                min(bucket_start) as first_ts,
+                greatest(
+                    ceil(datediff(second, min(bucket_start), max(bucket_start)) / {max_points}),
+                    {bucket_seconds}
+                ) as bucket_seconds
+            from readings
+        )
+        select
+            dateadd(
+                second,
+                floor(datediff(second, buckets.first_ts, readings.bucket_start) / buckets.bucket_seconds) * buckets.bucket_seconds,
+                buckets.first_ts
+            ) as ts,
+            readings.machine_name,
+            readings.sensor_name,
+            sum(readings.reading_sum) / nullif(sum(readings.reading_count), 0) as value,
+            min(readings.min_reading) as min_value,
+            max(readings.max_reading) as max_value,
+            case
+                when min(readings.min_reading) < min(readings.min_range) then '⚠️ LOW'
+                when max(readings.max_reading) > max(readings.max_range) then '⚠️ HIGH'
+                else ''
+            end as status
+
+        from readings, buckets
+
+        group by
+            ts,
+            readings.machine_uuid,
+            readings.machine_name,
+            readings.sensor_name
+
+        order by
+            ts desc,
+            readings.machine_uuid asc,
+            readings.sensor_name asc
+    """, params=rollup_where.params + recent_where.params + sensor_where.params),
+        categories=CATEGORY_COLUMNS, floats=['VALUE'], integers=['MIN_VALUE', 'MAX_VALUE'])
 
 def render_common_filters(session: Session):
     col1, col2 = st.columns([0.5, 0.5])
     machines = col1.multiselect(
         'Filter by machine',
-        options=get_machines(session),
+        options=get_snapshot_machines(session),
         format_func=lambda machine: machine.name,
         key='machines'
     )
     sensor_types = col2.multiselect(
         'Filter by sensor type',
-        options=get_sensor_types(session),
+        options=get_snapshot_sensor_types(session),
         format_func=lambda sensor_type: sensor_type.name,
         key='sensorTypes'
     )
@@ -132,16 +494,18 @@ def render_common_filters(session: Session):
         min_time = col2.time_input('From time', value=dt.time(0, 0, 0))
         min_ts = TimestampFilter(min_date, min_time)
         max_date = col3.date_input('To date', min_value=min_date, value=dt.date.today())
-        max_time = col4.time_input('To time', value=dt.time(23, 59, 59)) # FIXME: might miss last second of day!
+        max_time = col4.time_input('To time', value=dt.time(23, 59, 59))
         max_ts = TimestampFilter(max_date, max_time)
 
     return Filters(machines, sensor_types, min_ts, max_ts, only_alerts)
 
-def render_table(_filters: Filters, sensor_data: pd.DataFrame):
+def render_table(pager: Pager, page_rows: pd.DataFrame):
+    sensor_data = pager.current_page(page_rows, 'TS')
     st.dataframe(
-        sensor_data,
+        sensor_data.drop(columns=['MACHINE_UUID']),
         use_container_width=True
     )
+    pager.render_controls()
 
 def warning_line(y: float):
     return alt.Chart(
@@ -151,23 +515,36 @@ def warning_line(y: float):
         strokeDash=[5, 5],  # 5px dash, 5px gap
     ).encode(y='y')
 
-def render_graph(session: Session, filters: Filters, sensor_data: pd.DataFrame):
-    # one chart for each sensor type, with min / max lines
-    charts = []
-    for sensor_type in get_sensor_types(session):
-        # if there's no data for this graph, don't generate it
-        if len(sensor_data[(sensor_data['SENSOR_NAME'] == sensor_type.name)]) == 0:
-            continue
-
-        # adjust chart scale to have 20% space above and below the expected range
-        buffer = 0.2 * (sensor_type.max_range - sensor_type.min_range)
-        scale_min = sensor_type.min_range - buffer
-        scale_max = sensor_type.max_range + buffer
-
-        title=sensor_type.name
-        machine_readings = alt.Chart(sensor_data, title=title).mark_line(clip=True).encode(
-            x=alt.X('TS:T', title='Timestamp'),
-            y=alt.Y('VALUE:Q', title='Reading', scale=alt.Scale(zero=False, domain=(scale_min, scale_max))),
+def sensor_type_chart(sensor_type: SensorType, sensor_data: pd.DataFrame):
+    """ One sensor type's readings, by machine, with min / max lines """
+    # adjust chart scale to have 20% space above and below the expected range
+    buffer = 0.2 * (sensor_type.max_range - sensor_type.min_range)
+    scale_min = sensor_type.min_range - buffer
+    scale_max = sensor_type.max_range + buffer
+
+    title=sensor_type.name
+    machine_readings = alt.Chart(sensor_data, title=title).mark_line(clip=True).encode(
+        x=alt.X('TS:T', title='Timestamp'),
+        y=alt.Y('VALUE:Q', title='Reading', scale=alt.Scale(zero=False, domain=(scale_min, scale_max))),
+        color=alt.Color('MACHINE_NAME:N', title='Machine'),
+    ).transform_filter(
+        alt.FieldEqualPredicate(
+            field='SENSOR_NAME',
+            equal=sensor_type.name,
+        )
+    )
+
+    # N.B. we have altair v4.1.0, so no alt.datum
+    min_line = warning_line(sensor_type.min_range)
+    max_line = warning_line(sensor_type.max_range)
+    chart = (machine_readings + min_line + max_line)
+
+    # downsampled data: shade the spread of readings inside each bucket
+    if 'MIN_VALUE' in sensor_data.columns:
+        bucket_range = alt.Chart(sensor_data).mark_area(clip=True, opacity=0.2).encode(
+            x=alt.X('TS:T'),
+            y=alt.Y('MIN_VALUE:Q'),
+            y2=alt.Y2('MAX_VALUE:Q'),
             color=alt.Color('MACHINE_NAME:N', title='Machine'),
         ).transform_filter(
             alt.FieldEqualPredicate(
@@ -175,16 +552,20 @@ def render_graph(session: Session, filters: Filters, sensor_data: pd.DataFrame):
                 equal=sensor_type.name,
             )
         )
+        chart = (bucket_range + chart)
+    return chart
 
-        # N.B. we have altair v4.1.0, so no alt.datum
-        min_line = warning_line(sensor_type.min_range)
-        max_line = warning_line(sensor_type.max_range)
-        chart = (machine_readings + min_line + max_line)
-        charts.append(chart)
+def render_graph(session: Session, filters: Filters, sensor_data: pd.DataFrame):
+    # one chart for each sensor type
+    charts = [
+        sensor_type_chart(sensor_type, sensor_data)
+        for sensor_type in get_snapshot_sensor_types(session)
+        # if there's no data for this graph, don't generate it
+        if len(sensor_data[(sensor_data['SENSOR_NAME'] == sensor_type.name)]) > 0
+    ]
 
     # arrange charts into up to columns
     if charts:
-        MAX_COLUMNS = 3
         columns = st.columns(min(MAX_COLUMNS, len(charts)))
         for i, chart in enumerate(charts):
             col = columns[i % len(columns)]
@@ -193,20 +574,101 @@ def render_graph(session: Session, filters: Filters, sensor_data: pd.DataFrame):
                 use_container_width=True,
             )
 
+@dataclass
+class LiveGraph:
+    """ What live mode keeps between refreshes, for one set of filters """
+    signature: Hashable
+    window: ReadingWindow
+    # sensor type name -> the window version it was drawn from, and its chart
+    charts: Dict[str, Tuple[int, Any]] = field(default_factory=dict)
+
+def get_live_graph(filters: Filters) -> LiveGraph:
+    """ This session's live window, started over whenever the filters change """
+    sql_filter = sensor_data_filter(filters)
+    signature = (tuple(sql_filter.predicates), tuple(sql_filter.params))
+    live = st.session_state.get(LIVE_GRAPH_KEY)
+    if live is None or live.signature != signature:
+        live = LiveGraph(signature, ReadingWindow(LIVE_WINDOW_READINGS))
+        st.session_state[LIVE_GRAPH_KEY] = live
+    return live
+
+def render_live_chart(session: Session, filters: Filters, sensor_type: SensorType, refresh_seconds: int):
+    """
+    One chart of the live graph, as a fragment that reruns on its own every
+    `refresh_seconds`. The charts tick one after the other: the first to tick polls
+    for the readings of all of them, and a chart is only rebuilt when its sensor
+    type got new readings.
+    """
+    live = get_live_graph(filters)
+    if live.window.is_due(refresh_seconds / 2):
+        live.window.append(get_live_readings(session, filters, live.window.last_ts))
+
+    version = live.window.versions.get(sensor_type.name)
+    if version is None:
+        return
+    drawn = live.charts.get(sensor_type.name)
+    if drawn is None or drawn[0] != version:
+        drawn = (version, sensor_type_chart(sensor_type, live.window.sensor_readings(sensor_type.name)))
+        live.charts[sensor_type.name] = drawn
+    st.altair_chart(drawn[1], use_container_width=True)
+
+def render_live_graph(session: Session, filters: Filters, refresh_seconds: int):
+    sensor_types = filters.sensor_types or get_snapshot_sensor_types(session)
+    if not sensor_types:
+        return
+    live_chart = st.fragment(render_live_chart, run_every=refresh_seconds)
+    columns = st.columns(min(MAX_COLUMNS, len(sensor_types)))
+    for i, sensor_type in enumerate(sensor_types):
+        # a container each, so that charts sharing a column are fragments of their own
+        with columns[i % len(columns)].container():
+            live_chart(session, filters, sensor_type, refresh_seconds)
+
 def render(session: Session):
-    warnings_banner(session)
+    with QueryScheduler() as queries:
+        render_page(session, queries)
+
+def render_page(session: Session, queries: QueryScheduler):
+    warning_counts = submit_warning_counts(session, queries)
+    prefetch_snapshot_lists(session, queries)
+    banner = st.container()
     st.header("Sensor data")
     filters = render_common_filters(session)
-    sensor_data = get_sensor_data(session, filters)
 
     graph_tab, table_tab = st.tabs(["Plotted over time", "Raw sensor readings"])
-    with graph_tab: render_graph(session, filters, sensor_data)
-    with table_tab: render_table(filters, sensor_data)
+    with graph_tab:
+        full_resolution = st.checkbox('Plot every reading (slow for long date ranges)', key='fullResolution')
+        live = st.checkbox('Live: follow the latest readings', key='liveMode',
+                           help='Charts the last two hours of readings of each sensor, whatever the date filter')
+        if live:
+            refresh_seconds = st.selectbox('Refresh every (seconds)', LIVE_REFRESH_SECONDS, index=2,
+                                           key='liveRefreshSeconds')
+
+    # the banner, the chart and the table don't depend on each other: all three
+    # queries are started before any of them is drawn
+    graph_data = None if live else queries.submit(
+        get_sensor_data if full_resolution else get_downsampled_sensor_data, session, filters
+    )
+    pager = Pager('readings', filters)
+    page_rows = queries.submit(get_sensor_data_page, session, filters, pager.after, pager.page_size)
+
+    with banner: warnings_banner(session, warning_counts.result())
+    with graph_tab:
+        if graph_data:
+            render_graph(session, filters, graph_data.result())
+        else:
+            render_live_graph(session, filters, refresh_seconds)
+    with table_tab:
+        render_table(pager, page_rows.result())
+        # every matching reading, not just the page; streamed to the file batch by batch
+        render_export(
+            'Export readings', 'readings', 'sensor_readings',
+            lambda: sensor_data_query(session, sensor_data_where(filters))
+        )
 
 
 if __name__ == "__main__":
-    session = Session.builder.getOrCreate()
-    if not get_is_first_time_setup_dismissed(session):
+    session = InstrumentedSession(Session.builder.getOrCreate(), page="Sensor data")
+    if not get_app_snapshot(session).is_first_time_setup_dismissed:
         render_first_time_setup(session)
     else:
         render(session)
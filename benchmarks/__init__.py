@@ -0,0 +1,3 @@
+"""
+Local benchmarks for the chairlift app; see the Benchmarks section of the README.
+"""
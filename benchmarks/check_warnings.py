@@ -0,0 +1,220 @@
+"""
+Compares the set-based warnings_code.check_warnings() with the per-row cursor
+loop it replaced, on the local stand-in engine.
+
+    python -m benchmarks.check_warnings --readings 10000 1000000 50000000
+
+The set-based insert is read straight out of app/sql_lib, so this always times the
+statement the app ships. The cursor version is a transcription of the old procedure:
+one fetch per reading and one insert statement per warning. Snowflake charges a
+round trip for each of those statements, which a local engine does not; pass
+--statement-latency-ms to project that cost onto the measured time.
+"""
+import argparse
+import datetime as dt
+import functools
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .engine import LocalEngine, dateadd, extract_statement
+from .generator import generate
+
+CHECK_WARNINGS_SQL = "warnings_code-check_warnings_partition.sql"
+MERGE_EPISODES_SQL = "warnings_code-merge_warning_episodes.sql"
+REFRESH_MAINTENANCE_SQL = "warnings_code-refresh_sensor_maintenance.sql"
+
+INITIAL_CURSOR = """
+    select coalesce(max(last_reading_ts), datetime('now', '-1 year')), coalesce(max(last_sensor_uuid), '')
+    from warnings_data.warnings_reading_cursor
+    where partition_id = ?
+"""
+
+
+def _store_cursor(engine: LocalEngine, cursor_ts: str, cursor_uuid: str = '', partition_id: int = 0) -> None:
+    engine.sql("delete from warnings_data.warnings_reading_cursor where partition_id = ?", [partition_id])
+    engine.sql(
+        "insert into warnings_data.warnings_reading_cursor (partition_id, last_reading_ts, last_sensor_uuid) "
+        "values (?, ?, ?)",
+        [partition_id, cursor_ts, cursor_uuid]
+    )
+
+
+def partition_params(partition_id: int = 0, partition_count: int = 1) -> dict:
+    """ the procedure's arguments, for a scheduled run (no until_ts / until_uuid bound) """
+    return {"partition_id": partition_id, "partition_count": partition_count, "until_ts": None, "until_uuid": None}
+
+
+def refresh_sensor_maintenance(engine: LocalEngine) -> bool:
+    """ warnings_code.refresh_sensor_maintenance(); returns whether it had to rewrite the table """
+    sensors_hash = engine.scalar(extract_statement(REFRESH_MAINTENANCE_SQL, "select hash_agg("))
+    refreshes, refreshed_on, refreshed_hash = engine.sql(
+        extract_statement(REFRESH_MAINTENANCE_SQL, "select count(*), max(refreshed_on)")
+    )[0]
+    if refreshes > 0 and refreshed_on == engine.scalar("select current_date()") and refreshed_hash == sensors_hash:
+        return False
+    engine.sql("begin transaction")
+    engine.sql(extract_statement(REFRESH_MAINTENANCE_SQL, "delete from warnings_data.sensor_maintenance;"))
+    engine.sql(extract_statement(REFRESH_MAINTENANCE_SQL, "insert into warnings_data.sensor_maintenance ("))
+    engine.sql("delete from warnings_data.sensor_maintenance_refresh")
+    engine.sql(
+        "insert into warnings_data.sensor_maintenance_refresh (refreshed_on, sensors_hash) values (current_date, ?)",
+        [sensors_hash]
+    )
+    engine.sql("commit")
+    return True
+
+
+def merge_warning_episodes(engine: LocalEngine, partition_id: int = 0) -> None:
+    """ warnings_code.merge_warning_episodes(), statement for statement """
+    for starts_with in [
+        "update warnings_data.warning_episodes episode\n            set is_open = false",
+        "insert into warnings_data.warning_episodes (",
+        "update warnings_data.warning_episodes episode\n            set last_reading_time",
+        "delete from warnings_data.warning_episode_chunks",
+    ]:
+        engine.sql(extract_statement(MERGE_EPISODES_SQL, starts_with), {"partition_id": partition_id})
+
+
+def check_warnings_set_based(engine: LocalEngine, batch_rows: int = 100_000, max_rows: int = None,
+                             partition_id: int = 0, partition_count: int = 1) -> None:
+    """ one run of the procedure: chunks of `batch_rows`, up to `max_rows` (default: all) """
+    refresh_sensor_maintenance(engine)
+    next_chunk = extract_statement(CHECK_WARNINGS_SQL, "select count(*), max(reading_time)")
+    insert_chunk = extract_statement(CHECK_WARNINGS_SQL, "insert into warnings_data.warning_episode_chunks (")
+    cursor_ts, cursor_uuid = engine.sql(INITIAL_CURSOR, [partition_id])[0]
+    processed_rows = 0
+    while max_rows is None or processed_rows < max_rows:
+        params = {"cursor_ts": cursor_ts, "cursor_uuid": cursor_uuid, "batch_rows": batch_rows,
+                  **partition_params(partition_id, partition_count)}
+        chunk_rows, chunk_end_ts, chunk_end_uuid = engine.sql(next_chunk, params)[0]
+        if chunk_rows == 0:
+            break
+        engine.sql("begin transaction")
+        engine.sql(insert_chunk, {**params, "chunk_end_ts": chunk_end_ts, "chunk_end_uuid": chunk_end_uuid})
+        merge_warning_episodes(engine, partition_id)
+        cursor_ts, cursor_uuid = chunk_end_ts, chunk_end_uuid
+        _store_cursor(engine, cursor_ts, cursor_uuid, partition_id)
+        engine.sql("commit")
+        processed_rows += chunk_rows
+        if chunk_rows < batch_rows:
+            break
+
+
+def check_warnings_cursor(engine: LocalEngine) -> None:
+    """ the pre-rewrite procedure, statement for statement """
+    cursor_ts = engine.scalar(INITIAL_CURSOR, [0])
+    today = dt.date.today().isoformat()
+    c1 = engine.cursor("""
+        select uuid, reading_time, reading, installation_date, last_service_date, min_range, max_range,
+                service_interval_count, service_interval_unit, lifetime_count, lifetime_unit
+            from REFERENCE('sensor_readings') sre
+            join REFERENCE('sensors') s on s.uuid = sensor_uuid
+            join SHARED_CONTENT.SENSOR_TYPES_VIEW stv on s.sensor_type_id = stv.id
+            where reading_time > ?
+            order by reading_time asc
+    """, [cursor_ts])
+    for (uuid, reading_time, reading, installation_date, last_service_date, min_range, max_range,
+            service_interval_count, service_interval_unit, lifetime_count, lifetime_unit) in c1:
+        engine.statements += 1  # every FOR iteration is a fetch
+        next_service_date = dateadd(service_interval_unit, service_interval_count, last_service_date)
+        next_replacement_date = dateadd(lifetime_unit, lifetime_count, installation_date)
+        reason = None
+        if next_replacement_date is not None and next_replacement_date < today:
+            reason = 'SENSOR_LIFETIME_EXPIRED'
+        elif next_service_date is not None and next_service_date < today:
+            reason = 'SENSOR_SERVICE_DUE'
+        if reading is not None and min_range is not None and reading < min_range:
+            reason = 'SENSOR_READING_OUT_OF_RANGE'
+        elif reading is not None and max_range is not None and reading > max_range:
+            reason = 'SENSOR_READING_OUT_OF_RANGE'
+        elif reading is None:
+            reason = 'SENSOR_NOT_SENDING_DATA'
+        if reason is not None:
+            engine.connection.execute(
+                "insert into warnings_data.warnings(sensor_uuid, reason, reading, reading_time) values (?, ?, ?, ?)",
+                [uuid, reason, reading, reading_time]
+            )
+            engine.statements += 1
+        cursor_ts = reading_time
+    _store_cursor(engine, cursor_ts)
+
+
+def warnings_fingerprint(engine: LocalEngine) -> List[tuple]:
+    """ readings that got each warning, and the first and last of them, from either table """
+    episodes = engine.sql("""
+        select reason, sum(reading_count), min(first_reading_time), max(last_reading_time)
+        from warnings_data.warning_episodes group by reason order by reason
+    """)
+    return episodes or engine.sql("""
+        select reason, count(*), min(reading_time), max(reading_time)
+        from warnings_data.warnings group by reason order by reason
+    """)
+
+
+def warning_episodes(engine: LocalEngine) -> List[tuple]:
+    return engine.sql("""
+        select sensor_uuid, reason, first_reading_time, last_reading_time, reading_count, min_reading, max_reading, is_open
+        from warnings_data.warning_episodes order by sensor_uuid, first_reading_time
+    """)
+
+
+def reset_warnings(engine: LocalEngine) -> None:
+    engine.sql("delete from warnings_data.warnings")
+    engine.sql("delete from warnings_data.warning_episodes")
+    engine.sql("delete from warnings_data.warnings_reading_cursor")
+
+
+def run(readings: int, statement_latency_ms: float, skip_cursor_above: Optional[int], batch_rows: int) -> None:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, readings)
+        set_based = functools.partial(check_warnings_set_based, batch_rows=batch_rows)
+        for name, check_warnings in [("set-based", set_based), ("cursor", check_warnings_cursor)]:
+            if name == "cursor" and skip_cursor_above is not None and readings > skip_cursor_above:
+                print(f"{readings:>12,} {name:>10}  skipped (--skip-cursor-above {skip_cursor_above:,})")
+                continue
+            reset_warnings(engine)
+            engine.statements = 0
+            start = time.perf_counter()
+            check_warnings(engine)
+            elapsed = time.perf_counter() - start
+            projected = elapsed + engine.statements * statement_latency_ms / 1000
+            results[name] = warnings_fingerprint(engine)
+            warnings = sum(row[1] for row in results[name])
+            episodes = engine.scalar("select count(*) from warnings_data.warning_episodes")
+            print(f"{readings:>12,} {name:>10} {elapsed:>10.2f}s {engine.statements:>12,} {projected:>12.2f}s "
+                  f"{warnings:>12,} {f'{episodes:,}' if episodes else '':>10}")
+            if name == "set-based":
+                chunked = warning_episodes(engine)
+                reset_warnings(engine)
+                check_warnings_set_based(engine, batch_rows=readings)
+                if warning_episodes(engine) != chunked:
+                    print("  !! warning episodes depend on how the readings were chunked")
+        engine.close()
+
+    if len(results) == 2 and results["set-based"] != results["cursor"]:
+        print("  !! set-based and cursor versions produced different warnings")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, nargs="+", default=[10_000, 1_000_000, 50_000_000])
+    parser.add_argument("--statement-latency-ms", type=float, default=0.0,
+                        help="per-statement round trip to add to the measured time")
+    parser.add_argument("--skip-cursor-above", type=int, default=None,
+                        help="don't run the cursor version above this many readings")
+    parser.add_argument("--batch-rows", type=int, default=100_000,
+                        help="readings per chunk of the set-based version (warning_check_batch_rows)")
+    args = parser.parse_args(argv)
+
+    print(f"{'readings':>12} {'version':>10} {'local':>11} {'statements':>12} {'projected':>13} {'warnings':>12} "
+          f"{'episodes':>10}")
+    for readings in args.readings:
+        run(readings, args.statement_latency_ms, args.skip_cursor_above, args.batch_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+A local stand-in for the consumer account, backed by sqlite.
+
+The app's SQL refers to consumer tables through reference('...') and to provider
+data through shared_content.*; here those resolve to plain sqlite tables so the
+statements shipped in app/sql_lib can be timed on a laptop.
+"""
+import calendar
+import datetime as dt
+import functools
+import hashlib
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+SQL_LIB = Path(__file__).resolve().parent.parent / "app" / "sql_lib"
+
+# the app's schemas; each one becomes an attached sqlite database
+SCHEMAS = ["shared_content", "warnings_data", "readings_data", "config_data", "ui_data"]
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+CONSUMER_DDL = """
+    create table machines (
+        uuid varchar primary key,
+        name varchar
+    );
+    create table sensors (
+        uuid varchar primary key,
+        name varchar,
+        sensor_type_id int,
+        machine_uuid varchar,
+        last_reading int,
+        installation_date date,
+        last_service_date date
+    );
+    create table sensor_readings (
+        sensor_uuid varchar,
+        reading_time timestamp,
+        reading int,
+        primary key (sensor_uuid, reading_time)
+    );
+    create table shared_content.sensor_types_view (
+        id int primary key,
+        name varchar,
+        min_range int,
+        max_range int,
+        service_interval_count int,
+        service_interval_unit varchar,
+        lifetime_count int,
+        lifetime_unit varchar
+    );
+    create view shared_content.sensor_ranges as
+        select id, min_range, max_range from sensor_types_view;
+    create table warnings_data.warnings (
+        sensor_uuid varchar,
+        reading int,
+        reading_time timestamp,
+        reason varchar,
+        acknowledged boolean default false,
+        created_at timestamp default current_timestamp
+    );
+    create table warnings_data.warning_episodes (
+        sensor_uuid varchar,
+        reason varchar,
+        first_reading_time timestamp,
+        last_reading_time timestamp,
+        reading_count int,
+        min_reading int,
+        max_reading int,
+        is_open boolean default false,
+        acknowledged boolean default false,
+        created_at timestamp default current_timestamp
+    );
+    create table warnings_data.warning_episodes_archive (
+        sensor_uuid varchar,
+        reason varchar,
+        first_reading_time timestamp,
+        last_reading_time timestamp,
+        reading_count int,
+        min_reading int,
+        max_reading int,
+        archived_at timestamp default current_timestamp
+    );
+    create table warnings_data.warning_episode_chunks (
+        partition_id int,
+        sensor_uuid varchar,
+        reason varchar,
+        first_reading_time timestamp,
+        last_reading_time timestamp,
+        reading_count int,
+        min_reading int,
+        max_reading int,
+        is_first boolean,
+        is_last boolean
+    );
+    create table warnings_data.warnings_reading_cursor (
+        partition_id int default 0,
+        last_reading_ts timestamp not null,
+        last_sensor_uuid varchar
+    );
+    create table warnings_data.warning_counts (
+        machine_uuid varchar,
+        sensor_type_id int,
+        reason varchar,
+        unacknowledged_count int not null
+    );
+    create table config_data.configuration (
+        is_first_time_setup_dismissed boolean not null,
+        enable_warning_generation_task boolean default false,
+        warning_check_batch_rows int default 100000,
+        warning_check_max_rows int default 1000000,
+        warning_partition_count int default 1,
+        warning_check_adaptive boolean default false,
+        warning_check_interval_minutes int default 1,
+        warning_check_max_interval_minutes int default 30,
+        warning_retention_days int default 30,
+        warning_archive_retention_days int
+    );
+    insert into config_data.configuration (is_first_time_setup_dismissed, enable_warning_generation_task)
+        values (true, false);
+    create table warnings_data.sensor_maintenance (
+        sensor_uuid varchar not null,
+        next_service_date date,
+        next_replacement_date date,
+        maintenance_reason varchar
+    );
+    create table config_data.window_rules (
+        sensor_type_id int not null,
+        rule varchar not null,
+        window_readings int not null,
+        threshold float
+    );
+    create table warnings_data.sensor_window_state (
+        sensor_uuid varchar not null,
+        last_reading_time timestamp,
+        state varchar
+    );
+    create table warnings_data.window_rule_chunks (
+        partition_id int,
+        sensor_uuid varchar,
+        reading_time timestamp,
+        reason varchar,
+        state varchar
+    );
+    create table warnings_data.sensor_maintenance_refresh (
+        refreshed_on date not null,
+        sensors_hash int
+    );
+    create table warnings_data.warning_check_runs (
+        started_at timestamp not null,
+        finished_at timestamp,
+        skipped boolean not null,
+        interval_minutes int
+    );
+    create table readings_data.sensor_reading_rollups (
+        sensor_uuid varchar not null,
+        bucket_seconds int not null,
+        bucket_start timestamp not null,
+        reading_count int not null,
+        reading_sum real,
+        min_reading int,
+        max_reading int,
+        out_of_range_count int not null,
+        primary key (sensor_uuid, bucket_seconds, bucket_start)
+    );
+    create table readings_data.sensor_reading_rollup_chunks (
+        sensor_uuid varchar not null,
+        bucket_seconds int not null,
+        bucket_start timestamp not null,
+        reading_count int not null,
+        reading_sum real,
+        min_reading int,
+        max_reading int,
+        out_of_range_count int not null
+    );
+    create table readings_data.reading_rollup_cursor (
+        last_reading_ts timestamp not null,
+        last_sensor_uuid varchar
+    );
+    create table ui_data.query_stats (
+        recorded_at timestamp not null,
+        page varchar,
+        call_site varchar,
+        duration_ms float,
+        rows_returned int,
+        bytes_materialized int,
+        cache_hit boolean,
+        query_text varchar
+    );
+"""
+
+# same rows as prepare/provider-data.sql
+SENSOR_TYPES = [
+    (1, 'Brake Temperature', -40, 40, 6, 'month', 5, 'year'),
+    (2, 'Current Load', 20000, 50000, 3, 'month', 5, 'year'),
+    (3, 'Bull-wheel RPM', 4000, 5000, 1, 'month', 1, 'year'),
+    (4, 'Motor RPM', 2000, 2500, 1, 'month', 1, 'year'),
+    (5, 'Motor Voltage', 110, 130, 2, 'month', 5, 'year'),
+    (6, 'Current Temperature', -40, 40, 4, 'month', 5, 'year'),
+    (7, 'Rope Tension', 70, 100, 3, 'month', 5, 'year'),
+    (8, 'Chairlift Load', 50, 250, 3, 'month', 2, 'year'),
+    (9, 'Chairlift Vibration', 30, 100, 3, 'month', 3, 'year'),
+]
+
+
+def _add_months(date: dt.date, months: int) -> dt.date:
+    month_index = date.month - 1 + months
+    year = date.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(date.day, calendar.monthrange(year, month)[1])
+    return dt.date(year, month, day)
+
+
+@functools.lru_cache(maxsize=4096)
+def dateadd(unit: Optional[str], count: Optional[int], value: Optional[str]) -> Optional[str]:
+    """ Snowflake's dateadd() for the date parts used by the app """
+    if unit is None or count is None or value is None:
+        return None
+    unit = unit.lower()
+    is_timestamp = len(value) > 10
+    parsed = dt.datetime.strptime(value[:19], TS_FORMAT) if is_timestamp \
+        else dt.datetime.strptime(value, "%Y-%m-%d")
+    if unit in ("year", "quarter", "month"):
+        months = count * {"year": 12, "quarter": 3, "month": 1}[unit]
+        result = dt.datetime.combine(_add_months(parsed.date(), months), parsed.time())
+    else:
+        seconds = {"week": 604800, "day": 86400, "hour": 3600, "minute": 60, "second": 1}[unit]
+        result = parsed + dt.timedelta(seconds=count * seconds)
+    return result.strftime(TS_FORMAT) if is_timestamp else result.strftime("%Y-%m-%d")
+
+
+def datediff(unit: Optional[str], start: Optional[str], end: Optional[str]) -> Optional[float]:
+    """
+    Snowflake's datediff() for the time parts used by the app; returned as a float,
+    because sqlite's / truncates integers where Snowflake's doesn't
+    """
+    if unit is None or start is None or end is None:
+        return None
+    seconds = {"day": 86400, "hour": 3600, "minute": 60, "second": 1, "millisecond": 0.001}[unit.lower()]
+    start_ts = dt.datetime.fromisoformat(start)
+    end_ts = dt.datetime.fromisoformat(end)
+    return float((end_ts - start_ts) // dt.timedelta(seconds=seconds))
+
+
+def date_trunc(part: Optional[str], value: Optional[str]) -> Optional[str]:
+    """ Snowflake's date_trunc() for the date parts of the reading rollups """
+    if part is None or value is None:
+        return None
+    length = {"minute": 16, "hour": 13, "day": 10}[part.lower()]
+    return value[:length] + "0000-00-00 00:00:00"[length:]
+
+
+def snowflake_hash(value: Any) -> int:
+    """ stands in for Snowflake's hash(): a stable 64-bit signed hash (not the same values) """
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class PercentileCont:
+    """ percentile_cont(fraction) within group (order by value), as an aggregate """
+
+    def __init__(self):
+        self.values = []
+        self.fraction = None
+
+    def step(self, value, fraction):
+        self.fraction = fraction
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        position = (len(values) - 1) * self.fraction
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class HashAgg:
+    """ hash_agg(...): an order-independent hash of every row's values """
+
+    def __init__(self):
+        self.total = 0
+
+    def step(self, *values):
+        self.total = (self.total + snowflake_hash(values)) % 2 ** 64
+
+    def finalize(self):
+        return self.total - 2 ** 64 if self.total >= 2 ** 63 else self.total
+
+
+# rewrites from Snowflake syntax to the sqlite dialect; kept deliberately small,
+# covering what the app's own queries use, so statements that need more than this
+# should be transcribed by hand
+_REWRITES = [
+    (re.compile(r"reference\('(\w+)'\)", re.IGNORECASE), lambda m: m.group(1).lower()),
+    (re.compile(r"warnings_code\.add_interval\(", re.IGNORECASE), lambda m: "dateadd("),
+    (re.compile(r"current_date\(\)", re.IGNORECASE), lambda m: "current_date"),
+    (re.compile(r"current_timestamp\(\)", re.IGNORECASE), lambda m: "current_timestamp"),
+    (re.compile(r"sysdate\(\)", re.IGNORECASE), lambda m: "datetime('now')"),
+    (re.compile(r"table\(flatten\(input => parse_json\(\?\)\)\)", re.IGNORECASE), lambda m: "json_each(?)"),
+    (re.compile(r"::\s*\w+(\(\s*\d+\s*(,\s*\d+\s*)?\))?"), lambda m: ""),
+    (re.compile(r"\b(dateadd|datediff)\(\s*(year|quarter|month|week|day|hour|minute|second|millisecond)\s*,", re.IGNORECASE),
+        lambda m: f"{m.group(1)}('{m.group(2)}',"),
+    (re.compile(r"\bgreatest\(", re.IGNORECASE), lambda m: "max("),
+    (re.compile(r"\bleast\(", re.IGNORECASE), lambda m: "min("),
+    (re.compile(r"\bupdate\s+([\w.]+)\s+(?!set\b)(\w+)\s+set\b", re.IGNORECASE),
+        lambda m: f"update {m.group(1)} as {m.group(2)} set"),
+    (re.compile(r"\biff\(", re.IGNORECASE), lambda m: "iif("),
+    (re.compile(r"\bcount_if\((\w+)\)", re.IGNORECASE), lambda m: f"count(nullif({m.group(1)}, 0))"),
+    (re.compile(r"percentile_cont\(([\d.]+)\)\s+within group\s*\(\s*order by ([^)]+)\)", re.IGNORECASE),
+        lambda m: f"percentile_cont({m.group(2)}, {m.group(1)})"),
+]
+
+
+def to_sqlite(statement: str) -> str:
+    for pattern, replacement in _REWRITES:
+        statement = pattern.sub(replacement, statement)
+    return statement
+
+
+def extract_statement(sql_file: str, starts_with: str) -> str:
+    """
+    Pulls a single statement (up to the terminating semicolon) out of a file in
+    app/sql_lib, so the benchmark always runs the SQL the app actually ships.
+    A Snowflake Scripting `into :variable, ...` clause is dropped; the values it
+    would assign are the row the statement returns.
+    """
+    text = (SQL_LIB / sql_file).read_text()
+    start = text.lower().index(starts_with.lower())
+    end = text.index(";", start)
+    return re.sub(r"\binto\s+:\w+(\s*,\s*:\w+)*", "", text[start:end], flags=re.IGNORECASE)
+
+
+class LocalEngine:
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        # check_same_thread: AppTest runs page scripts on a thread of its own
+        self.connection = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+        self.statements = 0
+        for schema in SCHEMAS:
+            target = ":memory:" if str(path) == ":memory:" else f"{path}.{schema}"
+            self.connection.execute(f"attach database '{target}' as {schema}")
+        self.connection.create_function("dateadd", 3, dateadd, deterministic=True)
+        self.connection.create_function("datediff", 3, datediff, deterministic=True)
+        self.connection.create_function("hash", 1, snowflake_hash, deterministic=True)
+        self.connection.create_function("date_trunc", 2, date_trunc, deterministic=True)
+        self.connection.create_aggregate("percentile_cont", 2, PercentileCont)
+        self.connection.create_aggregate("hash_agg", -1, HashAgg)
+        # the local engine runs the app as app_admin
+        self.connection.create_function("is_application_role_in_session", 1, lambda role: True, deterministic=True)
+        self.connection.execute("pragma journal_mode = off")
+        self.connection.execute("pragma synchronous = off")
+
+    def create_schema(self) -> None:
+        self.connection.executescript(CONSUMER_DDL)
+        self.connection.executemany(
+            "insert into shared_content.sensor_types_view values (?, ?, ?, ?, ?, ?, ?, ?)",
+            SENSOR_TYPES
+        )
+
+    def sql(self, statement: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> List[sqlite3.Row]:
+        self.statements += 1
+        return self.connection.execute(to_sqlite(statement), params).fetchall()
+
+    def cursor(self, statement: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> sqlite3.Cursor:
+        self.statements += 1
+        return self.connection.execute(to_sqlite(statement), params)
+
+    def scalar(self, statement: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> Any:
+        rows = self.sql(statement, params)
+        return rows[0][0] if rows else None
+
+    def close(self) -> None:
+        self.connection.close()
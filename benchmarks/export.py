@@ -0,0 +1,79 @@
+"""
+What it takes to get a large set of readings out of the app: the table tab's way,
+the whole get_sensor_data() result as a pandas DataFrame, against the export's
+(export.export_query()), which writes the query's Arrow batches to a compressed file
+one at a time.
+
+    python -m benchmarks.export --chairlifts 3 --days 14
+
+Peak memory is Python's (tracemalloc), which includes pandas' and Arrow's buffers.
+The export's should stay around one batch (session.ARROW_BATCH_ROWS rows) whatever
+--days is; the DataFrame's grows with the readings.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+from .engine import LocalEngine
+from .generator import STATIONS, generate
+from .session import ARROW_BATCH_ROWS, LocalSession
+from .suite import clear_caches
+
+import v_sensor_data  # noqa: E402  (on the path once .suite is imported)
+from export import EXPORT_FORMATS, export_query  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+
+
+def measured(run: Callable[[], Any]) -> Tuple[Any, float, int]:
+    """ what `run` returns, how long it took, and the most memory it held at once """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(args) -> None:
+    # calling cached page functions outside of a Streamlit server warns on every call
+    set_log_level("error")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        readings = engine.scalar("select count(*) from sensor_readings")
+        print(f"{readings:,} readings, {ARROW_BATCH_ROWS:,} rows per batch")
+
+        session = LocalSession(engine)
+        filters = v_sensor_data.Filters([], [], None, None, False)
+        where = v_sensor_data.sensor_data_where(filters)
+
+        clear_caches()
+        frame, elapsed, peak = measured(lambda: v_sensor_data.query_sensor_data(session, where))
+        print(f"{'in memory':<12} {elapsed:>8.3f}s {peak / 2**20:>9.1f} MiB peak  {len(frame):,} rows")
+        del frame
+
+        for export_format in EXPORT_FORMATS:
+            file, elapsed, peak = measured(
+                lambda: export_query(v_sensor_data.sensor_data_query(session, where), export_format))
+            size = os.fstat(file.fileno()).st_size
+            file.close()
+            print(f"{export_format:<12} {elapsed:>8.3f}s {peak / 2**20:>9.1f} MiB peak  {size / 2**20:,.1f} MiB file")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=3)
+    parser.add_argument("--days", type=float, default=14, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    args = parser.parse_args(argv)
+    run(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Synthetic consumer data with the same shape as prepare/consumer-data.sql.
+"""
+import datetime as dt
+import uuid
+
+from .engine import LocalEngine, TS_FORMAT
+
+# same layout as the mock data in prepare/consumer-data.sql, which is the default scale
+STATIONS = ["Base Station", "Hilltop Station"]
+CHAIRLIFTS = ["Chairlift #1", "Chairlift #2", "Chairlift #3"]
+STATION_SENSOR_TYPES = "id < 8"
+CHAIRLIFT_SENSOR_TYPES = "id > 7"
+
+READING_INTERVAL_SECONDS = 30
+READINGS_PER_DAY = 24 * 60 * 60 // READING_INTERVAL_SECONDS
+
+# readings are inserted this many per sensor at a time, so that years of them
+# never have to fit in sqlite's temp store at once
+ROWS_PER_SENSOR_CHUNK = READINGS_PER_DAY
+
+
+def machine_names(names, count: int, prefix: str):
+    return (names + [f"{prefix} #{i}" for i in range(len(names) + 1, count + 1)])[:count]
+
+
+def generate_machines(
+    engine: LocalEngine,
+    today: dt.date,
+    stations: int = len(STATIONS),
+    chairlifts: int = len(CHAIRLIFTS)
+) -> None:
+    """ Stations get sensor types 1-7, chairlifts 8 and 9, as in consumer-data.sql """
+    installed = (today - dt.timedelta(days=365)).isoformat()
+    machines, sensors = [], []
+    for names, type_predicate in [
+        (machine_names(STATIONS, stations, "Station"), STATION_SENSOR_TYPES),
+        (machine_names(CHAIRLIFTS, chairlifts, "Chairlift"), CHAIRLIFT_SENSOR_TYPES),
+    ]:
+        sensor_types = engine.sql(f"select id, name from shared_content.sensor_types_view where {type_predicate}")
+        for name in names:
+            machine_uuid = str(uuid.uuid4())
+            machines.append((machine_uuid, name))
+            for (type_id, type_name) in sensor_types:
+                # last service somewhere in the past year, like abs(hash(uuid_string()) % 365)
+                serviced = (today - dt.timedelta(days=uuid.uuid4().int % 365)).isoformat()
+                sensors.append((str(uuid.uuid4()), type_name, type_id, machine_uuid, installed, serviced))
+    engine.connection.executemany("insert into machines(uuid, name) values (?, ?)", machines)
+    engine.connection.executemany(
+        "insert into sensors(uuid, name, sensor_type_id, machine_uuid, installation_date, last_service_date)"
+        " values (?, ?, ?, ?, ?, ?)",
+        sensors
+    )
+
+
+def generate_readings(engine: LocalEngine, readings: int, end: dt.datetime) -> None:
+    """
+    Produces roughly `readings` rows spread evenly over all sensors, one every 30s
+    per sensor up to `end`. 10% of readings are below and 10% above the sensor's
+    range, the rest inside it, like populate_reading().
+    """
+    sensor_count = engine.scalar("select count(*) from sensors")
+    rows_per_sensor = max(1, readings // sensor_count)
+    start = end - dt.timedelta(seconds=READING_INTERVAL_SECONDS * rows_per_sensor)
+    for first_row in range(1, rows_per_sensor + 1, ROWS_PER_SENSOR_CHUNK):
+        last_row = min(first_row + ROWS_PER_SENSOR_CHUNK - 1, rows_per_sensor)
+        engine.sql(f"""
+            insert into sensor_readings(sensor_uuid, reading_time, reading)
+            with recursive seq(row_id) as (
+                select :first_row union all select row_id + 1 from seq where row_id < :last_row
+            ),
+            readings as materialized (
+                select s.uuid, s.sensor_type_id, seq.row_id, abs(random()) % 100 as rand_value
+                from seq cross join sensors s
+            )
+            select
+                r.uuid,
+                strftime('%Y-%m-%d %H:%M:%S', :start, '+' || (r.row_id * {READING_INTERVAL_SECONDS}) || ' seconds'),
+                case
+                    when r.rand_value < 10 then sr.min_range - abs(random()) % 10
+                    when r.rand_value > 90 then sr.max_range + abs(random()) % 10
+                    else sr.min_range + abs(random()) % (sr.max_range - sr.min_range)
+                end
+            from readings r
+            join shared_content.sensor_types_view sr on sr.id = r.sensor_type_id
+        """, {"first_row": first_row, "last_row": last_row, "start": start.strftime(TS_FORMAT)})
+
+
+def generate(
+    engine: LocalEngine,
+    readings: int = None,
+    today: dt.date = None,
+    stations: int = len(STATIONS),
+    chairlifts: int = len(CHAIRLIFTS),
+    days: float = None
+) -> None:
+    """
+    Either `readings` in total, or `days` worth of readings for every sensor;
+    from the 5 machines of consumer-data.sql up to as many as you like.
+    """
+    today = today or dt.date.today()
+    engine.create_schema()
+    generate_machines(engine, today, stations, chairlifts)
+    if readings is None:
+        sensor_count = engine.scalar("select count(*) from sensors")
+        readings = int(sensor_count * READINGS_PER_DAY * (days or 1))
+    generate_readings(engine, readings, dt.datetime.combine(today, dt.time(0, 0, 0)))
@@ -0,0 +1,94 @@
+"""
+What it costs to keep the Sensor data charts up to date as readings come in: reloading
+the page's chart data, against live mode's poll for the readings newer than its window
+(v_sensor_data.get_live_readings()) appended to a ring buffer per sensor
+(reading_window.ReadingWindow).
+
+    python -m benchmarks.live_tail --chairlifts 3 --days 7 --ticks 20
+
+Every tick adds one reading per sensor, 30s after the last one, like the consumer's
+readings arrive. A reload is get_downsampled_sensor_data() with its cache cleared, as
+the new readings would leave it; live mode only fetches the tick's readings. The
+window's memory is reported after every tick: it should not grow once it is full.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from .engine import LocalEngine
+from .generator import READING_INTERVAL_SECONDS, STATIONS, generate
+from .rollups import update_reading_rollups
+from .session import LocalSession
+from .suite import clear_caches
+
+import v_sensor_data  # noqa: E402  (on the path once .suite is imported)
+from streamlit.logger import set_log_level  # noqa: E402
+
+NEXT_READINGS = f"""
+    insert into sensor_readings(sensor_uuid, reading_time, reading)
+    select s.uuid,
+        strftime('%Y-%m-%d %H:%M:%S', (select max(reading_time) from sensor_readings), '+{READING_INTERVAL_SECONDS} seconds'),
+        sr.min_range + abs(random()) % (sr.max_range - sr.min_range)
+    from sensors s
+    join shared_content.sensor_types_view sr on sr.id = s.sensor_type_id
+"""
+
+
+def run(args) -> None:
+    # calling cached page functions outside of a Streamlit server warns on every call
+    set_log_level("error")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        update_reading_rollups(engine)
+        readings = engine.scalar("select count(*) from sensor_readings")
+        sensors = engine.scalar("select count(*) from sensors")
+        print(f"{readings:,} readings from {sensors:,} sensors, window of {v_sensor_data.LIVE_WINDOW_READINGS} "
+              f"readings per sensor")
+
+        session = LocalSession(engine)
+        filters = v_sensor_data.Filters([], [], None, None, False)
+        window = v_sensor_data.ReadingWindow(v_sensor_data.LIVE_WINDOW_READINGS)
+        start = time.perf_counter()
+        window.append(v_sensor_data.get_live_readings(session, filters, None))
+        print(f"first fill: {time.perf_counter() - start:.3f}s, {window.nbytes:,} bytes")
+
+        reloads, polls, sizes = [], [], set()
+        print(f"{'tick':>5} {'reload':>9} {'poll':>9} {'rows':>6} {'window bytes':>13}")
+        for tick in range(1, args.ticks + 1):
+            engine.sql(NEXT_READINGS)
+
+            clear_caches()
+            start = time.perf_counter()
+            v_sensor_data.get_downsampled_sensor_data(session, filters)
+            reloads.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            new_readings = v_sensor_data.get_live_readings(session, filters, window.last_ts)
+            window.append(new_readings)
+            polls.append(time.perf_counter() - start)
+            sizes.add(window.nbytes)
+            print(f"{tick:>5} {reloads[-1]:>8.3f}s {polls[-1]:>8.3f}s {len(new_readings):>6} {window.nbytes:>13,}")
+
+        print(f"median reload {statistics.median(reloads):.3f}s, poll {statistics.median(polls):.3f}s "
+              f"({statistics.median(reloads) / statistics.median(polls):.0f}x)")
+        if len(sizes) > 1:
+            print("  !! the window's memory grew between ticks")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=3)
+    parser.add_argument("--days", type=float, default=7, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--ticks", type=int, default=20, help="rounds of new readings")
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
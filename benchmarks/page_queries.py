@@ -0,0 +1,87 @@
+"""
+How long the Dashboard and Sensor data pages take to render when every query is a
+warehouse round trip, with their independent queries run one after the other, and
+started together by query_scheduler.QueryScheduler.
+
+    python -m benchmarks.page_queries --chairlifts 3 --days 2 --latency-ms 50 200 500
+
+Each page is rendered cold (Streamlit caches cleared) with AppTest over the local
+engine, whose session adds --latency-ms to every query (benchmarks/session.py).
+'sequential' runs every query as soon as the page asks for it, and page functions
+one at a time, which is how the pages ran them before; 'scheduled' is the app as it
+is. With the scheduler, a page should take about as long as its slowest chain of
+dependent queries, rather than the sum of all of them.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from .check_warnings import check_warnings_set_based
+from .engine import LocalEngine, extract_statement
+from .generator import STATIONS, generate
+from .rollups import update_reading_rollups
+from .session import LocalSession
+from .suite import SEED_WARNING_COUNTS, clear_caches, render
+
+import query_scheduler  # noqa: E402  (on the path once .suite is imported)
+from streamlit.logger import set_log_level  # noqa: E402
+
+PAGES = ["v_dashboard.py", "v_sensor_data.py"]
+
+MODES = {
+    # (async jobs run concurrently, page functions run at once)
+    "sequential": (False, 1),
+    "scheduled": (True, query_scheduler.MAX_WORKERS),
+}
+
+
+def run(args) -> None:
+    # calling cached page functions outside of a Streamlit server warns on every call
+    set_log_level("error")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        check_warnings_set_based(engine)
+        engine.sql(extract_statement(*SEED_WARNING_COUNTS))
+        update_reading_rollups(engine)
+
+        print(f"{'page':<18} {'latency':>9} {'queries':>8} " + " ".join(f"{mode:>11}" for mode in MODES)
+              + f" {'speedup':>8}")
+        for page in PAGES:
+            for latency_ms in args.latency_ms:
+                medians = {}
+                for mode, (concurrent, max_workers) in MODES.items():
+                    session = LocalSession(engine, latency_ms=latency_ms, concurrent=concurrent)
+                    query_scheduler.MAX_WORKERS = max_workers
+                    seconds = []
+                    for _ in range(args.repeat):
+                        clear_caches()
+                        statements = engine.statements
+                        start = time.perf_counter()
+                        render(session, page)
+                        seconds.append(time.perf_counter() - start)
+                        queries = engine.statements - statements
+                    medians[mode] = statistics.median(seconds)
+                speedup = medians["sequential"] / medians["scheduled"]
+                print(f"{page:<18} {latency_ms:>7}ms {queries:>8} "
+                      + " ".join(f"{medians[mode]:>10.2f}s" for mode in MODES) + f" {speedup:>7.2f}x")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=3)
+    parser.add_argument("--days", type=float, default=2, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--latency-ms", type=int, nargs="+", default=[50, 200, 500],
+                        help="round trip added to every query")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
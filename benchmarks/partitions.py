@@ -0,0 +1,120 @@
+"""
+Throughput of warnings_code.check_warnings_partition() as the readings are split into
+more partitions (config_data.configuration.warning_partition_count), each one checked
+by a worker process of its own, the way the task graph runs one child task each.
+
+    python -m benchmarks.partitions --chairlifts 20 --days 2 --partitions 1 2 4 8
+
+Each worker runs the procedure's chunk and warning queries, read straight out of
+app/sql_lib, for its partition. sqlite allows a single writer, so the workers return
+each chunk's runs of warnings and their watermark, and the parent merges them into
+warning episodes; Snowflake has no such
+limit, so the numbers understate the scaling there. Every partition also scans all
+readings to find its machines' ones, which is the overhead a partition adds. Every
+run's warnings are checked against a single-partition run.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+from .check_warnings import (CHECK_WARNINGS_SQL, INITIAL_CURSOR, _store_cursor, merge_warning_episodes,
+                             partition_params, refresh_sensor_maintenance, reset_warnings, warnings_fingerprint)
+from .engine import LocalEngine, extract_statement
+from .generator import STATIONS, generate
+
+NEXT_CHUNK = extract_statement(CHECK_WARNINGS_SQL, "select count(*), max(reading_time)")
+INSERT_CHUNK = extract_statement(CHECK_WARNINGS_SQL, "insert into warnings_data.warning_episode_chunks (")
+# the insert's select, run by the workers; the parent inserts what it returns
+CHUNK_RUNS = INSERT_CHUNK[INSERT_CHUNK.lower().index("select"):]
+CHUNK_COLUMNS = INSERT_CHUNK[INSERT_CHUNK.index("("):INSERT_CHUNK.index(")") + 1]
+
+
+def check_partition(path: str, partition_id: int, partition_count: int, batch_rows: int) -> Tuple[list, tuple]:
+    """ one partition's run, read-only: returns the runs of warnings of each chunk, and its watermark """
+    engine = LocalEngine(path)
+    cursor_ts, cursor_uuid = engine.sql(INITIAL_CURSOR, [partition_id])[0]
+    chunks = []
+    while True:
+        params = {"cursor_ts": cursor_ts, "cursor_uuid": cursor_uuid, "batch_rows": batch_rows,
+                  **partition_params(partition_id, partition_count)}
+        chunk_rows, chunk_end_ts, chunk_end_uuid = engine.sql(NEXT_CHUNK, params)[0]
+        if chunk_rows == 0:
+            break
+        chunks.append([tuple(row) for row in engine.sql(
+            CHUNK_RUNS, {**params, "chunk_end_ts": chunk_end_ts, "chunk_end_uuid": chunk_end_uuid}
+        )])
+        cursor_ts, cursor_uuid = chunk_end_ts, chunk_end_uuid
+        if chunk_rows < batch_rows:
+            break
+    engine.close()
+    return chunks, (partition_id, cursor_ts, cursor_uuid)
+
+
+def check_partitions(engine: LocalEngine, path: str, partition_count: int, batch_rows: int) -> None:
+    # what the root task does before the partitions run
+    refresh_sensor_maintenance(engine)
+    with multiprocessing.Pool(partition_count) as pool:
+        results = pool.starmap(
+            check_partition, [(path, partition_id, partition_count, batch_rows) for partition_id in range(partition_count)]
+        )
+    engine.sql("begin transaction")
+    for chunks, (partition_id, cursor_ts, cursor_uuid) in results:
+        for runs in chunks:
+            engine.connection.executemany(
+                f"insert into warnings_data.warning_episode_chunks {CHUNK_COLUMNS} values ({', '.join('?' * 10)})",
+                runs
+            )
+            merge_warning_episodes(engine, partition_id)
+        _store_cursor(engine, cursor_ts, cursor_uuid, partition_id)
+    engine.sql("commit")
+
+
+def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "chairlift.db")
+        engine = LocalEngine(path)
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        readings = engine.scalar("select count(*) from sensor_readings")
+        machines = engine.scalar("select count(*) from machines")
+        # there is no speedup to measure with fewer cpus than partitions
+        print(f"{readings:,} readings from {machines:,} machines, {os.cpu_count()} cpus")
+
+        print(f"{'partitions':>10} {'wall':>10} {'readings/s':>14} {'speedup':>9} {'warnings':>12}")
+        reset_warnings(engine)
+        start = time.perf_counter()
+        check_partitions(engine, path, 1, args.batch_rows)
+        single = time.perf_counter() - start
+        expected = warnings_fingerprint(engine)
+        for partition_count in args.partitions:
+            reset_warnings(engine)
+            start = time.perf_counter()
+            check_partitions(engine, path, partition_count, args.batch_rows)
+            elapsed = time.perf_counter() - start
+            fingerprint = warnings_fingerprint(engine)
+            speedup = f"{single / elapsed:.2f}x"
+            warnings = sum(row[1] for row in fingerprint)
+            print(f"{partition_count:>10} {elapsed:>9.2f}s {readings / elapsed:>14,.0f} {speedup:>9} {warnings:>12,}")
+            if fingerprint != expected:
+                print(f"  !! {partition_count} partitions produced different warnings than one")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=20)
+    parser.add_argument("--days", type=float, default=2, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--partitions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-rows", type=int, default=100_000,
+                        help="readings per chunk (warning_check_batch_rows)")
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
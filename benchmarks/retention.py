@@ -0,0 +1,157 @@
+"""
+How much of warnings_data.warning_episodes the dashboard's queries scan before and
+after acknowledged episodes are archived (warnings_code.archive_warnings()) and the
+rest is clustered by (acknowledged, to_date(last_reading_time)), on episodes the
+warning checks find in generated readings.
+
+    python -m benchmarks.retention --chairlifts 1 --days 60 --retention-days 30
+
+sqlite has no micro-partitions, so they are modelled: the table is split, in storage
+order, into partitions of --partition-rows rows, each with the min and max of every
+column, and a query scans each partition whose ranges could match its predicates,
+like Snowflake's pruning. Partitions are far smaller than Snowflake's to make up for
+a far smaller table. 'before' keeps episodes in the order the warning checks created
+them, acknowledged in place; 'after' archives the old acknowledged ones and orders the
+rest by the clustering key.
+"""
+import argparse
+import datetime as dt
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from .check_warnings import check_warnings_set_based
+from .engine import TS_FORMAT, LocalEngine, extract_statement
+from .generator import STATIONS, generate
+
+ARCHIVE_WARNINGS_SQL = "warnings_code-archive_warnings.sql"
+
+# what each partition's metadata is made of
+COLUMNS = ["acknowledged", "first_reading_time", "last_reading_time"]
+ARCHIVE_COLUMNS = ["first_reading_time", "last_reading_time"]
+
+Partition = Dict[str, Tuple]
+Query = Callable[[Partition], bool]
+
+
+def partitions(engine: LocalEngine, table: str, order_by: str, partition_rows: int,
+               columns: List[str] = COLUMNS) -> List[Partition]:
+    """ min / max per column of each run of `partition_rows` rows, in `order_by` order """
+    rows = engine.sql(f"select {', '.join(columns)} from {table} order by {order_by}")
+    result = []
+    for start in range(0, len(rows), partition_rows):
+        chunk = rows[start:start + partition_rows]
+        partition = {"rows": len(chunk)}
+        for i, name in enumerate(columns):
+            values = [row[i] for row in chunk]
+            partition[name] = (min(values), max(values))
+        result.append(partition)
+    return result
+
+
+def dashboard_queries(end: dt.datetime) -> Dict[str, Query]:
+    """ the dashboard's predicates, as partition pruning sees them """
+    last_day = (end - dt.timedelta(days=1)).strftime(TS_FORMAT)
+    return {
+        "unacknowledged": lambda p: p["acknowledged"][0] == 0,
+        "unacknowledged, last day": lambda p: p["acknowledged"][0] == 0 and p["last_reading_time"][1] >= last_day,
+        "acknowledged, last day": lambda p: p["acknowledged"][1] == 1 and p["last_reading_time"][1] >= last_day,
+    }
+
+
+def scanned(layout: List[Partition], query: Query) -> Tuple[int, int]:
+    matching = [partition for partition in layout if query(partition)]
+    return len(matching), sum(partition["rows"] for partition in matching)
+
+
+def acknowledge(engine: LocalEngine, end: dt.datetime, fraction: float, seed: int) -> int:
+    """ acknowledges a random `fraction` of the episodes that ended before the last day """
+    last_day = (end - dt.timedelta(days=1)).strftime(TS_FORMAT)
+    rowids = [row[0] for row in engine.sql(
+        "select rowid from warnings_data.warning_episodes where last_reading_time < ?", [last_day]
+    )]
+    chosen = random.Random(seed).sample(rowids, int(len(rowids) * fraction))
+    engine.connection.executemany(
+        "update warnings_data.warning_episodes set acknowledged = true, is_open = false where rowid = ?",
+        [(rowid,) for rowid in chosen]
+    )
+    return len(chosen)
+
+
+def archive_warnings(engine: LocalEngine, archive_before: dt.datetime) -> int:
+    """ warnings_code.archive_warnings(), for a given cutoff; returns the episodes archived """
+    params = {"archive_before": archive_before.strftime(TS_FORMAT)}
+    engine.sql("begin transaction")
+    engine.sql(extract_statement(ARCHIVE_WARNINGS_SQL, "insert into warnings_data.warning_episodes_archive ("), params)
+    archived = engine.scalar("select changes()")
+    engine.sql(extract_statement(
+        ARCHIVE_WARNINGS_SQL, "delete from warnings_data.warning_episodes\n                where acknowledged"
+    ), params)
+    engine.sql("commit")
+    return archived
+
+
+def print_scans(name: str, layout: List[Partition], queries: Dict[str, Query]) -> None:
+    total_rows = sum(partition["rows"] for partition in layout)
+    for query_name, query in queries.items():
+        partition_count, rows = scanned(layout, query)
+        print(f"{name:<8} {query_name:<28} {partition_count:>6,} / {len(layout):<6,} {rows:>12,} / {total_rows:<12,}")
+
+
+def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        check_warnings_set_based(engine)
+        end = dt.datetime.strptime(
+            engine.scalar("select max(last_reading_time) from warnings_data.warning_episodes"), TS_FORMAT
+        )
+        acknowledged = acknowledge(engine, end, args.acknowledged, args.seed)
+        episodes = engine.scalar("select count(*) from warnings_data.warning_episodes")
+        print(f"{episodes:,} warning episodes, {acknowledged:,} acknowledged, "
+              f"partitions of {args.partition_rows:,} rows")
+
+        queries = dashboard_queries(end)
+        print(f"{'layout':<8} {'query':<28} {'partitions scanned':>19} {'rows scanned':>25}")
+        before = partitions(engine, "warnings_data.warning_episodes", "rowid", args.partition_rows)
+        print_scans("before", before, queries)
+
+        start = time.perf_counter()
+        archived = archive_warnings(engine, end - dt.timedelta(days=args.retention_days))
+        elapsed = time.perf_counter() - start
+        after = partitions(
+            engine, "warnings_data.warning_episodes", "acknowledged, date(last_reading_time)", args.partition_rows
+        )
+        print_scans("after", after, queries)
+
+        archive = partitions(engine, "warnings_data.warning_episodes_archive", "rowid", args.partition_rows,
+                             ARCHIVE_COLUMNS)
+        oldest = end - dt.timedelta(days=args.days)
+        one_day = ((oldest + dt.timedelta(days=1)).strftime(TS_FORMAT), (oldest + dt.timedelta(days=2)).strftime(TS_FORMAT))
+        print_scans("archive", archive, {
+            "acknowledged, one day": lambda p: p["last_reading_time"][1] >= one_day[0]
+                                               and p["first_reading_time"][0] < one_day[1],
+        })
+        print(f"archived {archived:,} episodes older than {args.retention_days} days in {elapsed:.2f}s")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=1)
+    parser.add_argument("--days", type=float, default=60, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--retention-days", type=int, default=30, help="warning_retention_days")
+    parser.add_argument("--acknowledged", type=float, default=0.9,
+                        help="fraction of the episodes before the last day that were acknowledged")
+    parser.add_argument("--partition-rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+The reading rollups behind the Sensor data charts: how long readings_code.update_reading_rollups()
+takes to catch up, whether rolling up chunk by chunk gives the same buckets as rolling
+up everything at once, and what the chart query costs with and without them.
+
+    python -m benchmarks.rollups --chairlifts 20 --days 30 --batch-rows 100000
+
+The procedure's statements are read straight out of app/sql_lib; the chart query is
+v_sensor_data.get_downsampled_sensor_data(), run over the local engine.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from .engine import LocalEngine, extract_statement
+from .generator import STATIONS, generate
+from .session import LocalSession
+
+UPDATE_ROLLUPS_SQL = "readings_code-update_reading_rollups.sql"
+
+INITIAL_CURSOR = """
+    select coalesce(max(last_reading_ts), '1970-01-01'), coalesce(max(last_sensor_uuid), '')
+    from readings_data.reading_rollup_cursor
+"""
+
+# every bucket of every resolution, rolled up straight from the readings
+EXPECTED_ROLLUPS = """
+    select sre.sensor_uuid, resolution.bucket_seconds, date_trunc(resolution.part, sre.reading_time) as bucket_start,
+            count(sre.reading), sum(sre.reading), min(sre.reading), max(sre.reading),
+            sum(iif(sre.reading < sr.min_range or sre.reading > sr.max_range, 1, 0))
+        from sensor_readings sre
+        join sensors s on s.uuid = sre.sensor_uuid
+        join shared_content.sensor_ranges sr on sr.id = s.sensor_type_id,
+            (select 60 as bucket_seconds, 'minute' as part
+             union all select 3600, 'hour'
+             union all select 86400, 'day') resolution
+        group by sre.sensor_uuid, resolution.bucket_seconds, bucket_start
+        order by sre.sensor_uuid, resolution.bucket_seconds, bucket_start
+"""
+
+
+def update_reading_rollups(engine: LocalEngine, batch_rows: int = 100_000) -> int:
+    """ the procedure, statement for statement, until it's caught up; returns the readings rolled up """
+    next_chunk = extract_statement(UPDATE_ROLLUPS_SQL, "select count(*), max(reading_time)")
+    statements = [
+        extract_statement(UPDATE_ROLLUPS_SQL, starts_with) for starts_with in [
+            "insert into readings_data.sensor_reading_rollup_chunks (\n                sensor_uuid, bucket_seconds, "
+            "bucket_start, reading_count, reading_sum, min_reading, max_reading,\n                out_of_range_count\n"
+            "            )\n                select\n                    sre.sensor_uuid",
+            "insert into readings_data.sensor_reading_rollup_chunks (\n                sensor_uuid, bucket_seconds, "
+            "bucket_start, reading_count, reading_sum, min_reading, max_reading,\n                out_of_range_count\n"
+            "            )\n                select sensor_uuid, 3600",
+            "update readings_data.sensor_reading_rollups stored",
+            "insert into readings_data.sensor_reading_rollups (",
+            "delete from readings_data.sensor_reading_rollup_chunks",
+        ]
+    ]
+    cursor_ts, cursor_uuid = engine.sql(INITIAL_CURSOR)[0]
+    processed_rows = 0
+    while True:
+        params = {"cursor_ts": cursor_ts, "cursor_uuid": cursor_uuid, "batch_rows": batch_rows}
+        chunk_rows, chunk_end_ts, chunk_end_uuid = engine.sql(next_chunk, params)[0]
+        if chunk_rows == 0:
+            break
+        engine.sql("begin transaction")
+        for statement in statements:
+            engine.sql(statement, {**params, "chunk_end_ts": chunk_end_ts, "chunk_end_uuid": chunk_end_uuid})
+        cursor_ts, cursor_uuid = chunk_end_ts, chunk_end_uuid
+        engine.sql("delete from readings_data.reading_rollup_cursor")
+        engine.sql("insert into readings_data.reading_rollup_cursor (last_reading_ts, last_sensor_uuid) values (?, ?)",
+                   [cursor_ts, cursor_uuid])
+        engine.sql("commit")
+        processed_rows += chunk_rows
+        if chunk_rows < batch_rows:
+            break
+    return processed_rows
+
+
+def reset_rollups(engine: LocalEngine) -> None:
+    engine.sql("delete from readings_data.sensor_reading_rollups")
+    engine.sql("delete from readings_data.reading_rollup_cursor")
+
+
+def stored_rollups(engine: LocalEngine) -> List[tuple]:
+    return [tuple(row) for row in engine.sql("""
+        select sensor_uuid, bucket_seconds, bucket_start, reading_count, reading_sum, min_reading, max_reading,
+                out_of_range_count
+            from readings_data.sensor_reading_rollups
+            order by sensor_uuid, bucket_seconds, bucket_start
+    """)]
+
+
+def run(args) -> None:
+    app = Path(__file__).resolve().parent.parent / "app" / "src"
+    sys.path[:0] = [str(app / "ui"), str(app / "python")]
+    import streamlit as st
+    from streamlit.logger import set_log_level
+    # calling cached page functions outside of a Streamlit server warns on every call
+    set_log_level("error")
+    import v_sensor_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        readings = engine.scalar("select count(*) from sensor_readings")
+
+        start = time.perf_counter()
+        update_reading_rollups(engine, args.batch_rows)
+        elapsed = time.perf_counter() - start
+        buckets = engine.scalar("select count(*) from readings_data.sensor_reading_rollups")
+        print(f"{readings:,} readings rolled up into {buckets:,} buckets in {elapsed:.2f}s "
+              f"({readings / elapsed:,.0f} readings/s, chunks of {args.batch_rows:,})")
+        if stored_rollups(engine) != [tuple(row) for row in engine.sql(EXPECTED_ROLLUPS)]:
+            print("  !! rolling up chunk by chunk gives different buckets than rolling up every reading at once")
+
+        session = LocalSession(engine)
+        print(f"{'chart query':<28} {'wall':>9} {'points':>9}")
+        for name, prepare in [("readings", lambda: reset_rollups(engine)),
+                              ("rollups", lambda: update_reading_rollups(engine, args.batch_rows))]:
+            prepare()
+            st.cache_data.clear()
+            start = time.perf_counter()
+            points = v_sensor_data.get_downsampled_sensor_data(session)
+            print(f"{name:<28} {time.perf_counter() - start:>8.3f}s {len(points):>9,}")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=3)
+    parser.add_argument("--days", type=float, default=30, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--batch-rows", type=int, default=100_000,
+                        help="readings per chunk (warning_check_batch_rows)")
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+A stand-in for the Snowpark Session, over LocalEngine, for running the app's own
+page code (and its queries) locally.
+
+Only what the app calls is implemented: session.sql(query, params=...) and, on the
+result, collect(), collect_nowait(), to_pandas(), to_arrow_batches() and
+schema.names. Like Snowflake, unquoted column names come back upper-case.
+
+`latency_ms` adds a warehouse round trip to every query. Queries wait for it at the
+same time, like they would on a warehouse, but sqlite then runs them one at a time;
+with `concurrent=False`, async jobs run as soon as they're submitted, one after the
+other, the way the pages ran their queries before they had a QueryScheduler.
+"""
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterator, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+from snowflake.snowpark.types import StringType, StructField, StructType
+
+from .engine import LocalEngine
+
+# sqlite has no timestamp type; text columns that look like this are converted
+TIMESTAMP_TEXT = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+ARROW_BATCH_ROWS = 100_000
+
+
+class LocalRow(tuple):
+    """ Snowpark's Row: indexable, and by column name """
+
+    def __new__(cls, values: Sequence[Any], names: List[str]):
+        row = super().__new__(cls, values)
+        row._names = {name: i for i, name in enumerate(names)}
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._names[key.upper()])
+        return tuple.__getitem__(self, key)
+
+
+class LocalDataFrame:
+    def __init__(self, session: "LocalSession", query: str, params: Optional[Sequence[Any]]):
+        self.session = session
+        self.engine = session.engine
+        self.query = query
+        self.params = list(params or [])
+
+    def _execute(self):
+        time.sleep(self.session.latency_ms / 1000)
+        with self.session.lock:
+            cursor = self.engine.cursor(self.query, self.params)
+            names = [column[0].upper() for column in cursor.description or []]
+            return names, cursor.fetchall()
+
+    @property
+    def schema(self) -> StructType:
+        """ like Snowpark's describe, without fetching the rows; sqlite has no column types, so all are text """
+        with self.session.lock:
+            cursor = self.engine.cursor(self.query, self.params)
+            names = [column[0].upper() for column in cursor.description or []]
+            cursor.close()
+        return StructType([StructField(name, StringType()) for name in names])
+
+    def collect(self, **kwargs) -> List[LocalRow]:
+        names, rows = self._execute()
+        return [LocalRow(row, names) for row in rows]
+
+    def collect_nowait(self, **kwargs) -> Future:
+        """ a Future stands in for Snowpark's AsyncJob: both have result() """
+        if self.session.concurrent:
+            return self.session.executor.submit(self.collect)
+        job = Future()
+        job.set_result(self.collect())
+        return job
+
+    def to_pandas(self, **kwargs) -> pd.DataFrame:
+        names, rows = self._execute()
+        return to_frame(rows, names)
+
+    def to_arrow_batches(self, **kwargs) -> Iterator[pa.Table]:
+        """ fetched ARROW_BATCH_ROWS at a time, like Snowflake's result batches, so only one is in memory """
+        time.sleep(self.session.latency_ms / 1000)
+        with self.session.lock:
+            cursor = self.engine.cursor(self.query, self.params)
+            names = [column[0].upper() for column in cursor.description or []]
+            while rows := cursor.fetchmany(ARROW_BATCH_ROWS):
+                yield pa.Table.from_pandas(to_frame(rows, names), preserve_index=False)
+
+
+def to_frame(rows: List[Sequence[Any]], names: List[str]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=names)
+    for column in frame.columns:
+        values = frame[column].dropna()
+        if frame[column].dtype == object and len(values) > 0 \
+                and isinstance(values.iloc[0], str) and TIMESTAMP_TEXT.match(values.iloc[0]):
+            frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+class LocalSession:
+    def __init__(self, engine: LocalEngine, latency_ms: float = 0, concurrent: bool = True):
+        self.engine = engine
+        self.latency_ms = latency_ms
+        self.concurrent = concurrent
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="async_jobs")
+
+    def sql(self, query: str, params: Optional[Sequence[Any]] = None) -> LocalDataFrame:
+        return LocalDataFrame(self, query, params)
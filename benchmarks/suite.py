@@ -0,0 +1,204 @@
+"""
+End-to-end benchmarks of the app's own code on generated data: the queries behind
+the pages, warnings_code.check_warnings(), readings_code.update_reading_rollups(), and
+a full AppTest render of each page.
+
+    python -m benchmarks.suite --chairlifts 3 --days 2 --output results.json
+    python -m benchmarks.suite --chairlifts 500 --days 30 --baseline results.json
+
+Page functions are called as the pages call them, with a stand-in Session over the
+local engine (benchmarks/session.py), so their SQL is the SQL the app ships.
+Cold runs clear Streamlit's caches (and the reading cache) first; warm runs don't.
+Results are written as JSON; with --baseline, scenarios whose median got slower
+than --tolerance times the baseline's are reported, and the exit status is 1.
+"""
+import argparse
+import datetime as dt
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from .check_warnings import check_warnings_set_based, reset_warnings
+from .engine import LocalEngine, extract_statement
+from .generator import CHAIRLIFTS, STATIONS, generate
+from .rollups import update_reading_rollups
+from .session import LocalSession
+
+APP = Path(__file__).resolve().parent.parent / "app"
+UI = APP / "src" / "ui"
+sys.path[:0] = [str(UI), str(APP / "src" / "python")]
+
+import streamlit as st  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import v_dashboard  # noqa: E402
+import v_sensor_data  # noqa: E402
+from chairlift_data import get_machines  # noqa: E402
+
+PAGES = ["streamlit_app.py", "v_dashboard.py", "v_sensor_data.py", "v_configuration.py", "v_performance.py"]
+
+# differences smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_S = 0.005
+
+SEED_WARNING_COUNTS = ("warnings_data-warning_counts.sql", "insert into warnings_data.warning_counts")
+
+
+def clear_caches() -> None:
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def timed(run: Callable[[], Any], repeat: int, before: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    seconds, result = [], None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = run()
+        seconds.append(time.perf_counter() - start)
+    return {
+        "runs_s": seconds,
+        "min_s": min(seconds),
+        "median_s": statistics.median(seconds),
+        "rows": len(result) if hasattr(result, "__len__") else None,
+    }
+
+
+def render(session: LocalSession, page: str) -> List[Any]:
+    with patch("snowflake.snowpark.session.Session.builder") as builder:
+        builder.getOrCreate.return_value = session
+        at = AppTest.from_file(str(UI / page), default_timeout=3600)
+        at.run()
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+    return list(at.main)
+
+
+def scenarios(engine: LocalEngine, session: LocalSession) -> Dict[str, Callable[[], Any]]:
+    machine = get_machines(session)[0]
+    end = engine.scalar("select max(reading_time) from sensor_readings")
+    end_ts = dt.datetime.strptime(end, "%Y-%m-%d %H:%M:%S")
+    last_day = v_sensor_data.Filters(
+        [machine], [],
+        v_sensor_data.TimestampFilter((end_ts - dt.timedelta(days=1)).date(), end_ts.time()),
+        v_sensor_data.TimestampFilter(end_ts.date(), end_ts.time()),
+        False
+    )
+    named = {
+        "get_sensor_data": lambda: v_sensor_data.get_sensor_data(session),
+        "get_sensor_data[one machine, last day]": lambda: v_sensor_data.get_sensor_data(session, last_day),
+        "get_downsampled_sensor_data": lambda: v_sensor_data.get_downsampled_sensor_data(session),
+        "get_downsampled_sensor_data[one machine, last day]": lambda: v_sensor_data.get_downsampled_sensor_data(
+            session, last_day
+        ),
+        "get_sensor_data_page": lambda: v_sensor_data.get_sensor_data_page(session),
+        "get_warning_data": lambda: v_dashboard.get_warning_data(session),
+        "get_warning_data[one machine, last day]": lambda: v_dashboard.get_warning_data(
+            session, machines=[machine],
+            min_ts=(last_day.min_ts.date, last_day.min_ts.time), max_ts=(last_day.max_ts.date, last_day.max_ts.time)
+        ),
+    }
+    for page in PAGES:
+        named[f"render {page}"] = lambda page=page: render(session, page)
+    return named
+
+
+def run(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        start = time.perf_counter()
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        print(f"generated in {time.perf_counter() - start:.1f}s")
+
+        results["check_warnings"] = timed(lambda: check_warnings_set_based(engine), args.repeat,
+                                          before=lambda: reset_warnings(engine))
+        engine.sql(extract_statement(*SEED_WARNING_COUNTS))
+        results["update_reading_rollups"] = timed(lambda: update_reading_rollups(engine), 1)
+
+        session = LocalSession(engine)
+        for name, scenario in scenarios(engine, session).items():
+            results[f"{name} (cold)"] = timed(scenario, args.repeat, before=clear_caches)
+            results[f"{name} (warm)"] = timed(scenario, args.repeat)
+
+        scale = {
+            "stations": args.stations,
+            "chairlifts": args.chairlifts,
+            "sensors": engine.scalar("select count(*) from sensors"),
+            "readings": engine.scalar("select count(*) from sensor_readings"),
+            "warning_episodes": engine.scalar("select count(*) from warnings_data.warning_episodes"),
+            "rollup_buckets": engine.scalar("select count(*) from readings_data.sensor_reading_rollups"),
+        }
+        engine.close()
+
+    return {
+        "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "scale": scale,
+        "repeat": args.repeat,
+        "scenarios": results,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=APP, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before and result["median_s"] > before["median_s"] * tolerance \
+                and result["median_s"] - before["median_s"] > NOISE_FLOOR_S:
+            regressions.append(f"{name}: {before['median_s']:.3f}s -> {result['median_s']:.3f}s")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=len(CHAIRLIFTS))
+    parser.add_argument("--days", type=float, default=2, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    # calling cached page functions outside of a Streamlit server warns on every call
+    set_log_level("error")
+    report = run(args)
+    print(json.dumps(report["scale"]))
+    print(f"{'scenario':<60} {'min':>9} {'median':>9} {'rows':>10}")
+    for name, result in report["scenarios"].items():
+        rows = "" if result["rows"] is None else f"{result['rows']:,}"
+        print(f"{name:<60} {result['min_s']:>8.3f}s {result['median_s']:>8.3f}s {rows:>10}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"  !! slower than baseline: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
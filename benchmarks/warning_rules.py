@@ -0,0 +1,67 @@
+"""
+Throughput of the vectorized rule engine (app/src/python/warning_rules.py), checked
+against the set-based SQL in warnings_code.check_warnings_partition() on the same readings.
+
+    python -m benchmarks.warning_rules --readings 1000000 10000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .check_warnings import check_warnings_set_based, refresh_sensor_maintenance
+from .engine import LocalEngine
+from .generator import generate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app" / "src" / "python"))
+from warning_rules import compact_episodes, evaluate  # noqa: E402
+
+# the handler's batch query: the sensors' maintenance reasons come precomputed
+BATCH_QUERY = """
+    select s.uuid as SENSOR_UUID, sre.reading_time as READING_TIME, sre.reading as READING,
+            stv.min_range as MIN_RANGE, stv.max_range as MAX_RANGE, sm.maintenance_reason as MAINTENANCE_REASON
+        from reference('sensor_readings') sre
+        join reference('sensors') s on s.uuid = sre.sensor_uuid
+        join shared_content.sensor_types_view stv on s.sensor_type_id = stv.id
+        left join warnings_data.sensor_maintenance sm on sm.sensor_uuid = s.uuid
+"""
+
+
+def run(readings: int) -> None:
+    engine = LocalEngine()
+    generate(engine, readings)
+    refresh_sensor_maintenance(engine)
+    batch = pd.read_sql_query(BATCH_QUERY.replace("reference('sensor_readings')", "sensor_readings")
+                              .replace("reference('sensors')", "sensors"), engine.connection)
+
+    start = time.perf_counter()
+    batch['REASON'] = evaluate(batch)
+    episodes = compact_episodes(batch)
+    elapsed = time.perf_counter() - start
+
+    check_warnings_set_based(engine, batch_rows=len(batch))
+    expected = engine.sql("""
+        select reason, count(*), sum(reading_count) from warnings_data.warning_episodes group by reason order by reason
+    """)
+    actual = sorted(
+        (reason, len(runs), runs['READING_COUNT'].sum()) for reason, runs in episodes.dropna(subset=['REASON']).groupby('REASON')
+    )
+    matches = [tuple(row) for row in expected] == actual
+    print(f"{len(batch):>12,} {elapsed:>9.3f}s {len(batch) / elapsed:>15,.0f} {'yes' if matches else 'NO':>14}")
+    engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args(argv)
+
+    print(f"{'readings':>12} {'evaluate':>10} {'readings/s':>15} {'matches SQL':>14}")
+    for readings in args.readings:
+        run(readings)
+
+
+if __name__ == "__main__":
+    main()
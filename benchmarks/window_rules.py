@@ -0,0 +1,168 @@
+"""
+The rolling-window rules (app/src/python/window_rules.py) run incrementally: each
+warning check carries every sensor's window over to the next one in
+warnings_data.sensor_window_state, against re-reading each sensor's last
+--window readings on every check to rebuild it.
+
+    python -m benchmarks.window_rules --chairlifts 3 --days 3 --window 720 --runs 24
+    python -m benchmarks.window_rules --days 1 --window 240 --runs 240 --check-seconds 60 --from-empty
+
+Every sensor type gets a RATE_OF_CHANGE, a ROLLING_ZSCORE over --window readings, and a
+CONSECUTIVE_OUT_OF_RANGE rule. The readings of the last --runs checks arrive
+--check-seconds (by default an hour) at a time; the ones before are evaluated once up
+front, so that both versions start with full windows. With --from-empty they're left
+out instead, and the windows fill up over the checks, as they do when rules are first
+set up. Both versions, and a single evaluation of every reading, must give the same
+warnings.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from .engine import LocalEngine, to_sqlite
+from .generator import READING_INTERVAL_SECONDS, STATIONS, generate
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app" / "src" / "python"))
+from window_rules import WindowRulesHandler  # noqa: E402
+
+READINGS = """
+    select s.uuid as SENSOR_UUID, sre.reading_time as READING_TIME, sre.reading as READING,
+            stv.min_range as MIN_RANGE, stv.max_range as MAX_RANGE, s.sensor_type_id as SENSOR_TYPE_ID
+        from reference('sensor_readings') sre
+        join reference('sensors') s on s.uuid = sre.sensor_uuid
+        join shared_content.sensor_types_view stv on s.sensor_type_id = stv.id
+        where sre.reading_time > ? and sre.reading_time <= ?
+"""
+
+# what warnings_code.check_warnings_partition() passes the table function: the type's rules
+RULES = """
+    select sensor_type_id as SENSOR_TYPE_ID,
+            json_group_array(json_object(
+                'RULE', rule, 'WINDOW_READINGS', window_readings, 'THRESHOLD', threshold
+            )) as RULES
+        from config_data.window_rules
+        group by sensor_type_id
+"""
+
+
+def set_rules(engine: LocalEngine, window: int) -> None:
+    engine.sql("delete from config_data.window_rules")
+    for type_id, min_range, max_range in engine.sql("select id, min_range, max_range from shared_content.sensor_types_view"):
+        engine.connection.executemany(
+            "insert into config_data.window_rules (sensor_type_id, rule, window_readings, threshold) values (?, ?, ?, ?)",
+            [(type_id, 'RATE_OF_CHANGE', 1, (max_range - min_range) / 2),
+             (type_id, 'ROLLING_ZSCORE', window, 2.0),
+             (type_id, 'CONSECUTIVE_OUT_OF_RANGE', 3, None)]
+        )
+
+
+def read(engine: LocalEngine, after: str, until: str) -> pd.DataFrame:
+    return pd.read_sql_query(to_sqlite(READINGS), engine.connection, params=[after, until])
+
+
+def evaluate(readings: pd.DataFrame, rules: pd.DataFrame, states: Dict[str, str]) -> Tuple[List[tuple], Dict[str, str]]:
+    """ the table function over every sensor's partition: the warnings, and the windows to carry over """
+    readings = readings.merge(rules, on='SENSOR_TYPE_ID')
+    handler = WindowRulesHandler()
+    warnings, carried = [], {}
+    for sensor_uuid, partition in readings.groupby('SENSOR_UUID', sort=False):
+        partition = partition[['READING_TIME', 'READING', 'MIN_RANGE', 'MAX_RANGE', 'RULES']].assign(
+            STATE=states.get(sensor_uuid)
+        )
+        result = handler.end_partition(partition)
+        warnings.extend((sensor_uuid, row.READING_TIME, row.REASON) for row in result.iloc[:-1].itertuples())
+        carried[sensor_uuid] = result['STATE'].iloc[-1]
+    return warnings, carried
+
+
+def store_states(engine: LocalEngine, states: Dict[str, str], last_reading_time: str) -> None:
+    """ merge_window_state() """
+    engine.sql("delete from warnings_data.sensor_window_state")
+    engine.connection.executemany(
+        "insert into warnings_data.sensor_window_state (sensor_uuid, last_reading_time, state) values (?, ?, ?)",
+        [(sensor_uuid, last_reading_time, state) for sensor_uuid, state in states.items()]
+    )
+
+
+def load_states(engine: LocalEngine) -> Dict[str, str]:
+    return dict(engine.sql("select sensor_uuid, state from warnings_data.sensor_window_state"))
+
+
+def shift(ts: str, seconds: int) -> str:
+    return (pd.Timestamp(ts) + pd.Timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = LocalEngine(Path(tmp) / "chairlift.db")
+        generate(engine, args.readings, stations=args.stations, chairlifts=args.chairlifts, days=args.days)
+        set_rules(engine, args.window)
+        rules = pd.read_sql_query(RULES, engine.connection)
+        first, last = engine.sql("select min(reading_time), max(reading_time) from sensor_readings")[0]
+        runs_start = shift(last, -args.runs * args.check_seconds)
+        # the readings before the checks, or none of them when the windows start empty
+        before_first = runs_start if args.from_empty else shift(first, -1)
+        print(f"{engine.scalar('select count(*) from sensor_readings'):,} readings, "
+              f"{args.runs} checks of {args.check_seconds}s of readings, windows of {args.window} readings")
+
+        # what both versions start from: the windows after the readings before the checks
+        _, primed = evaluate(read(engine, before_first, runs_start), rules, {})
+        store_states(engine, primed, runs_start)
+
+        results = {}
+        lookback = args.window * READING_INTERVAL_SECONDS
+        for name in ["carried", "re-read"]:
+            seconds, rows_read, warnings = [], [], []
+            store_states(engine, primed, runs_start)
+            for run_index in range(args.runs):
+                after = shift(runs_start, run_index * args.check_seconds)
+                until = shift(after, args.check_seconds)
+                start = time.perf_counter()
+                if name == "carried":
+                    readings = read(engine, after, until)
+                    run_warnings, states = evaluate(readings, rules, load_states(engine))
+                    store_states(engine, states, until)
+                    rows = len(readings)
+                else:
+                    # the window rebuilt from each sensor's readings before the check
+                    readings = read(engine, max(shift(after, -lookback), before_first), until)
+                    run_warnings, _ = evaluate(readings, rules, {})
+                    run_warnings = [warning for warning in run_warnings if warning[1] > after]
+                    rows = len(readings)
+                seconds.append(time.perf_counter() - start)
+                rows_read.append(rows)
+                warnings.extend(run_warnings)
+            results[name] = sorted(warnings)
+            print(f"{name:>10} {statistics.median(seconds):>9.3f}s per check {statistics.median(rows_read):>12,.0f} "
+                  f"readings read per check {len(warnings):>9,} warnings")
+
+        everything, _ = evaluate(read(engine, before_first, last), rules, {})
+        expected = sorted(warning for warning in everything if warning[1] > runs_start)
+        for name, warnings in results.items():
+            if warnings != expected:
+                print(f"  !! {name} gives different warnings than evaluating every reading at once")
+        engine.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=len(STATIONS))
+    parser.add_argument("--chairlifts", type=int, default=3)
+    parser.add_argument("--days", type=float, default=3, help="days of 30-second readings per sensor")
+    parser.add_argument("--readings", type=int, default=None, help="total readings, instead of --days")
+    parser.add_argument("--window", type=int, default=720, help="readings the ROLLING_ZSCORE rule looks back")
+    parser.add_argument("--runs", type=int, default=24, help="warning checks")
+    parser.add_argument("--check-seconds", type=int, default=3600, help="seconds of readings per check")
+    parser.add_argument("--from-empty", action="store_true", help="start the checks with empty windows")
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
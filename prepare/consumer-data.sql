@@ -69,99 +69,118 @@ insert into sensor_types values
 create view if not exists last_readings as
     select uuid, name, last_reading from sensors;
 
+-- how many machines to mock: by default a base and a hilltop station and three chairlifts.
+-- Raise these to load-test the app with more sensors; each station has 7 sensors and each
+-- chairlift 2, and every sensor gets a reading every 30 seconds.
+set stations = 2;
+set chairlifts = 3;
+
 -- mock data in machines
-insert into machines(uuid, name) select uuid_string(), 'Base Station';
-insert into machines(uuid, name) select uuid_string(), 'Hilltop Station';
-insert into machines(uuid, name) select uuid_string(), 'Chairlift #1';
-insert into machines(uuid, name) select uuid_string(), 'Chairlift #2';
-insert into machines(uuid, name) select uuid_string(), 'Chairlift #3';
-
--- mock data in sensors
-execute immediate $$
-declare
-    c1 cursor for
-        select uuid from machines where name = 'Base Station' or name = 'Hilltop Station';
-    c2 cursor for
-        select uuid from machines where name in ('Chairlift #1', 'Chairlift #2', 'Chairlift #3');
-begin
-    --for base and hilltop stations/machines
-    for machine in c1 do
-        let machine_uuid varchar default machine.uuid;
-        insert into sensors(uuid, name, sensor_type_id, machine_uuid, installation_date, last_service_date)
-            select uuid_string(), name, id, :machine_uuid, dateadd(day, -365, getdate()), dateadd(day, -1 * abs(hash(uuid_string()) % 365), getdate())
-                from sensor_types where id < 8;
-    end for;
-    --for chairlifts machines
-    for machine in c2 DO
-        let machine_uuid varchar default machine.uuid;
-        insert into sensors(uuid, name, sensor_type_id, machine_uuid, installation_date,last_service_date)
-            select uuid_string(), name, id, :machine_uuid, dateadd(day, -365, getdate()), dateadd(day, -1 * abs(hash(uuid_string()) % 365), getdate())
-                from sensor_types where id > 7;
-    end for;
-end;
-$$
-;
+insert into machines(uuid, name)
+    select uuid_string(),
+           case machine_number
+               when 1 then 'Base Station'
+               when 2 then 'Hilltop Station'
+               else 'Station #' || machine_number
+           end
+      from (select row_number() over (order by seq4()) as machine_number
+              from table(generator(rowcount => $stations)));
+insert into machines(uuid, name)
+    select uuid_string(), 'Chairlift #' || row_number() over (order by seq4())
+      from table(generator(rowcount => $chairlifts));
+
+-- mock data in sensors: sensor types 1 to 7 on the stations, 8 and 9 on the chairlifts
+insert into sensors(uuid, name, sensor_type_id, machine_uuid, installation_date, last_service_date)
+    select uuid_string(), st.name, st.id, m.uuid, dateadd(day, -365, getdate()), dateadd(day, -1 * abs(hash(uuid_string()) % 365), getdate())
+      from machines m
+      join sensor_types st
+        on iff(m.name like '%Station%', st.id < 8, st.id > 7);
 
 -- mock data in sensor_readings table
-create or replace procedure populate_reading()
+--
+-- Every call adds a reading every `reading_interval_seconds`, for every sensor, from the
+-- last reading written up to now. Without any readings yet, it starts `backfill_days` in
+-- the past (by default, 10 minutes). `max_readings_per_sensor` caps how many readings a
+-- single call adds per sensor, so that a large backfill can be loaded in calls of the same
+-- cost: call it again until it returns that it inserted 0 readings.
+create or replace procedure populate_reading(
+    backfill_days float default null,
+    max_readings_per_sensor integer default null,
+    reading_interval_seconds integer default 30
+)
   returns varchar
   language sql
   as
   $$
     declare
       starting_ts       timestamp;
+      last_ts           timestamp;
       rows_to_produce   integer;
-      sensors_cursor cursor for
-        select id, uuid, min_range, max_range
-          from sensors s join sensor_types sr
-                 on s.sensor_type_id = sr.id;
+      rows_inserted     integer;
     begin
       --
-      -- starting_ts is the time of the last sensor reading we wrong or, if no
-      -- readings are available, 10 minutes in the past.
+      -- starting_ts is the time of the last sensor reading we wrote or, if no
+      -- readings are available, the start of the backfill. A max() over the whole
+      -- table is answered from micro-partition metadata, without scanning it.
       --
-      select coalesce(max(reading_time), dateadd(second, -30*20, current_timestamp()))
+      select coalesce(
+                 max(reading_time),
+                 dateadd(second, -1 * coalesce(:backfill_days * 24 * 60 * 60, 20 * :reading_interval_seconds), current_timestamp())
+             )
                into :starting_ts
         from sensor_readings;
 
       --
-      -- produce one row for every thirty seconds from our starting time to now
+      -- produce one row for every interval from our starting time to now
+      --
+      rows_to_produce := floor(datediff(second, starting_ts, current_timestamp()) / reading_interval_seconds);
+      rows_to_produce := least(rows_to_produce, coalesce(max_readings_per_sensor, rows_to_produce));
+      if (rows_to_produce <= 0) then
+        return 'Inserted 0 readings';
+      end if;
+      last_ts := dateadd(second, rows_to_produce * reading_interval_seconds, starting_ts);
+
+      --
+      -- every sensor's readings in one statement: the readings' times, crossed with
+      -- the sensors; 10% of readings are below the sensor's range and 10% above it
       --
-      rows_to_produce := datediff(second, starting_ts, current_timestamp()) / 30;
-
-      for sensor in sensors_cursor do
-        let sensor_uuid varchar default sensor.uuid;
-        let min_range integer default sensor.min_range;
-        let max_range integer default sensor.max_range;
-  
-        insert into sensor_readings(sensor_uuid, reading_time, reading)
-          select
-              :sensor_uuid,
-              dateadd(second, row_id * 30, :starting_ts),
-              case
-                when rand_value < 10 then
-                  :min_range - abs(hash(uuid)) % 10
-                when rand_value > 90 then
-                  :max_range + abs(hash(uuid)) % 10
-                else
-                  :min_range + abs(hash(uuid)) % (:max_range - :min_range)
-              end case
-          from ( 
-              select seq4() + 1            as row_id,
-                     uuid_string()         as uuid,
-                     abs(hash(uuid)) % 100 as rand_value
-                from table(generator(rowcount => :rows_to_produce)));
-      end for;
+      insert into sensor_readings(sensor_uuid, reading_time, reading)
+        select
+            sensor_uuid,
+            dateadd(second, row_id * :reading_interval_seconds, :starting_ts),
+            case
+              when rand_value < 10 then
+                min_range - noise % 10
+              when rand_value > 90 then
+                max_range + noise % 10
+              else
+                min_range + noise % (max_range - min_range)
+            end case
+        from (
+            select s.uuid                as sensor_uuid,
+                   sr.min_range,
+                   sr.max_range,
+                   g.row_id,
+                   abs(random())         as noise,
+                   abs(random()) % 100   as rand_value
+              from (select row_number() over (order by seq4()) as row_id
+                      from table(generator(rowcount => :rows_to_produce))) g
+             cross join sensors s
+              join sensor_types sr
+                on s.sensor_type_id = sr.id);
+      rows_inserted := SQLROWCOUNT;
 
+      --
+      -- every sensor got a reading at last_ts: those rows, just inserted, are the
+      -- latest readings, so there is no need to look for each sensor's max(reading_time)
+      --
       update sensors
          set last_reading = r.reading
-        from sensors as s2, sensor_readings as r
-       where s2.uuid = sensors.uuid
-         and r.sensor_uuid = s2.uuid
-         and r.reading_time = 
-              (select max(reading_time)  
-                 from sensor_readings r2
-                where r2.sensor_uuid = s2.uuid);
+        from sensor_readings as r
+       where r.sensor_uuid = sensors.uuid
+         and r.reading_time = :last_ts;
+
+      return 'Inserted ' || rows_inserted || ' readings, up to ' || last_ts;
     end;
   $$
 ;
@@ -181,3 +200,8 @@ as
 
 -- Get some initial data in the readings table
 call populate_reading();
+
+-- To load-test the app with a longer history, start from an empty table and backfill it,
+-- a day of readings per sensor per call, calling it again until it inserts 0 readings:
+-- truncate table sensor_readings;
+-- call populate_reading(backfill_days => 365, max_readings_per_sensor => 2880);
@@ -0,0 +1,72 @@
+import gzip
+import io
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from snowflake.snowpark.types import DecimalType, StringType, StructField, StructType, TimestampType
+from export import arrow_schema, export_query, write_batches
+
+SCHEMA = pa.schema([('TS', pa.timestamp('ns')), ('MACHINE_NAME', pa.string()), ('VALUE', pa.int64())])
+
+def batches():
+    yield pa.Table.from_pandas(pd.DataFrame({
+        'TS': pd.to_datetime(['2024-04-01 09:01:00', '2024-04-01 09:00:30']),
+        'MACHINE_NAME': ['Chairlift #3', 'Chairlift #2'],
+        'VALUE': [99, 45],
+    }), preserve_index=False)
+    # a batch with no names at all, typed as null
+    yield pa.table({
+        'TS': pa.array(pd.to_datetime(['2024-04-01 09:00:00'])),
+        'MACHINE_NAME': pa.array([None], pa.null()),
+        'VALUE': pa.array([51]),
+    })
+
+def test_parquet_is_written_batch_by_batch():
+    sink = io.BytesIO()
+
+    rows = write_batches(batches(), 'Parquet', sink, SCHEMA)
+
+    sink.seek(0)
+    parquet = pq.ParquetFile(sink)
+    assert rows == 3
+    # one row group per batch: nothing waited for the whole result
+    assert parquet.num_row_groups == 2
+    assert parquet.read().column('MACHINE_NAME').to_pylist() == ['Chairlift #3', 'Chairlift #2', None]
+
+def test_csv_is_gzipped_with_one_header():
+    sink = io.BytesIO()
+
+    write_batches(batches(), 'CSV (gzip)', sink, SCHEMA)
+
+    lines = gzip.decompress(sink.getvalue()).decode().splitlines()
+    assert lines[0] == '"TS","MACHINE_NAME","VALUE"'
+    assert len(lines) == 4
+    assert lines[3].endswith(',,51')
+
+def warnings_query():
+    df = MagicMock()
+    # warnings of a sensor not sending data come first, and have no readings
+    df.to_arrow_batches.side_effect = lambda: iter([
+        pa.table({'REASON': ['SENSOR_NOT_SENDING_DATA'], 'MIN_READING': pa.array([None], pa.null())}),
+        pa.table({'REASON': ['SENSOR_READING_OUT_OF_RANGE'], 'MIN_READING': pa.array([12])}),
+    ])
+    df.schema = StructType([StructField('REASON', StringType()), StructField('MIN_READING', DecimalType(38, 0))])
+    return df
+
+def test_a_column_all_null_in_the_first_batch_takes_the_declared_type():
+    with export_query(warnings_query(), 'Parquet') as exported:
+        assert pq.read_table(exported).column('MIN_READING').to_pylist() == [None, 12]
+
+    with export_query(warnings_query(), 'CSV (gzip)') as exported:
+        lines = gzip.decompress(exported.read()).decode().splitlines()
+    assert lines[1:] == ['"SENSOR_NOT_SENDING_DATA",', '"SENSOR_READING_OUT_OF_RANGE",12']
+
+def test_export_without_rows_has_the_columns():
+    df = MagicMock()
+    df.to_arrow_batches.return_value = iter([])
+    df.schema = StructType([StructField('SENSOR_UUID', StringType()), StructField('FIRST_READING_TIME', TimestampType())])
+
+    with export_query(df, 'Parquet') as exported:
+        assert pq.read_table(exported).schema == arrow_schema(df.schema)
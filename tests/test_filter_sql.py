@@ -0,0 +1,22 @@
+import datetime as dt
+from chairlift_data import Machine
+from filter_sql import half_open_range, machine_filter, time_range_filter
+
+def test_same_selection_gives_same_query():
+    a = Machine('uuid-a', 'Chairlift #1')
+    b = Machine('uuid-b', 'Chairlift #2')
+
+    first = machine_filter('sensor.machine_uuid', [a, b])
+    second = machine_filter('sensor.machine_uuid', [b, a, b])
+
+    assert first == second
+    assert first.params == ['["uuid-a", "uuid-b"]']
+    assert machine_filter('sensor.machine_uuid', [a]).predicates == first.predicates
+
+def test_time_range_is_half_open():
+    start, end = half_open_range(dt.datetime(2024, 4, 1, 0, 0, 0), dt.datetime(2024, 4, 2, 23, 59, 59))
+    sql_filter = time_range_filter('warning.reading_time', start, end)
+
+    assert sql_filter.where_clause() == \
+        'where warning.reading_time >= ?::timestamp and warning.reading_time < ?::timestamp'
+    assert sql_filter.params == ['2024-04-01 00:00:00', '2024-04-03 00:00:00']
@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock
+import threading
+
+import pytest
+
+from query_scheduler import QueryScheduler
+from query_stats import InstrumentedSession, get_query_stats
+
+def load_warning_counts(session):
+    return session.sql("select machine_uuid, warning_count from warnings_data.warning_counts")
+
+def test_submitted_functions_run_at_the_same_time():
+    # each function only returns once the other one has started
+    started = threading.Barrier(2, timeout=5)
+    def query(name):
+        started.wait()
+        return name
+
+    queries = QueryScheduler()
+    first, second = queries.submit(query, 'first'), queries.submit(query, 'second')
+
+    assert (first.result(), second.result()) == ('first', 'second')
+
+def test_each_page_render_has_workers_of_its_own():
+    # one session's page is blocked on its single worker...
+    release = threading.Event()
+    busy = QueryScheduler(max_workers=1)
+    blocked = busy.submit(release.wait, 5)
+
+    # ...and another's queries still run straight away
+    with QueryScheduler(max_workers=1) as queries:
+        assert queries.submit(lambda: 'other page').result(timeout=5) == 'other page'
+    release.set()
+    assert blocked.result(timeout=5)
+    busy.shutdown()
+
+    with pytest.raises(RuntimeError):
+        queries.submit(lambda: 'after the render')
+
+def test_async_queries_are_transformed_and_recorded_once():
+    session = MagicMock()
+    session.sql.return_value.collect_nowait.return_value.result.return_value = [('uuid-a', 2), ('uuid-b', 1)]
+    transform = MagicMock(side_effect=dict)
+    get_query_stats().recent.clear()
+
+    pending = QueryScheduler().collect(load_warning_counts(InstrumentedSession(session, page="Dashboard")), transform)
+
+    assert pending.result() == {'uuid-a': 2, 'uuid-b': 1}
+    assert pending.result() == {'uuid-a': 2, 'uuid-b': 1}
+    transform.assert_called_once()
+    assert [(record.call_site, record.rows_returned) for record in get_query_stats().recent] == [
+        ('test_query_scheduler.load_warning_counts', 2)
+    ]
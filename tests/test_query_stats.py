@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock
+import time
+import query_stats
+from query_stats import InstrumentedSession, QueryRecord, QueryStats, cache_data, get_query_stats, record_cache_use
+
+def load_machines(session):
+    return session.sql("select UUID, NAME from reference('MACHINES')").collect()
+
+def test_queries_are_tagged_with_page_and_call_site():
+    session = MagicMock()
+    session.sql.return_value.collect.return_value = [('uuid-a', 'Chairlift #1')]
+    get_query_stats().recent.clear()
+
+    rows = load_machines(InstrumentedSession(session, page="Dashboard"))
+
+    assert rows == [('uuid-a', 'Chairlift #1')]
+    session.sql.return_value.collect.assert_called_once_with(
+        statement_params={'QUERY_TAG': 'chairlift:Dashboard:test_query_stats.load_machines'}
+    )
+    record = get_query_stats().recent[-1]
+    assert (record.call_site, record.rows_returned, record.cache_hit) == ('test_query_stats.load_machines', 1, False)
+
+def test_calls_that_run_no_query_are_cache_hits():
+    session = InstrumentedSession(MagicMock(), page="Dashboard")
+    cached = {}
+    def get_machines(session):
+        if 'machines' not in cached:
+            cached['machines'] = load_machines(session)
+        return cached['machines']
+    get_machines = record_cache_use(get_machines)
+    get_query_stats().recent.clear()
+
+    get_machines(session)
+    get_machines(session)
+
+    assert [(record.call_site, record.cache_hit) for record in get_query_stats().recent] == [
+        ('test_query_stats.load_machines', False),
+        ('test_query_stats.get_machines', True),
+    ]
+
+def test_percentiles_per_call_site():
+    stats = QueryStats()
+    for duration_ms in range(1, 101):
+        stats.record(QueryRecord(0, 'Dashboard', 'v_dashboard.get_warning_data', duration_ms, 0, 0, False, ''))
+
+    summary = stats.summary()
+
+    assert list(summary['CALL_SITE']) == ['v_dashboard.get_warning_data']
+    assert (summary['P50_MS'][0], summary['P95_MS'][0]) == (50.5, 95.05)
+
+def test_cached_results_expire_after_their_ttl():
+    calls = []
+    @cache_data(ttl=0.2)
+    def get_machine_count(_session, machine_type: str):
+        calls.append(machine_type)
+        return len(calls)
+
+    assert get_machine_count(None, 'chairlift') == 1
+    assert get_machine_count(None, 'chairlift') == 1
+    time.sleep(0.3)
+    assert get_machine_count(None, 'chairlift') == 2
+
+def test_statistics_are_written_off_the_querying_thread():
+    session = MagicMock()
+    stats = QueryStats(flush_seconds=3600)
+    stats.record(QueryRecord(0, 'Dashboard', 'v_dashboard.get_warning_data', 12.5, 1, 100, False, ''))
+    stats.write_with(session)
+
+    # recording queues the statistics; only the flush writes them, on a thread of its own
+    session.sql.assert_not_called()
+    assert stats.flusher.daemon
+    stats.flush()
+    assert session.sql.call_args.args[0].split()[:3] == ['insert', 'into', 'ui_data.query_stats']
+    assert stats.pending == []
+
+def test_failed_writes_are_logged_once(monkeypatch):
+    session = MagicMock()
+    session.sql.side_effect = RuntimeError("Insufficient privileges")
+    warning = MagicMock()
+    monkeypatch.setattr(query_stats.logger, 'warning', warning)
+    stats = QueryStats(flush_seconds=3600)
+    stats.write_with(session)
+
+    for _ in range(2):
+        stats.record(QueryRecord(0, 'Dashboard', 'v_dashboard.get_warning_data', 12.5, 1, 100, False, ''))
+        stats.flush()
+
+    assert session.sql.call_count == 2
+    warning.assert_called_once()
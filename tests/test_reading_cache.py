@@ -0,0 +1,167 @@
+import datetime as dt
+import threading
+import time
+
+import pandas as pd
+from reading_cache import AppendOnlyCache
+
+def readings(*timestamps):
+    return pd.DataFrame({
+        'TS': pd.to_datetime(sorted(timestamps, reverse=True)),
+        'VALUE': range(len(timestamps))
+    })
+
+class FakeFetch:
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.calls = []
+
+    def __call__(self, min_ts, max_ts, from_ts):
+        self.calls.append((min_ts, max_ts, from_ts))
+        return self.batches.pop(0)
+
+def test_refresh_only_fetches_rows_from_the_newest_one_held():
+    cache = AppendOnlyCache('TS', max_bytes=10**9, refresh_seconds=0)
+    fetch = FakeFetch(
+        readings('2024-04-01 08:00:00', '2024-04-01 08:00:30'),
+        readings('2024-04-01 08:01:00')
+    )
+
+    cache.get('all', None, None, fetch)
+    result = cache.get('all', None, None, fetch)
+
+    assert fetch.calls[1] == (None, None, pd.Timestamp('2024-04-01 08:00:30'))
+    assert list(result['TS'].astype(str)) == ['2024-04-01 08:01:00', '2024-04-01 08:00:30', '2024-04-01 08:00:00']
+
+def test_refresh_picks_up_late_rows_at_the_newest_time_held():
+    def sensor_readings(*rows):
+        return pd.DataFrame(rows, columns=['TS', 'SENSOR_NAME']).astype({'TS': 'datetime64[ns]'})
+    cache = AppendOnlyCache('TS', max_bytes=10**9, refresh_seconds=0, key_columns=['SENSOR_NAME'])
+    fetch = FakeFetch(
+        sensor_readings(('2024-04-01 08:00:30', 'Load'), ('2024-04-01 08:00:00', 'Load')),
+        # the vibration reading at 08:00:30 came in after the first fetch
+        sensor_readings(('2024-04-01 08:00:30', 'Load'), ('2024-04-01 08:00:30', 'Vibration'))
+    )
+
+    cache.get('all', None, None, fetch)
+    result = cache.get('all', None, None, fetch)
+
+    assert list(zip(result['TS'].astype(str), result['SENSOR_NAME'])) == [
+        ('2024-04-01 08:00:30', 'Vibration'),
+        ('2024-04-01 08:00:30', 'Load'),
+        ('2024-04-01 08:00:00', 'Load'),
+    ]
+
+def test_windows_ending_within_the_utc_offset_of_now_are_still_refreshed(monkeypatch):
+    # local time is behind UTC: a window that ends in an hour, local time, is still open
+    monkeypatch.setenv('TZ', 'America/Los_Angeles')
+    time.tzset()
+    try:
+        cache = AppendOnlyCache('TS', max_bytes=10**9, refresh_seconds=0)
+        fetch = FakeFetch(readings('2024-04-01 08:00:00'), readings('2024-04-01 08:00:30'))
+        max_ts = pd.Timestamp(dt.datetime.now() + dt.timedelta(hours=1))
+
+        cache.get('all', None, max_ts, fetch)
+        cache.get('all', None, max_ts, fetch)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert len(fetch.calls) == 2
+
+def test_narrower_window_is_served_from_cache():
+    cache = AppendOnlyCache('TS', max_bytes=10**9, refresh_seconds=3600)
+    fetch = FakeFetch(readings('2024-04-01 08:00:00', '2024-04-02 08:00:00', '2024-04-03 08:00:00'))
+
+    cache.get('all', pd.Timestamp('2024-04-01'), None, fetch)
+    result = cache.get('all', pd.Timestamp('2024-04-02'), pd.Timestamp('2024-04-02 23:59:59'), fetch)
+
+    assert len(fetch.calls) == 1
+    assert list(result['TS'].astype(str)) == ['2024-04-02 08:00:00']
+
+def test_least_recently_used_entries_are_evicted():
+    frame = readings('2024-04-01 08:00:00')
+    cache = AppendOnlyCache('TS', max_bytes=2 * int(frame.memory_usage(deep=True).sum()), refresh_seconds=3600)
+    fetch = FakeFetch(frame, frame.copy(), frame.copy())
+
+    cache.get('a', None, None, fetch)
+    cache.get('b', None, None, fetch)
+    cache.get('a', None, None, fetch)
+    cache.get('c', None, None, fetch)
+
+    assert list(cache.entries.keys()) == ['a', 'c']
+
+def test_fetches_for_different_signatures_run_at_the_same_time():
+    cache = AppendOnlyCache('TS', max_bytes=10**9, refresh_seconds=3600)
+    b_fetched = threading.Event()
+    waited = []
+
+    def fetch_a(min_ts, max_ts, from_ts):
+        # a query for 'b' gets to run while this one is still out
+        waited.append(b_fetched.wait(timeout=5))
+        return readings('2024-04-01 08:00:00')
+
+    def fetch_b(min_ts, max_ts, from_ts):
+        b_fetched.set()
+        return readings('2024-04-01 09:00:00')
+
+    thread = threading.Thread(target=cache.get, args=('a', None, None, fetch_a))
+    thread.start()
+    cache.get('b', None, None, fetch_b)
+    thread.join()
+
+    assert waited == [True]
+    assert set(cache.entries) == {'a', 'b'}
+
+def test_callers_of_the_same_signature_share_one_fetch():
+    cache = AppendOnlyCache('TS', max_bytes=10**9, refresh_seconds=3600)
+    started, release = threading.Event(), threading.Event()
+    fetch = FakeFetch(readings('2024-04-01 08:00:00'))
+
+    def slow_fetch(*args):
+        started.set()
+        release.wait(timeout=5)
+        return fetch(*args)
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get('all', None, None, slow_fetch)))
+    second = threading.Thread(target=lambda: results.append(cache.get('all', None, None, slow_fetch)))
+    first.start()
+    started.wait(timeout=5)
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(fetch.calls) == 1
+    assert [len(result) for result in results] == [1, 1]
+
+
+def test_evicting_an_entry_keeps_the_fetch_lock_of_its_waiting_callers():
+    frame = readings('2024-04-01 08:00:00')
+    cache = AppendOnlyCache('TS', max_bytes=int(frame.memory_usage(deep=True).sum()), refresh_seconds=3600)
+    started, release = threading.Event(), threading.Event()
+    running, most_running = [], []
+
+    def slow_fetch(min_ts, max_ts, from_ts):
+        running.append(1)
+        most_running.append(len(running))
+        started.set()
+        release.wait(timeout=5)
+        running.pop()
+        return frame.copy()
+
+    first = threading.Thread(target=cache.get, args=('a', None, None, slow_fetch))
+    first.start()
+    started.wait(timeout=5)
+    # 'a' is cached and evicted while its first caller is still fetching
+    cache.entries['a'] = cache._load(None, None, lambda *args: frame.copy())
+    cache.get('b', None, None, lambda *args: frame.copy())
+    second = threading.Thread(target=cache.get, args=('a', None, None, slow_fetch))
+    second.start()
+    time.sleep(0.1)
+    release.set()
+    first.join()
+    second.join()
+
+    assert max(most_running) == 1
@@ -0,0 +1,53 @@
+import pandas as pd
+from reading_window import ReadingWindow
+
+def readings(sensor_name, *timestamps, machine_name='Chairlift #2', start=0):
+    return pd.DataFrame({
+        'TS': pd.to_datetime(sorted(timestamps, reverse=True)),
+        'MACHINE_NAME': machine_name,
+        'SENSOR_NAME': sensor_name,
+        'VALUE': range(start, start + len(timestamps))
+    })
+
+def test_window_keeps_the_latest_readings_of_each_sensor():
+    window = ReadingWindow(size=3)
+
+    window.append(readings('Chairlift Load', '2024-04-01 08:00:00', '2024-04-01 08:00:30'))
+    changed = window.append(readings('Chairlift Load', '2024-04-01 08:01:00', '2024-04-01 08:01:30', start=2))
+
+    assert changed == {'Chairlift Load'}
+    assert window.last_ts == pd.Timestamp('2024-04-01 08:01:30')
+    load = window.sensor_readings('Chairlift Load')
+    assert list(load['TS'].astype(str)) == ['2024-04-01 08:00:30', '2024-04-01 08:01:00', '2024-04-01 08:01:30']
+
+def test_memory_stays_flat_and_only_changed_sensors_are_bumped():
+    window = ReadingWindow(size=4)
+    window.append(pd.concat([
+        readings('Chairlift Load', '2024-04-01 08:00:00'),
+        readings('Chairlift Vibration', '2024-04-01 08:00:00'),
+    ]))
+    allocated = window.nbytes
+
+    for minute in range(1, 10):
+        window.append(readings('Chairlift Load', f'2024-04-01 08:{minute:02}:00'))
+
+    assert window.nbytes == allocated
+    assert window.versions == {'Chairlift Load': 10, 'Chairlift Vibration': 1}
+    assert len(window.sensor_readings('Chairlift Load')) == 4
+    assert len(window.sensor_readings('Chairlift Vibration')) == 1
+
+def test_overlapping_polls_only_add_readings_a_series_doesnt_have():
+    window = ReadingWindow(size=4)
+    window.append(readings('Chairlift Load', '2024-04-01 08:00:00', '2024-04-01 08:00:30'))
+
+    # the next poll starts at the newest reading held; the vibration sensor's reading
+    # at that time arrived late
+    changed = window.append(pd.concat([
+        readings('Chairlift Load', '2024-04-01 08:00:30'),
+        readings('Chairlift Vibration', '2024-04-01 08:00:30'),
+    ]))
+
+    assert changed == {'Chairlift Vibration'}
+    assert window.versions == {'Chairlift Load': 1, 'Chairlift Vibration': 1}
+    assert len(window.sensor_readings('Chairlift Load')) == 2
+    assert list(window.sensor_readings('Chairlift Vibration')['TS'].astype(str)) == ['2024-04-01 08:00:30']
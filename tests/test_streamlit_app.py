@@ -0,0 +1,89 @@
+from test_utils import normalize_spaces, session, session_builder
+from unittest.mock import MagicMock
+from streamlit.testing.v1 import AppTest
+import json
+import pytest
+
+import test_v_dashboard
+import test_v_performance
+
+SNAPSHOT_QUERY = "select is_first_time_setup_dismissed, enable_warning_generation_task, is_application_role_in_session('APP_ADMIN') as is_app_admin from config_data.configuration"
+
+def sql_handler(*args, **kwargs):
+    try:
+        return test_v_dashboard.sql_handler(*args, **kwargs)
+    except NotImplementedError:
+        return test_v_performance.sql_handler(*args, **kwargs)
+
+def setup_sql_handler(*args, **kwargs):
+    query_result = MagicMock()
+    stmt = normalize_spaces(args[0])
+
+    if stmt == SNAPSHOT_QUERY:
+        query_result.collect.return_value = [{
+            'IS_FIRST_TIME_SETUP_DISMISSED': False, 'ENABLE_WARNING_GENERATION_TASK': False, 'IS_APP_ADMIN': True
+        }]
+    elif stmt == "select current_database()":
+        query_result.collect.return_value = [{'CURRENT_DATABASE()': 'CHAIRLIFT_APP'}]
+    elif stmt == "select system$get_reference_definitions('CHAIRLIFT_APP') as REFS_JSON":
+        query_result.collect.return_value = [{'REFS_JSON': json.dumps([{
+            'name': 'MACHINES', 'label': 'Chairlift machines', 'description': 'Machines', 'object_type': 'TABLE',
+            'bindings': []
+        }])}]
+    else:
+        raise NotImplementedError(f'"{stmt}"')
+
+    return query_result
+
+def snapshot_queries(session):
+    return [c for c in session.sql.call_args_list if normalize_spaces(c.args[0]) == SNAPSHOT_QUERY]
+
+def test_moving_between_pages_runs_no_setup_queries(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/streamlit_app.py')
+    at.run()
+
+    assert not at.exception
+    assert at.header[0].value == 'Warnings'
+
+    at.switch_page('v_performance.py').run()
+    assert not at.exception
+    assert at.header[0].value == 'Performance'
+
+    at.switch_page('v_dashboard.py').run()
+    assert not at.exception
+    assert len(snapshot_queries(session)) == 1
+
+def test_first_time_setup_reads_references_until_they_are_bound(session):
+    session.sql.side_effect = setup_sql_handler
+
+    at = AppTest.from_file('../app/src/ui/streamlit_app.py')
+    at.run()
+    at.run()
+
+    assert not at.exception
+    assert at.header[0].value == 'First-time setup'
+    assert at.subheader[0].value == 'Chairlift machines'
+    assert len(snapshot_queries(session)) == 1
+    reference_queries = [c for c in session.sql.call_args_list if 'get_reference_definitions' in c.args[0]]
+    assert len(reference_queries) == 2
+
+def test_admin_pages_are_only_listed_for_app_admin(session):
+    def viewer_sql_handler(*args, **kwargs):
+        if normalize_spaces(args[0]) == SNAPSHOT_QUERY:
+            query_result = MagicMock()
+            query_result.collect.return_value = [{
+                'IS_FIRST_TIME_SETUP_DISMISSED': True, 'ENABLE_WARNING_GENERATION_TASK': False, 'IS_APP_ADMIN': False
+            }]
+            return query_result
+        return sql_handler(*args, **kwargs)
+    session.sql.side_effect = viewer_sql_handler
+
+    at = AppTest.from_file('../app/src/ui/streamlit_app.py')
+    at.run()
+
+    assert not at.exception
+    assert at.header[0].value == 'Warnings'
+    with pytest.raises(ValueError, match="Could not find a navigation page"):
+        at.switch_page('v_performance.py')
@@ -1,5 +1,6 @@
 from pytest import fixture
 from unittest.mock import MagicMock, patch
+import pyarrow as pa
 
 @fixture
 def session():
@@ -13,3 +14,12 @@ def session_builder(session):
 
 def normalize_spaces(input):
     return ' '.join(input.split())
+
+def collected(query_result, rows):
+    """ Mocks DataFrame.collect() returning `rows`, whether it's run now or as an async job """
+    query_result.collect.return_value = rows
+    query_result.collect_nowait.return_value.result.return_value = rows
+
+def arrow_batches(frame):
+    """ Mocks DataFrame.to_arrow_batches() for a query returning `frame` """
+    return [pa.Table.from_pandas(frame, preserve_index=False)]
@@ -1,15 +1,50 @@
+import json
+import pandas as pd
+import streamlit as st
 from test_utils import normalize_spaces, session, session_builder
 from unittest.mock import MagicMock
 from streamlit.testing.v1 import AppTest
 
-def sql_handler(*args):
+def sql_handler(*args, **kwargs):
     query_result = MagicMock()
     stmt = normalize_spaces(args[0])
 
-    if stmt == 'select is_first_time_setup_dismissed from config_data.configuration':
-        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True}]
-    elif stmt == 'select enable_warning_generation_task from config_data.configuration limit 1':
-        query_result.collect.return_value = [{'ENABLE_WARNING_GENERATION_TASK': True}]
+    if stmt == "select is_first_time_setup_dismissed, enable_warning_generation_task, is_application_role_in_session('APP_ADMIN') as is_app_admin from config_data.configuration":
+        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True, 'ENABLE_WARNING_GENERATION_TASK': True, 'IS_APP_ADMIN': True}]
+    elif stmt == 'select warning_partition_count from config_data.configuration limit 1':
+        query_result.collect.return_value = [{'WARNING_PARTITION_COUNT': 2}]
+    elif stmt.startswith('select warning_check_adaptive, warning_check_interval_minutes'):
+        query_result.collect.return_value = [{
+            'WARNING_CHECK_ADAPTIVE': True,
+            'WARNING_CHECK_INTERVAL_MINUTES': 8,
+            'WARNING_CHECK_MAX_INTERVAL_MINUTES': 30,
+        }]
+    elif stmt.startswith('select count(*) as runs, count_if(skipped) as skipped_runs'):
+        query_result.collect.return_value = [{
+            'RUNS': 200,
+            'SKIPPED_RUNS': 150,
+            'AVOIDED_RUNS': 1240,
+            'AVG_CHECK_S': 20.0,
+            'AVG_SKIP_S': 2.0,
+        }]
+    elif stmt == 'select warning_retention_days, warning_archive_retention_days from config_data.configuration limit 1':
+        query_result.collect.return_value = [{
+            'WARNING_RETENTION_DAYS': 30,
+            'WARNING_ARCHIVE_RETENTION_DAYS': None,
+        }]
+    elif stmt.startswith('update config_data.configuration set warning_'):
+        query_result.collect.return_value = []
+    elif stmt == "select ID, NAME, MIN_RANGE, MAX_RANGE from shared_content.SENSOR_TYPES_VIEW":
+        query_result.collect.return_value = [
+            {'ID': 8, 'NAME': 'Chairlift Load', 'MIN_RANGE': 50, 'MAX_RANGE': 250},
+            {'ID': 9, 'NAME': 'Chairlift Vibration', 'MIN_RANGE': 30, 'MAX_RANGE': 100},
+        ]
+    elif stmt == 'select sensor_type_id, rule, window_readings, threshold from config_data.window_rules order by sensor_type_id, rule':
+        query_result.collect.return_value = [
+            {'SENSOR_TYPE_ID': 9, 'RULE': 'ROLLING_ZSCORE', 'WINDOW_READINGS': 20, 'THRESHOLD': 3.0},
+        ]
+    elif stmt == 'call warnings_code.set_window_rules(?)':
+        query_result.collect.return_value = []
     else:
         raise NotImplementedError(f'"{stmt}"')
     
@@ -22,6 +57,82 @@ def test_streamlit_configuration_ui(session):
     at.run()
 
     assert not at.exception
-    assert at.checkbox[0].label == "Enable warning generation task (⚠️ runs every 60s!)"
+    assert at.checkbox[0].label == "Enable warning generation task (⚠️ runs every 8 min!)"
     assert at.checkbox[0].value == True
-    assert at.button[0].label == 'Generate new warnings (takes a while)'
+    assert at.checkbox('warning_check_adaptive').value == True
+    assert at.metric[0].value == '8 min'
+    assert at.metric[1].value == '150 of 200'
+    # 150 skipped runs * 18s + 1240 runs not started * 2s
+    assert at.metric[2].value == '86.3 min'
+    assert at.number_input('warning_partitions').value == 2
+    assert at.button[0].label == 'Apply'
+    assert at.button[0].disabled
+    assert at.number_input('warning_retention_days').value == 30
+    assert not at.checkbox('warning_retention_days_forever').value
+    # null keeps archived warnings; the input starts from the default, until it is used
+    assert at.checkbox('warning_archive_retention_days_forever').value
+    assert at.number_input('warning_archive_retention_days').value == 365
+    assert at.number_input('warning_archive_retention_days').disabled
+    assert at.button('apply_warning_retention').disabled
+    assert at.button[2].label == 'Generate new warnings (takes a while)'
+
+def test_retention_is_saved_on_apply(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_configuration.py')
+    at.run()
+    at.number_input('warning_retention_days').set_value(7).run()
+    at.button('apply_warning_retention').click().run()
+
+    assert not at.exception
+    updates = [c for c in session.sql.call_args_list if normalize_spaces(c.args[0]).startswith('update')]
+    assert len(updates) == 1
+    # only the setting that changed: the archive is still kept forever
+    assert normalize_spaces(updates[0].args[0]) == 'update config_data.configuration set warning_retention_days = ?'
+    assert updates[0].kwargs['params'] == [7]
+
+def test_retention_can_be_set_to_keep_forever(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_configuration.py')
+    at.run()
+    at.checkbox('warning_retention_days_forever').check().run()
+    at.checkbox('warning_archive_retention_days_forever').uncheck().run()
+    at.button('apply_warning_retention').click().run()
+
+    assert not at.exception
+    updates = [c for c in session.sql.call_args_list if normalize_spaces(c.args[0]).startswith('update')]
+    assert normalize_spaces(updates[0].args[0]) == \
+        'update config_data.configuration set warning_retention_days = ?, warning_archive_retention_days = ?'
+    assert updates[0].kwargs['params'] == [None, 365]
+
+def test_window_rules_are_edited_by_sensor_type_name(session):
+    session.sql.side_effect = sql_handler
+    st.cache_data.clear()
+
+    at = AppTest.from_file('../app/src/ui/v_configuration.py')
+    at.run()
+
+    assert not at.exception
+    assert at.subheader[0].value == 'Window rules'
+    assert at.dataframe[0].value.values.tolist() == [['Chairlift Vibration', 'ROLLING_ZSCORE', 20, 3.0]]
+    assert at.button('apply_window_rules').disabled
+
+def test_window_rules_are_saved_as_sensor_type_ids(session):
+    session.sql.side_effect = sql_handler
+    st.cache_data.clear()
+    from v_configuration import WINDOW_RULE_COLUMNS, set_window_rules
+
+    set_window_rules(session, pd.DataFrame([
+        ['Chairlift Load', 'CONSECUTIVE_OUT_OF_RANGE', 5, None],
+        ['Chairlift Vibration', 'RATE_OF_CHANGE', 1, 12.5],
+        # a row still being filled in
+        ['Chairlift Load', None, None, None],
+    ], columns=WINDOW_RULE_COLUMNS))
+
+    calls = [c for c in session.sql.call_args_list if normalize_spaces(c.args[0]).startswith('call')]
+    assert len(calls) == 1
+    assert json.loads(calls[0].kwargs['params'][0]) == [
+        {'sensor_type_id': 8, 'rule': 'CONSECUTIVE_OUT_OF_RANGE', 'window_readings': 5, 'threshold': None},
+        {'sensor_type_id': 9, 'rule': 'RATE_OF_CHANGE', 'window_readings': 1, 'threshold': 12.5},
+    ]
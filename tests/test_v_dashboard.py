@@ -1,18 +1,18 @@
-from test_utils import normalize_spaces, session, session_builder
+from test_utils import arrow_batches, collected, normalize_spaces, session, session_builder
 from unittest.mock import MagicMock
 from streamlit.testing.v1 import AppTest
 import pandas as pd
-import numpy as np
 import re
+import json
 
-def sql_handler(*args):
+def sql_handler(*args, **kwargs):
     query_result = MagicMock()
     stmt = normalize_spaces(args[0])
 
-    if stmt == "select is_first_time_setup_dismissed from config_data.configuration":
-        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True}]
-    elif stmt == "select count(*) as WARNING_COUNT from warnings_data.warnings where ACKNOWLEDGED = false":
-        query_result.collect.return_value = [{'WARNING_COUNT': 2}]
+    if stmt == "select is_first_time_setup_dismissed, enable_warning_generation_task, is_application_role_in_session('APP_ADMIN') as is_app_admin from config_data.configuration":
+        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True, 'ENABLE_WARNING_GENERATION_TASK': True, 'IS_APP_ADMIN': True}]
+    elif stmt == "select machine_uuid as MACHINE_UUID, sum(unacknowledged_count) as WARNING_COUNT from warnings_data.warning_counts group by machine_uuid":
+        collected(query_result, [{'MACHINE_UUID': '1234-abcd-1234', 'WARNING_COUNT': 2}])
     elif stmt == "select UUID, NAME from reference('MACHINES')":
         query_result.collect.return_value = [
             {'UUID': '1234-abcd-1234', 'NAME': 'Chairlift #2'},
@@ -23,14 +23,29 @@ def sql_handler(*args):
             {'ID': 'sensorTypeId1', 'NAME': 'Chairlift Load', 'MIN_RANGE': 100, 'MAX_RANGE': 200},
             {'ID': 'sensorTypeId2', 'NAME': 'Chairlift Vibration', 'MIN_RANGE': 2, 'MAX_RANGE': 50}
         ]
-    elif re.match(r"select warning.sensor_uuid as SENSOR_UUID, warning.reading_time as READING_TIME, concat\(to_date\(warning.reading_time\), ' ', to_time\(warning.reading_time\)\) as readable_time, machine.name as machine_name, sensor.name as sensor_name, warning.reading as reading, warning.reason as reason.*", stmt):
-        query_result.to_pandas.return_value = pd.DataFrame(
-            np.array([
-                ['sensor_uuid_3', '2024-04-01 09:37:34', '2024-04-01 09:37:34', 'Chairlift #3', 'Chairlift Vibration', 38, 'SENSOR_SERVICE_DUE'],
-                ['sensor_uuid_2', '2024-04-01 08:36:22', '2024-04-01 08:36:22', 'Chairlift #2', 'Chairlift Load', 45, 'SENSOR_READING_OUT_OF_RANGE']
-            ]),
-            columns=['SENSOR_UUID', 'READING_TIME', 'READABLE_TIME', 'MACHINE_NAME', 'SENSOR_NAME', 'READING', 'REASON']
-        )
+    elif re.match(r"select warning.sensor_uuid as SENSOR_UUID, warning.first_reading_time as FIRST_READING_TIME, warning.last_reading_time as LAST_READING_TIME, machine.name as machine_name, sensor.name as sensor_name, warning.reading_count as reading_count, .* from (warnings_data.warning_episodes|\(.* from warnings_data.warning_episodes_archive \)) warning .*", stmt):
+        query_result.to_arrow_batches.return_value = arrow_batches(pd.DataFrame({
+            'SENSOR_UUID': ['sensor_uuid_3', 'sensor_uuid_2'],
+            'FIRST_READING_TIME': pd.to_datetime(['2024-04-01 09:37:34', '2024-04-01 07:36:52']),
+            'LAST_READING_TIME': pd.to_datetime(['2024-04-01 09:37:34', '2024-04-01 08:36:22']),
+            'MACHINE_NAME': ['Chairlift #3', 'Chairlift #2'],
+            'SENSOR_NAME': ['Chairlift Vibration', 'Chairlift Load'],
+            'READING_COUNT': [1, 120],
+            'MIN_READING': [38, 45],
+            'MAX_READING': [38, 52],
+            'REASON': ['SENSOR_SERVICE_DUE', 'SENSOR_READING_OUT_OF_RANGE'],
+            'MACHINE_UUID': ['4321-dcba-4321', '1234-abcd-1234'],
+        }))
+    elif stmt.startswith("select reading_time as READING_TIME, reading as READING from reference('SENSOR_READINGS')"):
+        assert kwargs['params'] == ['sensor_uuid_2', '2024-04-01 07:36:52', '2024-04-01 08:36:22']
+        query_result.to_arrow_batches.return_value = arrow_batches(pd.DataFrame({
+            'READING_TIME': pd.to_datetime(['2024-04-01 07:36:52', '2024-04-01 07:37:22']),
+            'READING': [45, 52],
+        }))
+    elif stmt in ("begin transaction", "commit", "rollback") \
+            or stmt.startswith("merge into warnings_data.warning_counts counts") \
+            or stmt.startswith("update warnings_data.warning_episodes warning set acknowledged = true, is_open = false"):
+        query_result.collect.return_value = []
     else:
         raise NotImplementedError(f'"{stmt}"')
     
@@ -44,11 +59,106 @@ def test_streamlit_dashboard_ui(session):
 
     assert not at.exception
     assert at.warning[0].value == 'There are 2 new unacknowledged warnings.'
-    assert at.multiselect('machines').options == ['Chairlift #2', 'Chairlift #3']
+    assert at.multiselect('machines').options == ['Chairlift #2 (2 ⚠️)', 'Chairlift #3']
     assert at.multiselect('sensorTypes').options == ['Chairlift Load', 'Chairlift Vibration']
 
-    assert [col.caption.values[0] for col in at.columns[6:12]] == ['READING TIME', 'MACHINE NAME', 'SENSOR NAME', 'READING', 'REASON', 'ACKNOWLEDGE']
-    assert [col.markdown.values[0] for col in at.columns[12:17]] == ['2024-04-01 09:37:34', 'Chairlift #3', 'Chairlift Vibration', '38', 'SENSOR_SERVICE_DUE']
-    assert len(at.columns[17].checkbox) == 1
-    assert [col.markdown.values[0] for col in at.columns[18:23]] == ['2024-04-01 08:36:22', 'Chairlift #2', 'Chairlift Load', '45', 'SENSOR_READING_OUT_OF_RANGE']
-    assert len(at.columns[23].checkbox) == 1
+    # the whole page is a single grid, not a row of widgets per warning
+    assert len(at.dataframe) == 1
+    grid = at.dataframe[0].value
+    assert list(grid.columns) == ['READING TIMES', 'MACHINE NAME', 'SENSOR NAME', 'READINGS', 'READING COUNT', 'REASON', 'ACKNOWLEDGE']
+    assert list(grid.iloc[0]) == ['2024-04-01 09:37:34', 'Chairlift #3', 'Chairlift Vibration', '38', 1, 'SENSOR_SERVICE_DUE', False]
+    assert list(grid.iloc[1]) == ['2024-04-01 07:36:52 → 2024-04-01 08:36:22', 'Chairlift #2', 'Chairlift Load', '45 – 52', 120, 'SENSOR_READING_OUT_OF_RANGE', False]
+    assert len(at.checkbox) == 2
+    assert at.selectbox('episode_choice').options == [
+        'Chairlift Vibration on Chairlift #3, 2024-04-01 09:37:34 (1 reading)',
+        'Chairlift Load on Chairlift #2, 2024-04-01 07:36:52 → 2024-04-01 08:36:22 (120 readings)'
+    ]
+    assert at.selectbox('warnings_page_size').value == 20
+    assert at.button('warnings_next').disabled
+    # exporting runs its own query, without a limit, only once the download is clicked
+    assert at.selectbox('warnings_format').options == ['Parquet', 'CSV (gzip)']
+    assert all(
+        ' limit ' in normalize_spaces(call.args[0]) for call in session.sql.call_args_list
+        if 'from warnings_data.warning_episodes warning' in normalize_spaces(call.args[0])
+    )
+
+def test_dismiss_selected_acknowledges_in_one_statement(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_dashboard.py')
+    at.run()
+    at.button('selectAll').click().run()
+    assert list(at.dataframe[0].value['ACKNOWLEDGE']) == [True, True]
+    at.button('dismissSelected').click().run()
+
+    updates = [c for c in session.sql.call_args_list if normalize_spaces(c.args[0]).startswith('update')]
+    assert not at.exception
+    merges = [c for c in session.sql.call_args_list if normalize_spaces(c.args[0]).startswith('merge')]
+    assert len(updates) == 1
+    assert len(merges) == 1
+    assert json.loads(updates[0].kwargs['params'][0]) == [
+        ['sensor_uuid_2', '2024-04-01 07:36:52'],
+        ['sensor_uuid_3', '2024-04-01 09:37:34']
+    ]
+    assert at.session_state['selected_rows'] == set()
+
+def test_failed_dismiss_rolls_back(session):
+    def failing_update(*args, **kwargs):
+        if normalize_spaces(args[0]).startswith("update warnings_data.warning_episodes warning"):
+            raise RuntimeError("update failed")
+        return sql_handler(*args, **kwargs)
+    session.sql.side_effect = failing_update
+
+    at = AppTest.from_file('../app/src/ui/v_dashboard.py')
+    at.run()
+    at.button('selectAll').click().run()
+    at.button('dismissSelected').click().run()
+
+    statements = [normalize_spaces(c.args[0]) for c in session.sql.call_args_list]
+    assert at.exception
+    assert statements[-1] == "rollback"
+    assert "commit" not in statements
+
+def test_selection_is_kept_as_warning_keys(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_dashboard.py')
+    at.session_state['selected_rows'] = {('sensor_uuid_2', '2024-04-01 07:36:52')}
+    at.run()
+
+    assert not at.exception
+    assert list(at.dataframe[0].value['ACKNOWLEDGE']) == [False, True]
+    assert at.caption[-2].value == '1 selected'
+
+    at.button('clearSelection').click().run()
+    assert list(at.dataframe[0].value['ACKNOWLEDGE']) == [False, False]
+
+def test_episode_drill_down_shows_its_readings(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_dashboard.py')
+    at.run()
+    at.selectbox('episode_choice').select_index(1).run()
+
+    assert not at.exception
+    assert at.subheader[0].value == 'Chairlift Load on Chairlift #2: SENSOR_READING_OUT_OF_RANGE'
+    assert list(at.dataframe[0].value['READING']) == [45, 52]
+
+    at.button('close_episode').click().run()
+    assert len(at.subheader) == 0
+    assert at.selectbox('episode_choice').value is None
+
+def test_archived_warnings_are_only_read_on_demand(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_dashboard.py')
+    at.run()
+    at.checkbox[0].check().run()
+    assert not any('warning_episodes_archive' in c.args[0] for c in session.sql.call_args_list)
+
+    at.checkbox('include_archived').check().run()
+
+    assert not at.exception
+    warning_queries = [c for c in session.sql.call_args_list if 'warning_episodes_archive' in c.args[0]]
+    assert len(warning_queries) == 1
+    assert warning_queries[0].kwargs['params'] == [True]
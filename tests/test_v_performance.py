@@ -0,0 +1,48 @@
+from test_utils import normalize_spaces, session, session_builder
+from unittest.mock import MagicMock
+from streamlit.testing.v1 import AppTest
+import pandas as pd
+
+def sql_handler(*args, **kwargs):
+    query_result = MagicMock()
+    stmt = normalize_spaces(args[0])
+
+    if stmt == "select is_first_time_setup_dismissed, enable_warning_generation_task, is_application_role_in_session('APP_ADMIN') as is_app_admin from config_data.configuration":
+        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True, 'ENABLE_WARNING_GENERATION_TASK': True, 'IS_APP_ADMIN': True}]
+    elif stmt.startswith('select page, call_site, count(*) as queries'):
+        assert kwargs['params'] == [1]
+        query_result.to_pandas.return_value = pd.DataFrame({
+            'PAGE': ['Dashboard'],
+            'CALL_SITE': ['v_dashboard.get_warning_data'],
+            'QUERIES': [12],
+            'P50_MS': [140.0],
+            'P95_MS': [610.0],
+            'AVG_ROWS': [21.0],
+            'AVG_BYTES': [4096.0],
+            'CACHE_HIT_RATE': [0.0],
+        })
+    elif stmt.startswith('select recorded_at, page, call_site, duration_ms'):
+        query_result.to_pandas.return_value = pd.DataFrame({
+            'RECORDED_AT': pd.to_datetime(['2024-04-01 09:37:34']),
+            'PAGE': ['Dashboard'],
+            'CALL_SITE': ['v_dashboard.get_warning_data'],
+            'DURATION_MS': [610.0],
+            'ROWS_RETURNED': [21],
+            'BYTES_MATERIALIZED': [4096],
+            'QUERY_TEXT': ['select warning.sensor_uuid as SENSOR_UUID'],
+        })
+    else:
+        raise NotImplementedError(f'"{stmt}"')
+
+    return query_result
+
+def test_streamlit_performance_ui(session):
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_performance.py')
+    at.run()
+
+    assert not at.exception
+    assert at.selectbox('window').value == 'Last hour'
+    assert list(at.dataframe[0].value['CALL_SITE']) == ['v_dashboard.get_warning_data']
+    assert list(at.dataframe[1].value['DURATION_MS']) == [610.0]
@@ -1,18 +1,18 @@
-from test_utils import normalize_spaces, session, session_builder
+from test_utils import arrow_batches, collected, normalize_spaces, session, session_builder
 from unittest.mock import MagicMock
 from streamlit.testing.v1 import AppTest
 import pandas as pd
-import numpy as np
+import streamlit as st
 import re
 
-def sql_handler(*args):
+def sql_handler(*args, **kwargs):
     query_result = MagicMock()
     stmt = normalize_spaces(args[0])
 
-    if stmt == "select is_first_time_setup_dismissed from config_data.configuration":
-        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True}]
-    elif stmt == "select count(*) as WARNING_COUNT from warnings_data.warnings where ACKNOWLEDGED = false":
-        query_result.collect.return_value = [{'WARNING_COUNT': 2}]
+    if stmt == "select is_first_time_setup_dismissed, enable_warning_generation_task, is_application_role_in_session('APP_ADMIN') as is_app_admin from config_data.configuration":
+        query_result.collect.return_value = [{'IS_FIRST_TIME_SETUP_DISMISSED': True, 'ENABLE_WARNING_GENERATION_TASK': True, 'IS_APP_ADMIN': True}]
+    elif stmt == "select machine_uuid as MACHINE_UUID, sum(unacknowledged_count) as WARNING_COUNT from warnings_data.warning_counts group by machine_uuid":
+        collected(query_result, [{'MACHINE_UUID': '1234-abcd-1234', 'WARNING_COUNT': 2}])
     elif stmt == "select UUID, NAME from reference('MACHINES')":
         query_result.collect.return_value = [
             {'UUID': '1234-abcd-1234', 'NAME': 'Chairlift #2'},
@@ -24,17 +24,30 @@ def sql_handler(*args):
             {'ID': 'sensorTypeId2', 'NAME': 'Chairlift Vibration', 'MIN_RANGE': 2, 'MAX_RANGE': 50}
         ]
     elif re.match(r"select reading.reading_time as ts, machine.name as machine_name, sensor.name as sensor_name, reading.reading as value, case when reading.reading < sensor_range.min_range then '⚠️ LOW' when reading.reading > sensor_range.max_range then '⚠️ HIGH' else '' end as status.*", stmt):
-        query_result.to_pandas.return_value = pd.DataFrame(
-            np.array([
-                ['2024-04-01 09:01:00', 'Chairlift #3', 'Chairlift Load', 99, '⚠️ LOW'],
-                ['2024-04-01 08:02:00', 'Chairlift #3', 'Chairlift Load', 97, '⚠️ LOW'],
-                ['2024-04-01 07:03:00', 'Chairlift #3', 'Chairlift Load', 95, '⚠️ LOW'],
-                ['2024-04-01 08:04:00', 'Chairlift #2', 'Chairlift Vibration', 45, ''],
-                ['2024-04-01 07:05:00', 'Chairlift #2', 'Chairlift Vibration', 51, '⚠️ HIGH'],
-                ['2024-04-01 06:06:00', 'Chairlift #2', 'Chairlift Vibration', 47, '']
+        query_result.to_arrow_batches.return_value = arrow_batches(pd.DataFrame({
+            'TS': pd.to_datetime([
+                '2024-04-01 09:01:00', '2024-04-01 08:02:00', '2024-04-01 07:03:00',
+                '2024-04-01 08:04:00', '2024-04-01 07:05:00', '2024-04-01 06:06:00'
             ]),
-            columns=['TS', 'MACHINE_NAME', 'SENSOR_NAME', 'VALUE', 'STATUS']
-        )
+            'MACHINE_NAME': ['Chairlift #3'] * 3 + ['Chairlift #2'] * 3,
+            'SENSOR_NAME': ['Chairlift Load'] * 3 + ['Chairlift Vibration'] * 3,
+            'VALUE': [99, 97, 95, 45, 51, 47],
+            'STATUS': ['⚠️ LOW', '⚠️ LOW', '⚠️ LOW', '', '⚠️ HIGH', ''],
+            'MACHINE_UUID': ['4321-dcba-4321'] * 3 + ['1234-abcd-1234'] * 3,
+        }))
+    elif stmt == "select min(bucket_start) as FIRST_DAY from readings_data.sensor_reading_rollups where bucket_seconds = 86400":
+        query_result.collect.return_value = [{'FIRST_DAY': pd.Timestamp('2024-01-01')}]
+    elif re.match(r"with readings as \(.*\) select dateadd\( second, floor\(datediff\(second, buckets.first_ts, readings.reading_time\) / buckets.bucket_seconds\) \* buckets.bucket_seconds, buckets.first_ts \) as ts.*", stmt) \
+            or re.match(r"with rollup_cursor as \(.*\) select dateadd\( second, floor\(datediff\(second, buckets.first_ts, readings.bucket_start\) / buckets.bucket_seconds\) \* buckets.bucket_seconds, buckets.first_ts \) as ts.*", stmt):
+        query_result.to_arrow_batches.return_value = arrow_batches(pd.DataFrame({
+            'TS': pd.to_datetime(['2024-04-01 09:00:00', '2024-04-01 08:00:00']),
+            'MACHINE_NAME': ['Chairlift #3', 'Chairlift #2'],
+            'SENSOR_NAME': ['Chairlift Load', 'Chairlift Vibration'],
+            'VALUE': [97.0, 47.7],
+            'MIN_VALUE': [95, 45],
+            'MAX_VALUE': [99, 51],
+            'STATUS': ['⚠️ LOW', '⚠️ HIGH'],
+        }))
     else:
         raise NotImplementedError(f'"{stmt}"')
     
@@ -53,9 +66,10 @@ def test_streamlit_sensor_data_ui(session):
 
     assert len(at.tabs) == 2
     assert at.tabs[0].label == 'Plotted over time'
+    assert at.tabs[0].checkbox('fullResolution').value == False
     assert len(at.tabs[0].columns) == 2 # 2 columns for 2 charts
     assert at.tabs[1].label == 'Raw sensor readings'
-    assert (at.tabs[1].dataframe[0].value[:].values == [
+    assert (at.tabs[1].dataframe[0].value[:].astype(str).values == [
         ['2024-04-01 09:01:00', 'Chairlift #3', 'Chairlift Load', '99', '⚠️ LOW'],
         ['2024-04-01 08:02:00', 'Chairlift #3', 'Chairlift Load', '97', '⚠️ LOW'],
         ['2024-04-01 07:03:00', 'Chairlift #3', 'Chairlift Load', '95', '⚠️ LOW'],
@@ -63,3 +77,115 @@ def test_streamlit_sensor_data_ui(session):
         ['2024-04-01 07:05:00', 'Chairlift #2', 'Chairlift Vibration', '51', '⚠️ HIGH'],
         ['2024-04-01 06:06:00', 'Chairlift #2', 'Chairlift Vibration', '47', '']
     ]).all()
+    assert at.tabs[1].selectbox('readings_page_size').value == 20
+    assert at.tabs[1].button('readings_previous').disabled
+    assert at.tabs[1].button('readings_next').disabled
+    assert at.tabs[1].selectbox('readings_format').options == ['Parquet', 'CSV (gzip)']
+
+def test_table_pages_are_the_export_query_with_a_limit(session):
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    session.sql.side_effect = sql_handler
+
+    at = AppTest.from_file('../app/src/ui/v_sensor_data.py')
+    at.run()
+
+    assert not at.exception
+    pages = [normalize_spaces(call.args[0]) for call in session.sql.call_args_list
+             if normalize_spaces(call.args[0]).endswith('limit 21')]
+    assert len(pages) == 1
+    # the same select as the export, plus the key the pages are ordered by
+    assert ", sensor.machine_uuid as machine_uuid from reference('SENSOR_READINGS') reading" in pages[0]
+
+def test_full_resolution_plots_every_reading(session):
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    session.sql.side_effect = sql_handler
+
+    def reading_queries():
+        return sum(normalize_spaces(call.args[0]).startswith('select reading.reading_time as ts') for call in session.sql.call_args_list)
+
+    at = AppTest.from_file('../app/src/ui/v_sensor_data.py')
+    at.run()
+    before = reading_queries()
+    at.checkbox('fullResolution').check().run()
+
+    assert not at.exception
+    assert at.tabs[0].checkbox('fullResolution').value == True
+    assert len(at.tabs[0].columns) == 2 # 2 columns for 2 charts
+    # the charts now read every reading, through the reading cache
+    assert reading_queries() > before
+
+def test_charts_read_the_coarsest_rollup_with_enough_points(session):
+    session.sql.side_effect = sql_handler
+    st.cache_data.clear()
+
+    at = AppTest.from_file('../app/src/ui/v_sensor_data.py')
+    at.run()
+
+    assert not at.exception
+    chart_queries = [
+        normalize_spaces(call.args[0]) for call in session.sql.call_args_list
+        if normalize_spaces(call.args[0]).startswith("with rollup_cursor as")
+    ]
+    # readings since 2024-01-01 make enough days for a chart
+    assert len(chart_queries) == 1
+    assert "from readings_data.sensor_reading_rollups stored where stored.bucket_seconds = 86400" in chart_queries[0]
+    assert "date_trunc('day', reading.reading_time)" in chart_queries[0]
+    assert len(at.tabs[0].columns) == 2
+
+def test_charts_use_the_rollups_once_they_first_ran(session):
+    rollups = {'FIRST_DAY': None}
+    def rollups_handler(*args, **kwargs):
+        if normalize_spaces(args[0]).startswith("select min(bucket_start) as FIRST_DAY"):
+            query_result = MagicMock()
+            query_result.collect.return_value = [dict(rollups)]
+            return query_result
+        return sql_handler(*args, **kwargs)
+    def chart_queries():
+        return [normalize_spaces(call.args[0]).split(' ')[1] for call in session.sql.call_args_list
+                if normalize_spaces(call.args[0]).startswith("with ")]
+    session.sql.side_effect = rollups_handler
+    st.cache_data.clear()
+
+    at = AppTest.from_file('../app/src/ui/v_sensor_data.py')
+    at.run()
+    assert chart_queries() == ['readings']
+
+    # the rollup task ran in the meantime; a new chart (another filter) finds it
+    rollups['FIRST_DAY'] = pd.Timestamp('2024-01-01')
+    at.multiselect('machines').select('Chairlift #2').run()
+
+    assert not at.exception
+    assert chart_queries() == ['readings', 'rollup_cursor']
+
+def test_live_mode_only_fetches_readings_newer_than_its_window(session):
+    session.sql.side_effect = sql_handler
+    st.cache_data.clear()
+
+    at = AppTest.from_file('../app/src/ui/v_sensor_data.py')
+    at.run()
+    at.tabs[0].checkbox('liveMode').check().run()
+
+    assert not at.exception
+    assert at.tabs[0].selectbox('liveRefreshSeconds').value == 30
+    assert len(at.tabs[0].columns) == 2
+
+    def live_queries():
+        return [
+            call for call in session.sql.call_args_list
+            if "reading.reading_time > dateadd(second, ?" in normalize_spaces(call.args[0])
+                or "reading.reading_time >= ?::timestamp" in normalize_spaces(call.args[0])
+        ]
+
+    assert len(live_queries()) == 1
+    # the window was just filled: the next rerun doesn't poll
+    at.run()
+    assert len(live_queries()) == 1
+
+    at.session_state['live_graph'].window.polled_at = None
+    at.run()
+    assert not at.exception
+    assert len(live_queries()) == 2
+    assert "reading.reading_time >= ?::timestamp" in normalize_spaces(live_queries()[1].args[0])
+    assert live_queries()[1].kwargs['params'][-1] == '2024-04-01 09:01:00'
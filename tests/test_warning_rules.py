@@ -0,0 +1,152 @@
+import datetime as dt
+import json
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+from test_utils import normalize_spaces, session, session_builder
+from warning_rules import add_interval, check_warnings, compact_episodes, evaluate, maintenance_reasons
+
+TODAY = dt.date(2024, 4, 1)
+
+def readings(**overrides):
+    row = {
+        'READING': 120, 'MIN_RANGE': 110, 'MAX_RANGE': 130,
+        'INSTALLATION_DATE': dt.date(2024, 1, 1), 'LAST_SERVICE_DATE': dt.date(2024, 3, 1),
+        'SERVICE_INTERVAL_COUNT': 2, 'SERVICE_INTERVAL_UNIT': 'month',
+        'LIFETIME_COUNT': 5, 'LIFETIME_UNIT': 'year',
+    }
+    row.update(overrides)
+    return pd.DataFrame([row])
+
+def test_add_interval_clamps_to_end_of_month():
+    result = add_interval(
+        [dt.date(2024, 1, 31), dt.date(2023, 2, 28), dt.date(2024, 1, 1), None, dt.date(2024, 1, 1)],
+        ['month', 'year', 'week', 'month', 'fortnight'],
+        [1, 1, 2, 1, 1]
+    )
+    assert [str(d) for d in result] == ['2024-02-29', '2024-02-28', '2024-01-15', 'NaT', 'NaT']
+
+def test_evaluate_matches_check_warnings_precedence():
+    expired = {'INSTALLATION_DATE': dt.date(2018, 1, 1)}
+    service_due = {'LAST_SERVICE_DATE': dt.date(2023, 1, 1)}
+    cases = [
+        ({}, None),
+        (service_due, 'SENSOR_SERVICE_DUE'),
+        ({**expired, **service_due}, 'SENSOR_LIFETIME_EXPIRED'),
+        ({**expired, 'READING': 100}, 'SENSOR_READING_OUT_OF_RANGE'),
+        ({**service_due, 'READING': 140}, 'SENSOR_READING_OUT_OF_RANGE'),
+        ({**expired, 'READING': None}, 'SENSOR_NOT_SENDING_DATA'),
+        ({'MIN_RANGE': None, 'MAX_RANGE': None}, None),
+        ({'LAST_SERVICE_DATE': None, 'SERVICE_INTERVAL_UNIT': None}, None),
+    ]
+    frame = pd.concat([readings(**overrides) for overrides, _ in cases], ignore_index=True)
+
+    assert list(evaluate(frame, today=TODAY)) == [reason for _, reason in cases]
+
+def test_evaluate_uses_the_precomputed_maintenance_reason():
+    frame = pd.DataFrame({
+        'READING': [120, 140, None, 120],
+        'MIN_RANGE': [110, 110, 110, 110],
+        'MAX_RANGE': [130, 130, 130, 130],
+        'MAINTENANCE_REASON': ['SENSOR_SERVICE_DUE', 'SENSOR_LIFETIME_EXPIRED', 'SENSOR_SERVICE_DUE', None],
+    })
+
+    assert list(evaluate(frame)) == [
+        'SENSOR_SERVICE_DUE', 'SENSOR_READING_OUT_OF_RANGE', 'SENSOR_NOT_SENDING_DATA', None
+    ]
+
+def test_maintenance_reasons_prefers_an_expired_lifetime():
+    reasons = maintenance_reasons(
+        [dt.date(2024, 3, 1), dt.date(2024, 5, 1), dt.date(2024, 3, 1), None],
+        [dt.date(2024, 3, 1), dt.date(2024, 3, 1), dt.date(2025, 1, 1), None],
+        today=TODAY
+    )
+
+    assert list(reasons) == ['SENSOR_LIFETIME_EXPIRED', 'SENSOR_LIFETIME_EXPIRED', 'SENSOR_SERVICE_DUE', None]
+
+def test_compact_episodes_splits_runs_per_sensor_and_reason():
+    times = pd.to_datetime(['2024-04-01 00:00:00', '2024-04-01 00:00:30', '2024-04-01 00:01:00', '2024-04-01 00:01:30'])
+    frame = pd.DataFrame({
+        'SENSOR_UUID': ['a', 'a', 'a', 'a', 'b', 'b'],
+        'READING_TIME': list(times) + list(times[:2]),
+        'READING': [140, 150, 120, 160, None, None],
+        'REASON': ['SENSOR_READING_OUT_OF_RANGE', 'SENSOR_READING_OUT_OF_RANGE', None, 'SENSOR_READING_OUT_OF_RANGE',
+                   'SENSOR_NOT_SENDING_DATA', 'SENSOR_NOT_SENDING_DATA'],
+    }).sample(frac=1, random_state=1)
+
+    episodes = compact_episodes(frame)
+
+    assert list(episodes['SENSOR_UUID']) == ['a', 'a', 'a', 'b']
+    assert list(episodes['REASON'].fillna('')) == ['SENSOR_READING_OUT_OF_RANGE', '', 'SENSOR_READING_OUT_OF_RANGE', 'SENSOR_NOT_SENDING_DATA']
+    assert list(episodes['READING_COUNT']) == [2, 1, 1, 2]
+    assert list(episodes['MIN_READING'].fillna(-1)) == [140, 120, 160, -1]
+    assert list(episodes['MAX_READING'].fillna(-1)) == [150, 120, 160, -1]
+    assert list(episodes['FIRST_READING_TIME']) == [times[0], times[2], times[3], times[0]]
+    assert list(episodes['LAST_READING_TIME']) == [times[1], times[2], times[3], times[1]]
+    assert list(episodes['IS_FIRST']) == [True, False, False, True]
+    assert list(episodes['IS_LAST']) == [False, False, True, True]
+
+def check_warnings_handler(failing_statement=None, rules=None):
+    def sql_handler(*args, **kwargs):
+        query_result = MagicMock()
+        stmt = normalize_spaces(args[0])
+        if failing_statement and stmt.startswith(failing_statement):
+            query_result.collect.side_effect = RuntimeError('merge failed')
+        elif stmt.startswith("select last_reading_ts"):
+            query_result.collect.return_value = []
+        elif stmt.startswith("select warning_check_batch_rows"):
+            query_result.collect.return_value = [{'WARNING_CHECK_BATCH_ROWS': 10, 'WARNING_CHECK_MAX_ROWS': 100}]
+        elif stmt.startswith("select s.uuid as SENSOR_UUID"):
+            query_result.to_pandas.return_value = pd.DataFrame({
+                'SENSOR_UUID': ['sensor-1', 'sensor-1'],
+                'READING_TIME': pd.to_datetime(['2024-04-01 09:00:00', '2024-04-01 09:00:30']),
+                'READING': [150, None],
+                'MIN_RANGE': [110, 110], 'MAX_RANGE': [130, 130],
+                'MAINTENANCE_REASON': [None, None], 'RULES': [rules, rules], 'STATE': [None, None],
+            })
+        return query_result
+    return sql_handler
+
+def statements(session):
+    return [normalize_spaces(call.args[0]) for call in session.sql.call_args_list]
+
+def test_check_warnings_commits_a_chunk_without_ddl(session):
+    session.sql.side_effect = check_warnings_handler()
+
+    check_warnings(session)
+
+    run = statements(session)
+    begin, commit = run.index("begin transaction"), run.index("commit")
+    inserts = [(i, call) for i, call in enumerate(session.sql.call_args_list)
+               if normalize_spaces(call.args[0]).startswith("insert into warnings_data.warning_episode_chunks")]
+    assert len(inserts) == 1 and begin < inserts[0][0] < commit
+    # leftovers of a failed run are cleared first, in the same transaction
+    assert begin < run.index("delete from warnings_data.warning_episode_chunks where partition_id = ?") < inserts[0][0]
+    assert [row['REASON'] for row in json.loads(inserts[0][1].kwargs['params'][0])] == [
+        'SENSOR_READING_OUT_OF_RANGE', 'SENSOR_NOT_SENDING_DATA'
+    ]
+    # write_pandas creates a stage and a file format, which would commit the transaction
+    session.write_pandas.assert_not_called()
+    assert "rollback" not in run
+
+def test_check_warnings_rolls_back_a_failed_chunk(session):
+    session.sql.side_effect = check_warnings_handler(failing_statement="call warnings_code.merge_warning_episodes")
+
+    with pytest.raises(RuntimeError):
+        check_warnings(session)
+
+    run = statements(session)
+    assert "rollback" in run and "commit" not in run
+    assert not any(stmt.startswith("insert into warnings_data.warnings_reading_cursor") for stmt in run)
+
+def test_check_warnings_replaces_leftover_window_state(session):
+    rules = json.dumps([{'RULE': 'RATE_OF_CHANGE', 'WINDOW_READINGS': 1, 'THRESHOLD': 5}])
+    session.sql.side_effect = check_warnings_handler(rules=rules)
+
+    check_warnings(session)
+
+    run = statements(session)
+    clear = run.index("delete from warnings_data.window_rule_chunks where partition_id = ?")
+    insert = next(i for i, stmt in enumerate(run) if stmt.startswith("insert into warnings_data.window_rule_chunks"))
+    assert run.index("begin transaction") < clear < insert < run.index("call warnings_code.merge_window_state(?)") < run.index("commit")
+
@@ -0,0 +1,95 @@
+import json
+import pandas as pd
+from window_rules import WindowRule, WindowRulesHandler, WindowState, evaluate_sensors, evaluate_window
+
+RULES = [
+    WindowRule('RATE_OF_CHANGE', 1, 50),
+    WindowRule('ROLLING_ZSCORE', 4, 3),
+    WindowRule('CONSECUTIVE_OUT_OF_RANGE', 3),
+]
+READINGS = [100, 101, 99, 100, 130, 131, 300, 301, 302, None, 303, 100]
+
+def test_rules_apply_in_order_of_precedence():
+    reasons, state = evaluate_window(READINGS, 50, 250, RULES, WindowState())
+
+    assert list(reasons) == [
+        None, None, None, None,
+        # far from the last four readings, but not a big jump
+        'SENSOR_READING_ANOMALOUS',
+        None,
+        # a big jump, that is also far from the last four readings
+        'SENSOR_READING_ANOMALOUS',
+        None,
+        # the third reading above the range in a row; a missing reading doesn't end the run
+        'SENSOR_READING_OUT_OF_RANGE_REPEATEDLY', None, 'SENSOR_READING_OUT_OF_RANGE_REPEATEDLY',
+        'SENSOR_READING_ANOMALOUS',
+    ]
+    # as many readings as the longest look back; the consecutive run needs none
+    assert state == WindowState([301.0, 302.0, 303.0, 100.0], 0)
+
+def test_carried_window_gives_the_same_warnings_as_one_run():
+    whole, whole_state = evaluate_window(READINGS, 50, 250, RULES, WindowState())
+
+    reasons, state = [], WindowState()
+    for start in range(0, len(READINGS), 5):
+        run_reasons, state = evaluate_window(READINGS[start:start + 5], 50, 250, RULES,
+                                             WindowState.from_variant(state.to_json()))
+        reasons.extend(run_reasons)
+
+    assert reasons == list(whole)
+    assert state == whole_state
+
+def test_window_fills_up_over_small_runs():
+    rules = [WindowRule('RATE_OF_CHANGE', 3, 20), WindowRule('ROLLING_ZSCORE', 10, 2)]
+    readings = [100, 102, 98, 101, 99, 140, 100, 103, 97, 100, 101, 99, 1000, 100, 98]
+    whole, whole_state = evaluate_window(readings, 50, 250, rules, WindowState())
+
+    # two readings per check, so the window is still filling for the first five checks
+    reasons, state = [], WindowState()
+    for start in range(0, len(readings), 2):
+        run_reasons, state = evaluate_window(readings[start:start + 2], 50, 250, rules,
+                                             WindowState.from_variant(state.to_json()))
+        reasons.extend(run_reasons)
+        assert len(state.readings) == min(start + 2, len(readings), 10)
+
+    assert reasons == list(whole)
+    assert reasons[12] == 'SENSOR_READING_ANOMALOUS'
+    assert state == whole_state
+
+def test_handler_returns_the_warnings_and_the_window():
+    rules = json.dumps([{'RULE': 'CONSECUTIVE_OUT_OF_RANGE', 'WINDOW_READINGS': 2}])
+    readings = pd.DataFrame({
+        'reading_time': pd.to_datetime(['2024-04-01 08:01:00', '2024-04-01 08:00:00', '2024-04-01 08:00:30']),
+        'reading': [260, 251, 255],
+        'min_range': 50,
+        'max_range': 250,
+        'rules': rules,
+        'state': json.dumps({'readings': [], 'out_of_range_run': 4}),
+    })
+
+    result = WindowRulesHandler().end_partition(readings)
+
+    # the run of out of range readings goes on from the last check's
+    assert result['READING_TIME'].astype(str).tolist() == [
+        '2024-04-01 08:00:00', '2024-04-01 08:00:30', '2024-04-01 08:01:00', '2024-04-01 08:01:00'
+    ]
+    assert result['REASON'].tolist() == ['SENSOR_READING_OUT_OF_RANGE_REPEATEDLY'] * 3 + [None]
+    assert json.loads(result['STATE'].iloc[-1]) == {'readings': [], 'out_of_range_run': 7}
+
+def test_sensors_without_rules_are_left_alone():
+    readings = pd.DataFrame({
+        'SENSOR_UUID': ['a', 'b', 'a'],
+        'READING_TIME': pd.to_datetime(['2024-04-01 08:00:00', '2024-04-01 08:00:00', '2024-04-01 08:00:30']),
+        'READING': [100, 500, 200],
+        'MIN_RANGE': 50,
+        'MAX_RANGE': 250,
+        'RULES': [json.dumps([{'RULE': 'RATE_OF_CHANGE', 'WINDOW_READINGS': 1, 'THRESHOLD': 50}]), None, None],
+        'STATE': None,
+    })
+    readings.loc[2, 'RULES'] = readings.loc[0, 'RULES']
+
+    reasons, states = evaluate_sensors(readings)
+
+    assert reasons.tolist() == [None, None, 'SENSOR_READING_CHANGING_TOO_FAST']
+    assert states['SENSOR_UUID'].tolist() == ['a']
+    assert json.loads(states['STATE'][0]) == {'readings': [200.0], 'out_of_range_run': 0}